@@ -257,6 +257,9 @@ class Assignment(kvs.Base, assignment.Driver):
     def get_roles_for_groups(self, group_ids, project_id=None, domain_id=None):
         raise exception.NotImplemented()
 
+    def get_effective_roles(self, user_id, group_ids, project_id):
+        raise exception.NotImplemented()
+
     def list_projects_for_groups(self, group_ids):
         raise exception.NotImplemented()
 
@@ -301,7 +304,9 @@ class Assignment(kvs.Base, assignment.Driver):
         else:
             self.db.delete('metadata_user-%s-%s' % (tenant_id, user_id))
 
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
         """List the role assignments.
 
         We enumerate the metadata entries and extract the targets, actors, and
@@ -347,7 +352,9 @@ class Assignment(kvs.Base, assignment.Driver):
                 role_assignment['role_id'] = r
                 assignment_list.append(role_assignment)
 
-        return assignment_list
+        return self._filter_role_assignments(
+            assignment_list, role_id, user_id, group_ids, domain_id,
+            project_ids, inherited_to_projects)
 
     # CRUD
     def create_project(self, tenant_id, tenant):
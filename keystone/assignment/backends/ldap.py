@@ -188,6 +188,9 @@ class Assignment(assignment.Driver):
     def get_roles_for_groups(self, group_ids, project_id=None, domain_id=None):
         raise exception.NotImplemented()
 
+    def get_effective_roles(self, user_id, group_ids, project_id):
+        raise exception.NotImplemented()
+
     def list_projects_for_groups(self, group_ids):
         raise exception.NotImplemented()
 
@@ -423,7 +426,9 @@ class Assignment(assignment.Driver):
             raise exception.DomainNotFound(domain_id=domain_name)
         return default_domain
 
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
         role_assignments = []
         for a in self.role.list_role_assignments(self.project.tree_dn):
             if isinstance(a, UserRoleAssociation):
@@ -437,7 +442,9 @@ class Assignment(assignment.Driver):
                     'group_id': self.group._dn_to_id(a.group_dn),
                     'project_id': self.project._dn_to_id(a.project_dn)}
             role_assignments.append(assignment)
-        return role_assignments
+        return self._filter_role_assignments(
+            role_assignments, role_id, user_id, group_ids, domain_id,
+            project_ids, inherited_to_projects)
 
 
 # TODO(termie): turn this into a data object and move logic to driver
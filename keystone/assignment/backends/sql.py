@@ -25,6 +25,12 @@ from keystone.i18n import _
 
 CONF = config.CONF
 
+# Maximum number of values in the IN clauses of a statement.
+_IN_CLAUSE_BATCH_SIZE = 500
+
+# Number of rows fetched at a time by queries with large results.
+_QUERY_BATCH_SIZE = 1000
+
 
 class AssignmentType:
     USER_PROJECT = 'UserProject'
@@ -111,26 +117,26 @@ class Assignment(keystone_assignment.Driver):
 
         return metadata_ref
 
+    def _calculate_type(self, user_id, group_id, project_id, domain_id):
+        if user_id and project_id:
+            return AssignmentType.USER_PROJECT
+        elif user_id and domain_id:
+            return AssignmentType.USER_DOMAIN
+        elif group_id and project_id:
+            return AssignmentType.GROUP_PROJECT
+        elif group_id and domain_id:
+            return AssignmentType.GROUP_DOMAIN
+        else:
+            message_data = ', '.join(
+                [str(user_id), str(group_id), str(project_id),
+                 str(domain_id)])
+            raise exception.Error(message=_(
+                'Unexpected combination of grant attributes - '
+                'User, Group, Project, Domain: %s') % message_data)
+
     def create_grant(self, role_id, user_id=None, group_id=None,
                      domain_id=None, project_id=None,
                      inherited_to_projects=False):
-
-        def calculate_type(user_id, group_id, project_id, domain_id):
-            if user_id and project_id:
-                return AssignmentType.USER_PROJECT
-            elif user_id and domain_id:
-                return AssignmentType.USER_DOMAIN
-            elif group_id and project_id:
-                return AssignmentType.GROUP_PROJECT
-            elif group_id and domain_id:
-                return AssignmentType.GROUP_DOMAIN
-            else:
-                message_data = ', '.join(
-                    [user_id, group_id, project_id, domain_id])
-                raise exception.Error(message=_(
-                    'Unexpected combination of grant attributes - '
-                    'User, Group, Project, Domain: %s') % message_data)
-
         with sql.transaction() as session:
             self._get_role(session, role_id)
 
@@ -139,7 +145,7 @@ class Assignment(keystone_assignment.Driver):
             if project_id:
                 self._get_project(session, project_id)
 
-        type = calculate_type(user_id, group_id, project_id, domain_id)
+        type = self._calculate_type(user_id, group_id, project_id, domain_id)
         try:
             with sql.transaction() as session:
                 session.add(RoleAssignment(
@@ -152,6 +158,72 @@ class Assignment(keystone_assignment.Driver):
             # The v3 grant APIs are silent if the assignment already exists
             pass
 
+    def _check_grant_targets(self, session, grants):
+        """Check the roles, domains and projects of grants exist.
+
+        Each kind of entity is looked up with batched IN queries rather
+        than one query per grant.
+
+        """
+        checks = [
+            (Role, 'role_id', exception.RoleNotFound),
+            (Domain, 'domain_id', exception.DomainNotFound),
+            (Project, 'project_id', exception.ProjectNotFound),
+        ]
+        for model, attr, not_found in checks:
+            entity_ids = list(set(grant[attr] for grant in grants
+                                  if grant.get(attr)))
+            for i in range(0, len(entity_ids), _IN_CLAUSE_BATCH_SIZE):
+                batch = entity_ids[i:i + _IN_CLAUSE_BATCH_SIZE]
+                query = session.query(model.id)
+                query = query.filter(model.id.in_(batch))
+                missing_ids = set(batch) - set(ref.id for ref in query)
+                if missing_ids:
+                    raise not_found(**{attr: missing_ids.pop()})
+
+    def _grant_rows(self, grants):
+        """Return the distinct role assignment rows of grants."""
+        return set(
+            (self._calculate_type(grant.get('user_id'),
+                                  grant.get('group_id'),
+                                  grant.get('project_id'),
+                                  grant.get('domain_id')),
+             grant.get('user_id') or grant.get('group_id'),
+             grant.get('project_id') or grant.get('domain_id'),
+             grant['role_id'],
+             bool(grant.get('inherited_to_projects')))
+            for grant in grants)
+
+    def _existing_grant_rows(self, session, rows):
+        """Return the rows among the given ones which already exist."""
+        existing = set()
+        actor_ids = list(set(row[1] for row in rows))
+        for i in range(0, len(actor_ids), _IN_CLAUSE_BATCH_SIZE):
+            query = session.query(RoleAssignment.type,
+                                  RoleAssignment.actor_id,
+                                  RoleAssignment.target_id,
+                                  RoleAssignment.role_id,
+                                  RoleAssignment.inherited)
+            query = query.filter(RoleAssignment.actor_id.in_(
+                actor_ids[i:i + _IN_CLAUSE_BATCH_SIZE]))
+            existing.update(tuple(ref) for ref in query)
+        return rows & existing
+
+    def create_grants(self, grants):
+        rows = self._grant_rows(grants)
+        with sql.transaction() as session:
+            self._check_grant_targets(session, grants)
+            # The v3 grant APIs are silent if the assignment already
+            # exists, so the existing rows are left out of the insert.
+            rows -= self._existing_grant_rows(session, rows)
+            if rows:
+                session.execute(RoleAssignment.__table__.insert(), [
+                    {'type': type, 'actor_id': actor_id,
+                     'target_id': target_id, 'role_id': role_id,
+                     'inherited': inherited}
+                    for type, actor_id, target_id, role_id, inherited
+                    in rows])
+
     def list_grants(self, user_id=None, group_id=None,
                     domain_id=None, project_id=None,
                     inherited_to_projects=False):
@@ -213,6 +285,26 @@ class Assignment(keystone_assignment.Driver):
             if not q.delete(False):
                 raise exception.RoleNotFound(role_id=role_id)
 
+    def delete_grants(self, grants):
+        rows = self._grant_rows(grants)
+        with sql.transaction() as session:
+            self._check_grant_targets(session, grants)
+            rows = list(self._existing_grant_rows(session, rows))
+            # Each row binds five values, keep the statements under the
+            # limit.
+            batch_size = _IN_CLAUSE_BATCH_SIZE // 5
+            for i in range(0, len(rows), batch_size):
+                q = session.query(RoleAssignment)
+                q = q.filter(sqlalchemy.or_(*[
+                    sqlalchemy.and_(RoleAssignment.type == type,
+                                    RoleAssignment.actor_id == actor_id,
+                                    RoleAssignment.target_id == target_id,
+                                    RoleAssignment.role_id == role_id,
+                                    RoleAssignment.inherited == inherited)
+                    for type, actor_id, target_id, role_id, inherited
+                    in rows[i:i + batch_size]]))
+                q.delete(False)
+
     @sql.truncated
     def list_projects(self, hints):
         with sql.transaction() as session:
@@ -228,70 +320,55 @@ class Assignment(keystone_assignment.Driver):
             return [project_ref.to_dict() for project_ref in project_refs]
 
     def list_projects_for_user(self, user_id, group_ids, hints):
-        # TODO(henry-nash): Now that we have a single assignment table, we
-        # should be able to honor the hints list that is provided.
-
-        def _project_ids_to_dicts(session, ids):
-            if not ids:
-                return []
-            else:
-                query = session.query(Project)
-                query = query.filter(Project.id.in_(ids))
-                project_refs = query.all()
-                return [project_ref.to_dict() for project_ref in project_refs]
+        project_types = [AssignmentType.USER_PROJECT,
+                         AssignmentType.GROUP_PROJECT]
+        domain_types = [AssignmentType.USER_DOMAIN,
+                        AssignmentType.GROUP_DOMAIN]
 
         with sql.transaction() as session:
-            # First get a list of the projects and domains for which the user
-            # has any kind of role assigned
-
+            # The projects on which the user has any kind of role assigned,
+            # directly or by group, are selected by a single query.
             actor_list = [user_id]
             if group_ids:
                 actor_list = actor_list + group_ids
 
-            query = session.query(RoleAssignment)
-            query = query.filter(RoleAssignment.actor_id.in_(actor_list))
-            assignments = query.all()
-
-            project_ids = set()
-            for assignment in assignments:
-                if (assignment.type == AssignmentType.USER_PROJECT or
-                        assignment.type == AssignmentType.GROUP_PROJECT):
-                    project_ids.add(assignment.target_id)
-
-            if not CONF.os_inherit.enabled:
-                return _project_ids_to_dicts(session, project_ids)
-
-            # Inherited roles are enabled, so check to see if this user has any
-            # inherited role (direct or group) on any parent project, in which
-            # case we must add in all the projects in that parent's subtree.
+            direct_query = session.query(RoleAssignment.target_id)
+            direct_query = direct_query.filter(
+                RoleAssignment.actor_id.in_(actor_list))
+            direct_query = direct_query.filter(
+                RoleAssignment.type.in_(project_types))
+            project_constraints = [Project.id.in_(direct_query.subquery())]
+
+            if CONF.os_inherit.enabled:
+                # Inherited roles are enabled, so also select the subtrees of
+                # the projects on which the user has an inherited role, and
+                # the projects owned by the domains on which the user has an
+                # inherited role.
+                subtree_query = session.query(ProjectHierarchy.descendant_id)
+                subtree_query = subtree_query.join(
+                    RoleAssignment,
+                    RoleAssignment.target_id == ProjectHierarchy.ancestor_id)
+                subtree_query = subtree_query.filter(
+                    RoleAssignment.actor_id.in_(actor_list))
+                subtree_query = subtree_query.filter(
+                    RoleAssignment.type.in_(project_types))
+                subtree_query = subtree_query.filter(RoleAssignment.inherited)
+                project_constraints.append(
+                    Project.id.in_(subtree_query.subquery()))
+
+                domain_query = session.query(RoleAssignment.target_id)
+                domain_query = domain_query.filter(
+                    RoleAssignment.actor_id.in_(actor_list))
+                domain_query = domain_query.filter(
+                    RoleAssignment.type.in_(domain_types))
+                domain_query = domain_query.filter(RoleAssignment.inherited)
+                project_constraints.append(
+                    Project.domain_id.in_(domain_query.subquery()))
 
-            for assignment in assignments:
-                if ((assignment.type == AssignmentType.USER_PROJECT or
-                        assignment.type == AssignmentType.GROUP_PROJECT) and
-                        assignment.inherited):
-                    project_ids.update(
-                        (x['id'] for x in
-                            self.get_project_subtree(assignment.target_id)))
-
-            # Use the same logic above to domains
-
-            domain_ids = set()
-            for assignment in assignments:
-                if ((assignment.type == AssignmentType.USER_DOMAIN or
-                    assignment.type == AssignmentType.GROUP_DOMAIN) and
-                        assignment.inherited):
-                    domain_ids.add(assignment.target_id)
-
-            # Get the projects that are owned by all of these domains and
-            # add them in to the project id list
-
-            if domain_ids:
-                query = session.query(Project.id)
-                query = query.filter(Project.domain_id.in_(domain_ids))
-                for project_ref in query.all():
-                    project_ids.add(project_ref.id)
-
-            return _project_ids_to_dicts(session, project_ids)
+            query = session.query(Project)
+            query = query.filter(sqlalchemy.or_(*project_constraints))
+            project_refs = sql.filter_limit_query(Project, query, hints)
+            return [project_ref.to_dict() for project_ref in project_refs]
 
     def list_domains_for_user(self, user_id, group_ids, hints):
         with sql.transaction() as session:
@@ -315,39 +392,99 @@ class Assignment(keystone_assignment.Driver):
             query = query.filter(sqlalchemy.or_(*filters))
             return [ref.to_dict() for ref in query.all()]
 
-    def _get_children(self, session, project_ids):
-        query = session.query(Project)
-        query = query.filter(Project.parent_id.in_(project_ids))
-        project_refs = query.all()
-        return [project_ref.to_dict() for project_ref in project_refs]
-
     def get_project_subtree(self, project_id):
         with sql.transaction() as session:
-            project = self._get_project(session, project_id).to_dict()
-            children = self._get_children(session, [project['id']])
-            subtree = []
-            while children:
-                subtree += children
-                children_ids = [ref['id'] for ref in children]
-                children = self._get_children(session, children_ids)
-
+            query = session.query(Project)
+            query = query.join(ProjectHierarchy,
+                               Project.id == ProjectHierarchy.descendant_id)
+            query = query.filter(ProjectHierarchy.ancestor_id == project_id)
+            query = query.filter(ProjectHierarchy.depth > 0)
+            query = query.order_by(ProjectHierarchy.depth)
+            subtree = [ref.to_dict() for ref in query.all()]
+            if not subtree:
+                # NOTE: Raise ProjectNotFound if the project doesn't exist.
+                self._get_project(session, project_id)
             return subtree
 
     def list_project_parents(self, project_id):
         with sql.transaction() as session:
-            project = self._get_project(session, project_id).to_dict()
-            hierarchy = []
-            while project['parent_id'] is not None:
-                parent_project = self._get_project(
-                    session, project['parent_id']).to_dict()
-                hierarchy.append(parent_project)
-                project = parent_project
-            return hierarchy
+            query = session.query(Project)
+            query = query.join(ProjectHierarchy,
+                               Project.id == ProjectHierarchy.ancestor_id)
+            query = query.filter(ProjectHierarchy.descendant_id == project_id)
+            query = query.filter(ProjectHierarchy.depth > 0)
+            query = query.order_by(ProjectHierarchy.depth)
+            parents = [ref.to_dict() for ref in query.all()]
+            if not parents:
+                # NOTE: Raise ProjectNotFound if the project doesn't exist.
+                self._get_project(session, project_id)
+            return parents
 
     def is_leaf_project(self, project_id):
         with sql.transaction() as session:
-            project_refs = self._get_children(session, [project_id])
-            return not project_refs
+            query = session.query(ProjectHierarchy.descendant_id)
+            query = query.filter_by(ancestor_id=project_id, depth=1)
+            return query.first() is None
+
+    def _link_to_ancestors(self, session, project_id, parent_id):
+        """Link the subtree of a project to the ancestors of its parent.
+
+        The rows are computed and inserted with a single statement: each
+        ancestor of the parent is linked to each project of the subtree.
+
+        """
+        ancestors = ProjectHierarchy.__table__.alias('ancestors')
+        subtree = ProjectHierarchy.__table__.alias('subtree')
+        select = sqlalchemy.select(
+            [ancestors.c.ancestor_id, subtree.c.descendant_id,
+             ancestors.c.depth + subtree.c.depth + 1])
+        select = select.where(ancestors.c.descendant_id == parent_id)
+        select = select.where(subtree.c.ancestor_id == project_id)
+        insert = ProjectHierarchy.__table__.insert().from_select(
+            ['ancestor_id', 'descendant_id', 'depth'], select)
+        session.execute(insert)
+
+    def _add_to_hierarchy(self, session, project_id, parent_id):
+        session.add(ProjectHierarchy(ancestor_id=project_id,
+                                     descendant_id=project_id,
+                                     depth=0))
+        if parent_id is not None:
+            session.flush()
+            self._link_to_ancestors(session, project_id, parent_id)
+
+    def _move_in_hierarchy(self, session, project_id, parent_id):
+        """Move the subtree of a project under a new parent."""
+        if parent_id is not None:
+            query = session.query(ProjectHierarchy.depth)
+            query = query.filter_by(ancestor_id=project_id,
+                                    descendant_id=parent_id)
+            if query.first() is not None:
+                raise exception.ValidationError(
+                    _('Cannot move project %s under one of its '
+                      'descendants.') % project_id)
+
+        # Unlink the subtree from its former ancestors, and link it to the
+        # new ones.
+        query = session.query(ProjectHierarchy.ancestor_id)
+        query = query.filter_by(descendant_id=project_id)
+        query = query.filter(ProjectHierarchy.depth > 0)
+        former_ancestor_ids = [ref.ancestor_id for ref in query.all()]
+        if former_ancestor_ids:
+            query = session.query(ProjectHierarchy.descendant_id)
+            query = query.filter_by(ancestor_id=project_id)
+            subtree_ids = [ref.descendant_id for ref in query.all()]
+            # NOTE: The subtree is deleted from in batches, to keep the
+            # number of bound parameters of each statement reasonable.
+            for i in range(0, len(subtree_ids), _IN_CLAUSE_BATCH_SIZE):
+                query = session.query(ProjectHierarchy)
+                query = query.filter(
+                    ProjectHierarchy.ancestor_id.in_(former_ancestor_ids))
+                query = query.filter(ProjectHierarchy.descendant_id.in_(
+                    subtree_ids[i:i + _IN_CLAUSE_BATCH_SIZE]))
+                query.delete(synchronize_session=False)
+
+        if parent_id is not None:
+            self._link_to_ancestors(session, project_id, parent_id)
 
     def get_roles_for_groups(self, group_ids, project_id=None, domain_id=None):
 
@@ -402,6 +539,60 @@ class Assignment(keystone_assignment.Driver):
 
         return [result.role_id for result in query.all()]
 
+    def get_effective_roles(self, user_id, group_ids, project_id):
+        user_types = [AssignmentType.USER_PROJECT, AssignmentType.USER_DOMAIN]
+        group_types = [AssignmentType.GROUP_PROJECT,
+                       AssignmentType.GROUP_DOMAIN]
+        project_types = [AssignmentType.USER_PROJECT,
+                         AssignmentType.GROUP_PROJECT]
+        domain_types = [AssignmentType.USER_DOMAIN,
+                        AssignmentType.GROUP_DOMAIN]
+
+        actor_constraints = sqlalchemy.and_(
+            RoleAssignment.type.in_(user_types),
+            RoleAssignment.actor_id == user_id)
+        if group_ids:
+            actor_constraints = sqlalchemy.or_(
+                actor_constraints,
+                sqlalchemy.and_(
+                    RoleAssignment.type.in_(group_types),
+                    RoleAssignment.actor_id.in_(group_ids)))
+
+        # Any role on the project itself, inherited or not, is effective on
+        # it.
+        target_constraints = sqlalchemy.and_(
+            RoleAssignment.type.in_(project_types),
+            RoleAssignment.target_id == project_id)
+        with sql.transaction() as session:
+            if CONF.os_inherit.enabled:
+                # As well as the inherited roles on the domain of the project
+                # and on its parents, which are selected with subqueries
+                # rather than looked up beforehand.
+                domain_query = session.query(Project.domain_id)
+                domain_query = domain_query.filter_by(id=project_id)
+                parents_query = session.query(ProjectHierarchy.ancestor_id)
+                parents_query = parents_query.filter_by(
+                    descendant_id=project_id)
+                parents_query = parents_query.filter(
+                    ProjectHierarchy.depth > 0)
+                inherited_constraints = sqlalchemy.or_(
+                    sqlalchemy.and_(
+                        RoleAssignment.type.in_(domain_types),
+                        RoleAssignment.target_id == domain_query.as_scalar()),
+                    sqlalchemy.and_(
+                        RoleAssignment.type.in_(project_types),
+                        RoleAssignment.target_id.in_(
+                            parents_query.subquery())))
+                target_constraints = sqlalchemy.or_(
+                    target_constraints,
+                    sqlalchemy.and_(RoleAssignment.inherited,
+                                    inherited_constraints))
+
+            query = session.query(RoleAssignment.role_id)
+            query = query.filter(actor_constraints, target_constraints)
+            query = query.distinct()
+            return [result.role_id for result in query.all()]
+
     def _list_entities_for_groups(self, group_ids, entity):
         if entity == Domain:
             assignment_type = AssignmentType.GROUP_DOMAIN
@@ -452,7 +643,9 @@ class Assignment(keystone_assignment.Driver):
                     'Cannot remove role that has not been granted, %s') %
                     role_id)
 
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
 
         def denormalize_role(ref):
             assignment = {}
@@ -477,9 +670,55 @@ class Assignment(keystone_assignment.Driver):
                 assignment['inherited_to_projects'] = 'projects'
             return assignment
 
-        with sql.transaction() as session:
-            refs = session.query(RoleAssignment).all()
-            return [denormalize_role(ref) for ref in refs]
+        actor_constraints = []
+        if user_id is not None:
+            actor_constraints.append(sqlalchemy.and_(
+                RoleAssignment.type.in_([AssignmentType.USER_PROJECT,
+                                         AssignmentType.USER_DOMAIN]),
+                RoleAssignment.actor_id == user_id))
+        if group_ids:
+            actor_constraints.append(sqlalchemy.and_(
+                RoleAssignment.type.in_([AssignmentType.GROUP_PROJECT,
+                                         AssignmentType.GROUP_DOMAIN]),
+                RoleAssignment.actor_id.in_(group_ids)))
+        target_constraints = []
+        if domain_id is not None:
+            target_constraints.append(sqlalchemy.and_(
+                RoleAssignment.type.in_([AssignmentType.USER_DOMAIN,
+                                         AssignmentType.GROUP_DOMAIN]),
+                RoleAssignment.target_id == domain_id))
+        if project_ids:
+            target_constraints.append(sqlalchemy.and_(
+                RoleAssignment.type.in_([AssignmentType.USER_PROJECT,
+                                         AssignmentType.GROUP_PROJECT]),
+                RoleAssignment.target_id.in_(project_ids)))
+        if ((user_id is not None or group_ids is not None) and
+                not actor_constraints):
+            return []
+        if ((domain_id is not None or project_ids is not None) and
+                not target_constraints):
+            return []
+
+        with sql.transaction() as session:
+            # NOTE: Only the columns are selected, and the rows are read in
+            # batches, so that large result sets are not loaded as ORM
+            # objects all at once.
+            query = session.query(RoleAssignment.type,
+                                  RoleAssignment.actor_id,
+                                  RoleAssignment.target_id,
+                                  RoleAssignment.role_id,
+                                  RoleAssignment.inherited)
+            if role_id is not None:
+                query = query.filter(RoleAssignment.role_id == role_id)
+            if actor_constraints:
+                query = query.filter(sqlalchemy.or_(*actor_constraints))
+            if target_constraints:
+                query = query.filter(sqlalchemy.or_(*target_constraints))
+            if inherited_to_projects is not None:
+                query = query.filter(
+                    RoleAssignment.inherited == inherited_to_projects)
+            return [denormalize_role(ref)
+                    for ref in query.yield_per(_QUERY_BATCH_SIZE)]
 
     # CRUD
     @sql.handle_conflicts(conflict_type='project')
@@ -488,6 +727,9 @@ class Assignment(keystone_assignment.Driver):
         with sql.transaction() as session:
             tenant_ref = Project.from_dict(tenant)
             session.add(tenant_ref)
+            session.flush()
+            self._add_to_hierarchy(session, tenant_ref.id,
+                                   tenant_ref.parent_id)
             return tenant_ref.to_dict()
 
     @sql.handle_conflicts(conflict_type='project')
@@ -498,6 +740,10 @@ class Assignment(keystone_assignment.Driver):
         with sql.transaction() as session:
             tenant_ref = self._get_project(session, tenant_id)
             old_project_dict = tenant_ref.to_dict()
+            if ('parent_id' in tenant and
+                    tenant['parent_id'] != tenant_ref.parent_id):
+                self._move_in_hierarchy(session, tenant_id,
+                                        tenant['parent_id'])
             for k in tenant:
                 old_project_dict[k] = tenant[k]
             new_project = Project.from_dict(old_project_dict)
@@ -516,8 +762,29 @@ class Assignment(keystone_assignment.Driver):
             q = q.filter_by(target_id=tenant_id)
             q.delete(False)
 
+            q = session.query(ProjectHierarchy)
+            q = q.filter_by(descendant_id=tenant_id)
+            q.delete(False)
+
             session.delete(tenant_ref)
 
+    def delete_projects(self, project_ids):
+        with sql.transaction() as session:
+            for i in range(0, len(project_ids), _IN_CLAUSE_BATCH_SIZE):
+                batch = project_ids[i:i + _IN_CLAUSE_BATCH_SIZE]
+
+                q = session.query(RoleAssignment)
+                q = q.filter(RoleAssignment.target_id.in_(batch))
+                q.delete(False)
+
+                q = session.query(ProjectHierarchy)
+                q = q.filter(ProjectHierarchy.descendant_id.in_(batch))
+                q.delete(False)
+
+                q = session.query(Project)
+                q = q.filter(Project.id.in_(batch))
+                q.delete(False)
+
     # domain crud
 
     @sql.handle_conflicts(conflict_type='domain')
@@ -667,6 +934,22 @@ class Project(sql.ModelBase, sql.DictBase):
     __table_args__ = (sql.UniqueConstraint('domain_id', 'name'), {})
 
 
+class ProjectHierarchy(sql.ModelBase, sql.DictBase):
+    """Closure table of the project hierarchy.
+
+    There is a row for each project and each of its ancestors, including the
+    project itself at depth 0.
+
+    """
+    __tablename__ = 'project_hierarchy'
+    attributes = ['ancestor_id', 'descendant_id', 'depth']
+    ancestor_id = sql.Column(sql.String(64), sql.ForeignKey('project.id'),
+                             primary_key=True)
+    descendant_id = sql.Column(sql.String(64), sql.ForeignKey('project.id'),
+                               primary_key=True, index=True)
+    depth = sql.Column(sql.Integer, nullable=False)
+
+
 class Role(sql.ModelBase, sql.DictBase):
     __tablename__ = 'role'
     attributes = ['id', 'name']
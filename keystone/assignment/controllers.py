@@ -689,7 +689,8 @@ class RoleAssignmentV3(controller.V3Controller):
 
         return formatted_entity
 
-    def _expand_indirect_assignments(self, context, refs):
+    def _expand_indirect_assignments(self, context, refs, user_id=None,
+                                     project_id=None):
         """Processes entity list into all-direct assignments.
 
         For any group role assignments in the list, create a role assignment
@@ -703,6 +704,11 @@ class RoleAssignmentV3(controller.V3Controller):
         For any new entity created by virtue of group membership, add in an
         additional link to that membership.
 
+        If a user_id is specified, the groups in the list are groups of that
+        user, and only that member is expanded. If a project_id is
+        specified, the inherited roles in the list are inherited by that
+        project, and only that project is expanded.
+
         """
         def _get_group_members(ref):
             """Get a list of group members.
@@ -712,6 +718,8 @@ class RoleAssignmentV3(controller.V3Controller):
             overall processing to continue.
 
             """
+            if user_id is not None:
+                return [{'id': user_id}]
             try:
                 members = self.identity_api.list_users_in_group(
                     ref['group']['id'])
@@ -818,7 +826,16 @@ class RoleAssignmentV3(controller.V3Controller):
                 # owned by this domain. A domain scope is guaranteed since we
                 # checked this when we built the refs list
 
-                if 'domain' in r['scope']:
+                if project_id is not None:
+                    project_ids = [project_id]
+                    base_entry = copy.deepcopy(r)
+                    if 'domain' in r['scope']:
+                        target_type = 'domains'
+                        target_id = base_entry['scope'].pop('domain')['id']
+                    else:
+                        target_type = 'projects'
+                        target_id = base_entry['scope'].pop('project')['id']
+                elif 'domain' in r['scope']:
                     project_ids = (
                         [x['id'] for x in
                             self.assignment_api.list_projects_in_domain(
@@ -828,12 +845,12 @@ class RoleAssignmentV3(controller.V3Controller):
                     target_id = base_entry['scope']['domain']['id']
                     base_entry['scope'].pop('domain')
                 else:
-                    project_id = r['scope']['project']['id']
+                    target_project_id = r['scope']['project']['id']
                     project_ids = (
-                        [project_id] +
+                        [target_project_id] +
                         [x['id'] for x in
                             self.assignment_api.get_project_subtree(
-                                project_id)])
+                                target_project_id)])
                     base_entry = copy.deepcopy(r)
                     target_type = 'projects'
                     target_id = base_entry['scope']['project']['id']
@@ -885,29 +902,103 @@ class RoleAssignmentV3(controller.V3Controller):
         else:
             return True
 
+    def _grants_from_role_assignments(self, role_assignments):
+        """Map role assignments, as listed by the API, into grants."""
+        grants = []
+        for ref in role_assignments:
+            scope = ref['scope']
+            inherited = 'OS-INHERIT:inherited_to' in scope
+            if inherited and not CONF.os_inherit.enabled:
+                raise exception.ValidationError(
+                    _('Inherited role assignments are only supported if the '
+                      'OS-INHERIT extension is enabled'))
+            grants.append({
+                'role_id': ref['role']['id'],
+                'user_id': ref.get('user', {}).get('id'),
+                'group_id': ref.get('group', {}).get('id'),
+                'domain_id': scope.get('domain', {}).get('id'),
+                'project_id': scope.get('project', {}).get('id'),
+                'inherited_to_projects': inherited})
+        return grants
+
+    # NOTE: Unlike the grant APIs, the bulk APIs are protected by a single
+    # rule, identity:create_role_assignments or
+    # identity:delete_role_assignments, which is not given the entities of
+    # each grant to inspect.
+    @controller.protected()
+    @validation.validated(schema.role_assignments_bulk, 'role_assignments')
+    def create_role_assignments(self, context, role_assignments):
+        """Grants several roles at once."""
+        self.assignment_api.create_grants(
+            self._grants_from_role_assignments(role_assignments), context)
+
+    @controller.protected()
+    @validation.validated(schema.role_assignments_bulk, 'role_assignments')
+    def delete_role_assignments(self, context, role_assignments):
+        """Revokes several roles at once."""
+        self.assignment_api.delete_grants(
+            self._grants_from_role_assignments(role_assignments), context)
+
     @controller.filterprotected('group.id', 'role.id',
                                 'scope.domain.id', 'scope.project.id',
                                 'scope.OS-INHERIT:inherited_to', 'user.id')
     def list_role_assignments(self, context, filters):
-
-        # TODO(henry-nash): This implementation uses the standard filtering
-        # in the V3.wrap_collection. Given the large number of individual
-        # assignments, this is pretty inefficient.  An alternative would be
-        # to pass the filters into the driver call, so that the list size is
-        # kept a minimum.
+        # NOTE(henry-nash): The filters are passed into the driver call, so
+        # that the list size is kept a minimum. They are also applied by the
+        # standard filtering in the V3.wrap_collection, which handles the
+        # combinations the driver call doesn't narrow down exactly.
 
         hints = self.build_driver_hints(context, filters)
-        refs = self.assignment_api.list_role_assignments()
+        query = context['query_string']
+        effective = ('effective' in query and
+                     self._query_filter_is_true(query['effective']))
+        user_id = query.get('user.id')
+        project_id = query.get('scope.project.id')
+
+        kwargs = {'role_id': query.get('role.id'),
+                  'user_id': user_id,
+                  'domain_id': query.get('scope.domain.id')}
+        if 'group.id' in query:
+            kwargs['group_ids'] = [query['group.id']]
+        if project_id is not None:
+            kwargs['project_ids'] = [project_id]
+        if not CONF.os_inherit.enabled:
+            kwargs['inherited_to_projects'] = False
+        elif query.get('scope.OS-INHERIT:inherited_to') == 'projects':
+            kwargs['inherited_to_projects'] = True
+
+        if effective:
+            if user_id is not None:
+                # The assignments of the groups of the user are expanded.
+                try:
+                    group_ids = self.identity_api.list_group_ids_for_user(
+                        user_id)
+                except exception.UserNotFound:
+                    group_ids = []
+                kwargs['group_ids'] = (kwargs.get('group_ids', []) +
+                                       group_ids)
+            if project_id is not None:
+                # As are the roles inherited from the project's domain and
+                # parents.
+                try:
+                    project_ref = self.assignment_api.get_project(project_id)
+                except exception.ProjectNotFound:
+                    return self.wrap_collection(context, [], hints=hints)
+                kwargs['project_ids'] += [
+                    p['id'] for p in
+                    self.assignment_api.list_project_parents(project_id)]
+                if kwargs['domain_id'] is None:
+                    kwargs['domain_id'] = project_ref['domain_id']
+
+        refs = self.assignment_api.list_role_assignments(**kwargs)
         formatted_refs = (
             [self._format_entity(context, x) for x in refs
              if self._filter_inherited(x)])
 
-        if ('effective' in context['query_string'] and
-                self._query_filter_is_true(
-                    context['query_string']['effective'])):
-
-            formatted_refs = self._expand_indirect_assignments(context,
-                                                               formatted_refs)
+        if effective:
+            formatted_refs = self._expand_indirect_assignments(
+                context, formatted_refs, user_id=user_id,
+                project_id=project_id)
 
         return self.wrap_collection(context, formatted_refs, hints=hints)
 
@@ -15,6 +15,7 @@
 """Main entry point into the assignment service."""
 
 import abc
+import uuid
 
 import six
 
@@ -38,6 +39,9 @@ SHOULD_CACHE = cache.should_cache_fn('assignment')
 # NOTE(blk-u): The config option is not available at import time.
 EXPIRATION_TIME = lambda: CONF.assignment.cache_time
 
+# Number of projects deleted at a time when deleting a domain.
+DOMAIN_PURGE_BATCH_SIZE = 100
+
 
 def calc_default_domain():
     return {'description':
@@ -62,10 +66,35 @@ class Manager(manager.Manager):
     api object by both managers.
     """
     _PROJECT = 'project'
+    _DOMAIN = 'domain'
+    _ROLE = 'role'
+    _USER = 'user'
     _ROLE_REMOVED_FROM_USER = 'role_removed_from_user'
     _INVALIDATION_USER_PROJECT_TOKENS = 'invalidate_user_project_tokens'
 
     def __init__(self):
+        # The effective roles of users are cached, and invalidated when
+        # assignments are removed or their targets change.
+        self.event_callbacks = {
+            notifications.ACTIONS.deleted: {
+                self._USER: [self._user_roles_callback],
+                self._PROJECT: [self._project_roles_callback],
+                self._DOMAIN: [self._domain_roles_callback],
+                self._ROLE: [self._role_roles_callback],
+            },
+            notifications.ACTIONS.updated: {
+                self._PROJECT: [self._project_roles_callback],
+            },
+            notifications.ACTIONS.internal: {
+                notifications.INVALIDATE_USER_TOKEN_PERSISTENCE: [
+                    self._user_roles_callback],
+                notifications.INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE: [
+                    self._user_roles_callback],
+                notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE: [
+                    self._users_roles_callback],
+            },
+        }
+
         assignment_driver = CONF.assignment.driver
 
         if assignment_driver is None:
@@ -75,10 +104,7 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(assignment_driver)
 
     def _get_group_ids_for_user_id(self, user_id):
-        # TODO(morganfainberg): Implement a way to get only group_ids
-        # instead of the more expensive to_dict() call for each record.
-        return [x['id'] for
-                x in self.identity_api.list_groups_for_user(user_id)]
+        return self.identity_api.list_group_ids_for_user(user_id)
 
     def _get_hierarchy_depth(self, project_id):
         return (len(self.driver.list_project_parents(project_id)) + 1)
@@ -189,6 +215,89 @@ class Manager(manager.Manager):
         self.credential_api.delete_credentials_for_project(tenant_id)
         return ret
 
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_role_generation(self, entity_type, entity_id):
+        # NOTE: The cached effective roles are keyed on the generations of
+        # the user and of the target they were computed for, so that they can
+        # be invalidated without enumerating their keys. Invalidating a
+        # generation makes the next call return a new one.
+        return uuid.uuid4().hex
+
+    def _invalidate_role_generation(self, entity_type, entity_id=None):
+        self._get_role_generation.invalidate(self, entity_type, entity_id)
+
+    def invalidate_roles_for_user(self, user_id):
+        """Invalidate the cached effective roles of a user.
+
+        :param user_id: user identifier
+        :type user_id: string
+        """
+        self._invalidate_role_generation(self._USER, user_id)
+
+    def _invalidate_roles_for_grant(self, user_id=None, group_id=None,
+                                    domain_id=None, project_id=None,
+                                    inherited_to_projects=False):
+        if user_id is not None:
+            self.invalidate_roles_for_user(user_id)
+        elif domain_id is not None:
+            self._invalidate_role_generation(self._DOMAIN, domain_id)
+        elif inherited_to_projects:
+            # A group role inherited to a subtree: invalidate the domain,
+            # which holds the whole subtree.
+            try:
+                project_ref = self.get_project(project_id)
+            except exception.ProjectNotFound:
+                return
+            self._invalidate_role_generation(self._DOMAIN,
+                                             project_ref['domain_id'])
+        else:
+            self._invalidate_role_generation(self._PROJECT, project_id)
+
+    def _invalidate_roles_for_grants(self, grants):
+        invalidated = set()
+        for grant in grants:
+            args = (grant['user_id'], grant['group_id'], grant['domain_id'],
+                    grant['project_id'], grant['inherited_to_projects'])
+            if args not in invalidated:
+                invalidated.add(args)
+                self._invalidate_roles_for_grant(*args)
+
+    def _user_roles_callback(self, service, resource_type, operation,
+                             payload):
+        user_id = payload['resource_info']
+        if isinstance(user_id, dict):
+            user_id = user_id['user_id']
+        self.invalidate_roles_for_user(user_id)
+
+    def _users_roles_callback(self, service, resource_type, operation,
+                              payload):
+        user_ids = set(payload['resource_info']['user_ids'])
+        user_ids.update(user_id for user_id, _project_id
+                        in payload['resource_info']['user_project_ids'])
+        for user_id in user_ids:
+            self.invalidate_roles_for_user(user_id)
+
+    def _project_roles_callback(self, service, resource_type, operation,
+                                payload):
+        project_id = payload['resource_info']
+        self._invalidate_role_generation(self._PROJECT, project_id)
+        if operation == notifications.ACTIONS.updated:
+            # The project may have been moved, which changes the inherited
+            # roles of its whole subtree.
+            project_ref = self.get_project(project_id)
+            self._invalidate_role_generation(self._DOMAIN,
+                                             project_ref['domain_id'])
+
+    def _domain_roles_callback(self, service, resource_type, operation,
+                               payload):
+        self._invalidate_role_generation(self._DOMAIN,
+                                         payload['resource_info'])
+
+    def _role_roles_callback(self, service, resource_type, operation,
+                             payload):
+        self._invalidate_role_generation(self._ROLE)
+
     def get_roles_for_user_and_project(self, user_id, tenant_id):
         """Get the roles associated with a user within given project.
 
@@ -202,8 +311,20 @@ class Manager(manager.Manager):
                  keystone.exception.ProjectNotFound
 
         """
-        def _get_group_project_roles(user_id, project_ref):
-            group_ids = self._get_group_ids_for_user_id(user_id)
+        project_ref = self.get_project(tenant_id)
+        generations = (
+            self._get_role_generation(self._USER, user_id),
+            self._get_role_generation(self._PROJECT, tenant_id),
+            self._get_role_generation(self._DOMAIN, project_ref['domain_id']),
+            self._get_role_generation(self._ROLE, None))
+        return self._get_roles_for_user_and_project(user_id, tenant_id,
+                                                    generations)
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_roles_for_user_and_project(self, user_id, tenant_id,
+                                        generations):
+        def _get_group_project_roles(group_ids, project_ref):
             # NOTE(samuelmz): Only SQL backend returns roles inherited
             # from a parent project. There is no need to support it on
             # other backend because get_roles_for_user_and_project will
@@ -250,8 +371,18 @@ class Manager(manager.Manager):
             return role_list
 
         project_ref = self.get_project(tenant_id)
+        group_ids = self._get_group_ids_for_user_id(user_id)
+        try:
+            role_list = self.driver.get_effective_roles(user_id, group_ids,
+                                                        project_ref['id'])
+            # Keep the order of the roles the same as the fallback below,
+            # which is the order they appear in tokens.
+            return list(set(role_list))
+        except exception.NotImplemented:
+            pass
+
         user_role_list = _get_user_project_roles(user_id, project_ref)
-        group_role_list = _get_group_project_roles(user_id, project_ref)
+        group_role_list = _get_group_project_roles(group_ids, project_ref)
         # Use set() to process the list to remove any duplicates
         return list(set(user_role_list + group_role_list))
 
@@ -263,7 +394,18 @@ class Manager(manager.Manager):
                  keystone.exception.DomainNotFound
 
         """
+        self.get_domain(domain_id)
+        generations = (
+            self._get_role_generation(self._USER, user_id),
+            self._get_role_generation(self._DOMAIN, domain_id),
+            self._get_role_generation(self._ROLE, None))
+        return self._get_roles_for_user_and_domain(user_id, domain_id,
+                                                   generations)
 
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_roles_for_user_and_domain(self, user_id, domain_id,
+                                       generations):
         def _get_group_domain_roles(user_id, domain_id):
             role_list = []
             group_ids = self._get_group_ids_for_user_id(user_id)
@@ -293,7 +435,6 @@ class Manager(manager.Manager):
             return self._roles_from_role_dicts(
                 metadata_ref.get('roles', {}), False)
 
-        self.get_domain(domain_id)
         user_role_list = _get_user_domain_roles(user_id, domain_id)
         group_role_list = _get_group_domain_roles(user_id, domain_id)
         # Use set() to process the list to remove any duplicates
@@ -323,6 +464,7 @@ class Manager(manager.Manager):
                 user_id,
                 tenant_id,
                 config.CONF.member_role_id)
+        self.invalidate_roles_for_user(user_id)
 
     def remove_user_from_project(self, tenant_id, user_id):
         """Remove user from a tenant
@@ -346,6 +488,7 @@ class Manager(manager.Manager):
             except exception.RoleNotFound:
                 LOG.debug("Removing role %s failed because it does not exist.",
                           role_id)
+        self.invalidate_roles_for_user(user_id)
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
@@ -454,6 +597,41 @@ class Manager(manager.Manager):
         self.get_domain.invalidate(self, domain_id)
         self.get_domain_by_name.invalidate(self, domain['name'])
 
+    @notifications.deleted(_PROJECT)
+    def _emit_project_deleted(self, project_id):
+        """Emit a notification to the callback system project is deleted.
+
+        :param project_id: project identifier
+        :type project_id: string
+        """
+        pass
+
+    def _delete_projects(self, project_refs):
+        """Delete a batch of projects, whose children are already deleted.
+
+        The projects are deleted by a single driver call. Tokens are
+        invalidated for each user assigned a role on them, and the
+        credentials, caches and listeners of each project are cleaned up as
+        when deleting a single project.
+
+        """
+        project_ids = [p['id'] for p in project_refs]
+        user_and_project_ids = set(
+            (a['user_id'], a['project_id']) for a in
+            self.driver.list_role_assignments(project_ids=project_ids)
+            if 'user_id' in a)
+        for user_id, project_id in user_and_project_ids:
+            payload = {'user_id': user_id, 'project_id': project_id}
+            self._emit_invalidate_user_project_tokens_notification(payload)
+
+        self.driver.delete_projects(project_ids)
+        for project in project_refs:
+            self.get_project.invalidate(self, project['id'])
+            self.get_project_by_name.invalidate(self, project['name'],
+                                                project['domain_id'])
+            self.credential_api.delete_credentials_for_project(project['id'])
+            self._emit_project_deleted(project['id'])
+
     def _delete_domain_contents(self, domain_id):
         """Delete the contents of a domain.
 
@@ -474,35 +652,38 @@ class Manager(manager.Manager):
 
         """
 
-        def _is_leaf(project, projects):
-            for p in projects:
-                if p['parent_id'] == project['id']:
-                    return False
-            return True
-
-        def _delete_leaf_projects(project, projects):
-            if not _is_leaf(project, projects):
-                children = [x for x in projects
-                            if x['parent_id'] == project['id']]
-                for p in children:
-                    _delete_leaf_projects(p, projects)
-            try:
-                self.delete_project(project['id'])
-            except exception.ProjectNotFound:
-                LOG.debug(('Project %(projectid)s not found when '
-                           'deleting domain contents for %(domainid)s, '
-                           'continuing with cleanup.'),
-                          {'projectid': project['id'],
-                           'domainid': domain_id})
+        def _projects_by_depth(projects):
+            """Return the lists of projects at each depth, deepest first."""
+            parent_ids = dict((p['id'], p['parent_id']) for p in projects)
+            depths = {}
+            for project in projects:
+                chain = []
+                project_id = project['id']
+                while project_id in parent_ids and project_id not in depths:
+                    chain.append(project_id)
+                    project_id = parent_ids[project_id]
+                depth = depths.get(project_id, -1)
+                for project_id in reversed(chain):
+                    depth += 1
+                    depths[project_id] = depth
+            levels = {}
+            for project in projects:
+                levels.setdefault(depths[project['id']], []).append(project)
+            return [levels[depth]
+                    for depth in sorted(levels, reverse=True)]
 
         user_refs = self.identity_api.list_users(domain_scope=domain_id)
         proj_refs = self.list_projects_in_domain(domain_id)
         group_refs = self.identity_api.list_groups(domain_scope=domain_id)
 
-        # Deleting projects recursively from the leaves
-        roots = [x for x in proj_refs if x['parent_id'] is None]
-        for project in roots:
-            _delete_leaf_projects(project, proj_refs)
+        # Deleting projects in batches from the deepest ones, so that each
+        # project is a leaf when it is deleted. If the deletion is
+        # interrupted, the projects left still form a valid hierarchy, and
+        # deleting the domain again carries on from there.
+        for projects in _projects_by_depth(proj_refs):
+            for i in range(0, len(projects), DOMAIN_PURGE_BATCH_SIZE):
+                self._delete_projects(
+                    projects[i:i + DOMAIN_PURGE_BATCH_SIZE])
 
         for group in group_refs:
             # Cleanup any existing groups.
@@ -600,15 +781,11 @@ class Manager(manager.Manager):
         self.get_role.invalidate(self, role_id)
 
     def list_role_assignments_for_role(self, role_id=None):
-        # NOTE(henry-nash): Currently the efficiency of the key driver
-        # implementation (SQL) of list_role_assignments is severely hampered by
-        # the existence of the multiple grant tables - hence there is little
-        # advantage in pushing the logic of this method down into the driver.
-        # Once the single assignment table is implemented, then this situation
-        # will be different, and this method should have its own driver
-        # implementation.
-        return [r for r in self.driver.list_role_assignments()
-                if r['role_id'] == role_id]
+        return self.driver.list_role_assignments(role_id=role_id)
+
+    def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
+        self.driver.add_role_to_user_and_project(user_id, tenant_id, role_id)
+        self.invalidate_roles_for_user(user_id)
 
     def remove_role_from_user_and_project(self, user_id, tenant_id, role_id):
         self.driver.remove_role_from_user_and_project(user_id, tenant_id,
@@ -628,6 +805,8 @@ class Manager(manager.Manager):
                      inherited_to_projects=False, context=None):
         self.driver.create_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
+        self._invalidate_roles_for_grant(user_id, group_id, domain_id,
+                                         project_id, inherited_to_projects)
 
     @notifications.role_assignment('deleted')
     def delete_grant(self, role_id, user_id=None, group_id=None,
@@ -658,72 +837,170 @@ class Manager(manager.Manager):
 
         self.driver.delete_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
+        self._invalidate_roles_for_grant(user_id, group_id, domain_id,
+                                         project_id, inherited_to_projects)
         if user_id is not None:
             self._emit_invalidate_user_token_persistence(user_id)
 
+    def _normalize_grants(self, grants):
+        return [{'role_id': grant['role_id'],
+                 'user_id': grant.get('user_id'),
+                 'group_id': grant.get('group_id'),
+                 'domain_id': grant.get('domain_id'),
+                 'project_id': grant.get('project_id'),
+                 'inherited_to_projects': bool(
+                     grant.get('inherited_to_projects', False))}
+                for grant in grants]
+
+    def _check_grant_actors(self, grants, check_users):
+        """Check the users and groups of grants exist.
+
+        The roles and targets of the grants are checked by the driver.
+
+        """
+        if check_users:
+            user_ids = set(grant['user_id'] for grant in grants
+                           if grant['user_id'] is not None)
+            if user_ids:
+                self.identity_api.check_users_exist(user_ids)
+        group_ids = set(grant['group_id'] for grant in grants
+                        if grant['group_id'] is not None)
+        if group_ids:
+            self.identity_api.check_groups_exist(group_ids)
+
+    @notifications.role_assignments('created')
+    def create_grants(self, grants, context=None):
+        """Create several grants at once.
+
+        Grants which already exist are ignored.
+
+        :param grants: list of dicts, each holding the role_id, user_id or
+                       group_id, domain_id or project_id, and optionally
+                       the inherited_to_projects arguments of create_grant
+        :raises: keystone.exception.UserNotFound,
+                 keystone.exception.GroupNotFound,
+                 keystone.exception.DomainNotFound,
+                 keystone.exception.ProjectNotFound,
+                 keystone.exception.RoleNotFound
+        """
+        grants = self._normalize_grants(grants)
+        self._check_grant_actors(grants, check_users=True)
+        self.driver.create_grants(grants)
+        self._invalidate_roles_for_grants(grants)
+
+    @notifications.role_assignments('deleted')
+    def delete_grants(self, grants, context=None):
+        """Delete several grants at once.
+
+        Grants which don't exist are ignored. The tokens of the users, and of
+        the members of the groups, of the grants are revoked with a single
+        batch of revocation events and a single token invalidation
+        notification.
+
+        The users of the grants don't need to exist, so that the grants of
+        deleted users can be cleaned up, as with delete_grant.
+
+        :param grants: list of dicts, as for create_grants
+        :raises: keystone.exception.GroupNotFound,
+                 keystone.exception.DomainNotFound,
+                 keystone.exception.ProjectNotFound,
+                 keystone.exception.RoleNotFound
+        """
+        grants = self._normalize_grants(grants)
+        self._check_grant_actors(grants, check_users=False)
+        self.driver.delete_grants(grants)
+        self._invalidate_roles_for_grants(grants)
+
+        user_ids = set()
+        user_grants = []
+        group_user_ids = {}
+        for grant in grants:
+            if grant['user_id'] is not None:
+                member_ids = [grant['user_id']]
+            else:
+                group_id = grant['group_id']
+                if group_id not in group_user_ids:
+                    try:
+                        group_user_ids[group_id] = [
+                            user['id'] for user in
+                            self.identity_api.list_users_in_group(group_id)]
+                    except exception.GroupNotFound:
+                        LOG.debug('Group %s not found, no tokens to '
+                                  'invalidate.', group_id)
+                        group_user_ids[group_id] = []
+                member_ids = group_user_ids[group_id]
+            user_ids.update(member_ids)
+            user_grants.extend(dict(grant, user_id=member_id)
+                               for member_id in member_ids)
+
+        if self.revoke_api:
+            self.revoke_api.revoke_by_grants(user_grants)
+        if user_ids:
+            self._emit_invalidate_users_tokens_notification(
+                {'user_ids': list(user_ids), 'user_project_ids': []})
+
     def _delete_tokens_for_role(self, role_id):
         assignments = self.list_role_assignments_for_role(role_id=role_id)
 
-        # Iterate over the assignments for this role and build the list of
-        # user or user+project IDs for the tokens we need to delete
+        # Iterate over the assignments for this role and build the sets of
+        # user or user+project IDs for the tokens we need to delete. The
+        # members of each group are only looked up once.
         user_ids = set()
-        user_and_project_ids = list()
+        user_and_project_ids = set()
+        group_user_ids = {}
         for assignment in assignments:
+            if 'user_id' in assignment:
+                assignee_ids = [assignment['user_id']]
+            elif 'group_id' in assignment:
+                group_id = assignment['group_id']
+                if group_id not in group_user_ids:
+                    # Add in any users for this group, being tolerant of any
+                    # cross-driver database integrity errors.
+                    try:
+                        group_user_ids[group_id] = [
+                            user['id'] for user in
+                            self.identity_api.list_users_in_group(group_id)]
+                    except exception.GroupNotFound:
+                        # Ignore it, but log a debug message
+                        msg = ('Group (%s), referenced in assignments for '
+                               'role (%s), not found - ignoring.')
+                        LOG.debug(msg, group_id, role_id)
+                        group_user_ids[group_id] = []
+                assignee_ids = group_user_ids[group_id]
+            else:
+                continue
+
             # If we have a project assignment, then record both the user and
             # project IDs so we can target the right token to delete. If it is
             # a domain assignment, we might as well kill all the tokens for
             # the user, since in the vast majority of cases all the tokens
             # for a user will be within one domain anyway, so not worth
             # trying to delete tokens for each project in the domain.
-            if 'user_id' in assignment:
-                if 'project_id' in assignment:
-                    user_and_project_ids.append(
-                        (assignment['user_id'], assignment['project_id']))
-                elif 'domain_id' in assignment:
-                    self._emit_invalidate_user_token_persistence(
-                        assignment['user_id'])
-            elif 'group_id' in assignment:
-                # Add in any users for this group, being tolerant of any
-                # cross-driver database integrity errors.
-                try:
-                    users = self.identity_api.list_users_in_group(
-                        assignment['group_id'])
-                except exception.GroupNotFound:
-                    # Ignore it, but log a debug message
-                    if 'project_id' in assignment:
-                        target = _('Project (%s)') % assignment['project_id']
-                    elif 'domain_id' in assignment:
-                        target = _('Domain (%s)') % assignment['domain_id']
-                    else:
-                        target = _('Unknown Target')
-                    msg = ('Group (%(group)s), referenced in assignment '
-                           'for %(target)s, not found - ignoring.')
-                    LOG.debug(msg, {'group': assignment['group_id'],
-                                    'target': target})
-                    continue
-
-                if 'project_id' in assignment:
-                    for user in users:
-                        user_and_project_ids.append(
-                            (user['id'], assignment['project_id']))
-                elif 'domain_id' in assignment:
-                    for user in users:
-                        self._emit_invalidate_user_token_persistence(
-                            user['id'])
-
-        # Now process the built up lists.  Before issuing calls to delete any
-        # tokens, let's try and minimize the number of calls by pruning out
-        # any user+project deletions where a general token deletion for that
-        # same user is also planned.
-        user_and_project_ids_to_action = []
-        for user_and_project_id in user_and_project_ids:
-            if user_and_project_id[0] not in user_ids:
-                user_and_project_ids_to_action.append(user_and_project_id)
-
-        for user_id, project_id in user_and_project_ids_to_action:
-            self._emit_invalidate_user_project_tokens_notification(
-                {'user_id': user_id,
-                 'project_id': project_id})
+            if 'project_id' in assignment:
+                user_and_project_ids.update(
+                    (user_id, assignment['project_id'])
+                    for user_id in assignee_ids)
+            elif 'domain_id' in assignment:
+                user_ids.update(assignee_ids)
+
+        # Prune out any user+project deletions where a general token deletion
+        # for that same user is also planned, then hand everything over in a
+        # single notification so the tokens can be deleted in bulk.
+        user_and_project_ids = [
+            (user_id, project_id)
+            for user_id, project_id in user_and_project_ids
+            if user_id not in user_ids]
+        if user_ids or user_and_project_ids:
+            self._emit_invalidate_users_tokens_notification(
+                {'user_ids': list(user_ids),
+                 'user_project_ids': user_and_project_ids})
+
+    @notifications.internal(notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE)
+    def _emit_invalidate_users_tokens_notification(self, payload):
+        # This notification's payload is a dict of the user_ids whose tokens
+        # are all invalidated, and of the (user_id, project_id) pairs whose
+        # project scoped tokens are invalidated.
+        pass
 
     @notifications.internal(
         notifications.INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE)
@@ -877,9 +1154,92 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_grants(self, grants):
+        """Creates several assignments/grants at once.
+
+        Each grant is a dict of the arguments of create_grant. Grants which
+        already exist are ignored. Drivers able to create the grants in a
+        single operation should override this method; by default the grants
+        are created in turn.
+
+        :raises: keystone.exception.DomainNotFound,
+                 keystone.exception.ProjectNotFound,
+                 keystone.exception.RoleNotFound
+
+        """
+        for grant in grants:
+            try:
+                self.create_grant(**grant)
+            except exception.Conflict:
+                # Some drivers reject a grant which already exists.
+                pass
+
+    def delete_grants(self, grants):
+        """Deletes several assignments/grants at once.
+
+        Each grant is a dict of the arguments of delete_grant. Grants which
+        don't exist are ignored. Drivers able to delete the grants in a
+        single operation should override this method; by default the grants
+        are deleted in turn.
+
+        :raises: keystone.exception.DomainNotFound,
+                 keystone.exception.ProjectNotFound,
+                 keystone.exception.RoleNotFound
+
+        """
+        for grant in grants:
+            try:
+                self.delete_grant(**grant)
+            except exception.RoleNotFound:
+                # The grant doesn't exist, unless the role doesn't either.
+                self.get_role(grant['role_id'])
+
+    def _filter_role_assignments(self, assignments, role_id=None,
+                                 user_id=None, group_ids=None, domain_id=None,
+                                 project_ids=None, inherited_to_projects=None):
+        """Filter a list of role assignments, for drivers which can't."""
+        def _matches(ref):
+            if role_id is not None and ref['role_id'] != role_id:
+                return False
+            if user_id is not None or group_ids is not None:
+                if not (('user_id' in ref and ref['user_id'] == user_id) or
+                        ('group_id' in ref and group_ids is not None and
+                         ref['group_id'] in group_ids)):
+                    return False
+            if domain_id is not None or project_ids is not None:
+                if not (('domain_id' in ref and
+                         ref['domain_id'] == domain_id) or
+                        ('project_id' in ref and project_ids is not None and
+                         ref['project_id'] in project_ids)):
+                    return False
+            if (inherited_to_projects is not None and
+                    inherited_to_projects != ('inherited_to_projects' in ref)):
+                return False
+            return True
+
+        return [ref for ref in assignments if _matches(ref)]
+
     @abc.abstractmethod
-    def list_role_assignments(self):
+    def list_role_assignments(self, role_id=None, user_id=None,
+                              group_ids=None, domain_id=None,
+                              project_ids=None, inherited_to_projects=None):
+        """List role assignments.
+
+        Each filter is ignored if it is None. The assignments of the user
+        and those of the groups are returned if either is specified, and
+        the assignments on the domain and those on the projects are returned
+        if either is specified.
+
+        :param role_id: role identifier
+        :param user_id: user identifier
+        :param group_ids: list of group identifiers
+        :param domain_id: domain identifier
+        :param project_ids: list of project identifiers
+        :param inherited_to_projects: whether the assignments are inherited
+                                      to the projects of their target
+        :returns: a list of role assignment dicts
 
+        """
         raise exception.NotImplemented()  # pragma: no cover
 
     # domain crud
@@ -1108,6 +1468,19 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def delete_projects(self, project_ids):
+        """Deletes existing projects, with their role assignments.
+
+        None of the projects may have children. Projects which don't exist
+        are ignored, so that an interrupted deletion can be carried on.
+
+        """
+        for project_id in project_ids:
+            try:
+                self.delete_project(project_id)
+            except exception.ProjectNotFound:
+                pass
+
     # role crud
 
     @abc.abstractmethod
@@ -1149,6 +1522,26 @@ class Driver(object):
         """
         raise exception.NotImplemented()
 
+    def get_effective_roles(self, user_id, group_ids, project_id):
+        """Get the roles a user has on a project, by any assignment.
+
+        This includes the roles assigned to the user and to its groups on the
+        project and, if the ``OS-INHERIT`` extension is enabled, the roles
+        inherited from the project's domain and from its parents.
+
+        :param user_id: user identifier
+        :type user_id: str
+        :param group_ids: identifiers of the groups of the user
+        :type group_ids: list
+        :param project_id: project identifier
+        :type project_id: str
+        :returns: list of role ids, without duplicates
+        :rtype: list
+        :raises: keystone.exception.NotImplemented if the roles can't be
+                 resolved by the driver in a single step
+        """
+        raise exception.NotImplemented()
+
     @abc.abstractmethod
     def get_role(self, role_id):
         """Get a role by ID.
@@ -176,12 +176,24 @@ class Routers(wsgi.RoutersBase):
                 'group_id': json_home.Parameters.GROUP_ID,
             })
 
+        role_assignment_controller = controllers.RoleAssignmentV3()
         routers.append(
-            router.Router(controllers.RoleAssignmentV3(),
+            router.Router(role_assignment_controller,
                           'role_assignments', 'role_assignment',
                           resource_descriptions=self.v3_resources,
                           is_entity_implemented=False))
 
+        # The grants in the request body are created or deleted in bulk. The
+        # collection is already described by the router above.
+        mapper.connect('/role_assignments',
+                       controller=role_assignment_controller,
+                       action='create_role_assignments',
+                       conditions=dict(method=['PUT']))
+        mapper.connect('/role_assignments',
+                       controller=role_assignment_controller,
+                       action='delete_role_assignments',
+                       conditions=dict(method=['DELETE']))
+
         if config.CONF.os_inherit.enabled:
             self._add_resource(
                 mapper, role_controller,
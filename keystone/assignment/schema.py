@@ -90,3 +90,50 @@ role_update = {
     'minProperties': 1,
     'additionalProperties': True
 }
+
+# NOTE: The IDs of users and groups may come from an external backend, so
+# they are not restricted to the characters of parameter_types.id_string.
+_entity_ref = {
+    'type': 'object',
+    'properties': {
+        'id': {
+            'type': 'string',
+            'minLength': 1,
+            'maxLength': 64
+        }
+    },
+    'required': ['id']
+}
+
+_role_assignment = {
+    'type': 'object',
+    'properties': {
+        'role': _entity_ref,
+        'user': _entity_ref,
+        'group': _entity_ref,
+        'scope': {
+            'type': 'object',
+            'properties': {
+                'domain': _entity_ref,
+                'project': _entity_ref,
+                'OS-INHERIT:inherited_to': {
+                    'type': 'string',
+                    'enum': ['projects']
+                }
+            },
+            # A role is assigned on either a domain or a project.
+            'oneOf': [{'required': ['domain']}, {'required': ['project']}],
+            'additionalProperties': False
+        }
+    },
+    'required': ['role', 'scope'],
+    # A role is assigned to either a user or a group.
+    'oneOf': [{'required': ['user']}, {'required': ['group']}],
+    'additionalProperties': False
+}
+
+role_assignments_bulk = {
+    'type': 'array',
+    'items': _role_assignment,
+    'minItems': 1
+}
@@ -14,8 +14,6 @@
 
 import sys
 
-from keystoneclient.common import cms
-from oslo.utils import timeutils
 import six
 
 from keystone.assignment import controllers as assignment_controllers
@@ -28,7 +26,6 @@ from keystone.contrib import federation
 from keystone import exception
 from keystone.i18n import _, _LI
 from keystone.openstack.common import importutils
-from keystone.openstack.common import jsonutils
 from keystone.openstack.common import log
 
 
@@ -532,19 +529,14 @@ class Auth(controller.V3Controller):
     def revocation_list(self, context, auth=None):
         if not CONF.token.revoke_by_id:
             raise exception.Gone()
-        tokens = self.token_provider_api.list_revoked_tokens()
-
-        for t in tokens:
-            expires = t['expires']
-            if not (expires and isinstance(expires, six.text_type)):
-                    t['expires'] = timeutils.isotime(expires)
-        data = {'revoked': tokens}
-        json_data = jsonutils.dumps(data)
-        signed_text = cms.cms_sign_text(json_data,
-                                        CONF.signing.certfile,
-                                        CONF.signing.keyfile)
-
-        return {'signed': signed_text}
+        # Answer a conditional request before paying for the signature.
+        etag = self.token_provider_api.get_revocation_list_etag()
+        if wsgi.etag_matches(context, etag):
+            return wsgi.render_not_modified(etag)
+        etag, signed_text = (
+            self.token_provider_api.get_signed_revocation_list())
+        return wsgi.render_conditional_response(
+            context, {'signed': signed_text}, etag)
 
     def get_auth_context(self, context):
         # TODO(dolphm): this method of accessing the auth context is terrible,
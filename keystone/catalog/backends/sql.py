@@ -13,7 +13,6 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import six
 import sqlalchemy
 
 from keystone import catalog
@@ -269,70 +268,26 @@ class Catalog(catalog.Driver):
             ref.extra = new_endpoint.extra
         return ref.to_dict()
 
-    def get_catalog(self, user_id, tenant_id, metadata=None):
-        substitutions = dict(six.iteritems(CONF))
-        substitutions.update({'tenant_id': tenant_id, 'user_id': user_id})
-
-        session = sql.get_session()
-        t = True  # variable for singleton for PEP8, E712.
-        endpoints = (session.query(Endpoint).
-                     options(sql.joinedload(Endpoint.service)).
-                     filter(Endpoint.enabled == t).all())
-
-        catalog = {}
-
-        for endpoint in endpoints:
-            if not endpoint.service['enabled']:
-                continue
-            try:
-                url = core.format_url(endpoint['url'], substitutions)
-            except exception.MalformedEndpoint:
-                continue  # this failure is already logged in format_url()
-
-            region = endpoint['region_id']
-            service_type = endpoint.service['type']
-            default_service = {
-                'id': endpoint['id'],
-                'name': endpoint.service['name'],
-                'publicURL': ''
-            }
-            catalog.setdefault(region, {})
-            catalog[region].setdefault(service_type, default_service)
-            interface_url = '%sURL' % endpoint['interface']
-            catalog[region][service_type][interface_url] = url
-
-        return catalog
-
-    def get_v3_catalog(self, user_id, tenant_id, metadata=None):
-        d = dict(six.iteritems(CONF))
-        d.update({'tenant_id': tenant_id,
-                  'user_id': user_id})
-
+    def _compile_catalog(self):
         session = sql.get_session()
         t = True  # variable for singleton for PEP8, E712.
         services = (session.query(Service).filter(Service.enabled == t).
                     options(sql.joinedload(Service.endpoints)).
                     all())
 
-        def make_v3_endpoints(endpoints):
-            for endpoint in (ep.to_dict() for ep in endpoints if ep.enabled):
-                del endpoint['service_id']
-                del endpoint['legacy_endpoint_id']
-                del endpoint['enabled']
-                endpoint['region'] = endpoint['region_id']
-                try:
-                    endpoint['url'] = core.format_url(endpoint['url'], d)
-                except exception.MalformedEndpoint:
-                    continue  # this failure is already logged in format_url()
-
-                yield endpoint
-
-        def make_v3_service(svc):
-            eps = list(make_v3_endpoints(svc.endpoints))
-            service = {'endpoints': eps, 'id': svc.id, 'type': svc.type}
-            name = svc.extra.get('name')
-            if name:
-                service['name'] = name
-            return service
-
-        return [make_v3_service(svc) for svc in services]
+        service_refs = []
+        for svc in services:
+            service_ref = svc.to_dict()
+            service_ref['endpoints'] = [ep.to_dict() for ep in svc.endpoints
+                                        if ep.enabled]
+            service_refs.append(service_ref)
+        return core.CompiledCatalog(service_refs)
+
+    def compile_catalog(self):
+        return self._compile_catalog()
+
+    def get_catalog(self, user_id, tenant_id, metadata=None):
+        return self._compile_catalog().render_v2(user_id, tenant_id)
+
+    def get_v3_catalog(self, user_id, tenant_id, metadata=None):
+        return self._compile_catalog().render_v3(user_id, tenant_id)
@@ -91,6 +91,7 @@ class Catalog(kvs.Catalog):
 
     def __init__(self, templates=None):
         super(Catalog, self).__init__()
+        self._url_templates = {}
         if templates:
             self.templates = templates
         else:
@@ -106,9 +107,19 @@ class Catalog(kvs.Catalog):
             LOG.critical(_LC('Unable to open template file %s'), template_file)
             raise
 
+    def _compile_url(self, url):
+        # NOTE: The templates are compiled when first rendered rather than
+        # when loaded, so that they can still be changed in place.
+        try:
+            return self._url_templates[url]
+        except KeyError:
+            template = core.compile_url(url,
+                                        core.get_config_substitutions())
+            self._url_templates[url] = template
+            return template
+
     def get_catalog(self, user_id, tenant_id, metadata=None):
-        substitutions = dict(six.iteritems(CONF))
-        substitutions.update({'tenant_id': tenant_id, 'user_id': user_id})
+        substitutions = {'tenant_id': tenant_id, 'user_id': user_id}
 
         catalog = {}
         for region, region_ref in six.iteritems(self.templates):
@@ -117,9 +128,10 @@ class Catalog(kvs.Catalog):
                 service_data = {}
                 try:
                     for k, v in six.iteritems(service_ref):
-                        service_data[k] = core.format_url(v, substitutions)
+                        service_data[k] = self._compile_url(v).render(
+                            substitutions)
                 except exception.MalformedEndpoint:
-                    continue  # this failure is already logged in format_url()
+                    continue  # this failure is already logged in UrlTemplate
                 catalog[region][service] = service_data
 
         return catalog
@@ -16,6 +16,8 @@
 """Main entry point into the Catalog service."""
 
 import abc
+import re
+import uuid
 
 import six
 
@@ -23,7 +25,6 @@ from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import manager
-from keystone.common import utils
 from keystone import config
 from keystone import exception
 from keystone.i18n import _
@@ -39,6 +40,125 @@ SHOULD_CACHE = cache.should_cache_fn('catalog')
 EXPIRATION_TIME = lambda: CONF.catalog.cache_time
 
 
+# A conversion specifier with a mapping key, like `%(port)d`, or `%%`.
+_FIELD_RE = re.compile(r'%(?:%|\((?P<key>[^)]*)\)'
+                       r'(?P<spec>[#0 +-]*\d*(?:\.\d+)?[hlL]?'
+                       r'[diouxXeEfFgGcrs]))')
+
+# The substitutions that vary per token, which are left in the URLs of a
+# compiled catalog.
+_TOKEN_SUBSTITUTIONS = ('tenant_id', 'user_id')
+
+
+class UrlTemplate(object):
+    """A user-defined URL split into literal text and substitution fields.
+
+    The URL is parsed once and its fields are checked against the
+    endpoint_substitution_whitelist, so that rendering it is only a join of
+    the literal text and the formatted values.
+
+    :param string url: the URL, with fields like `$(tenant_id)s`
+    :raises: keystone.exception.MalformedEndpoint
+
+    """
+
+    def __init__(self, url):
+        self.url = url
+        try:
+            template = url.replace('$(', '%(')
+        except AttributeError:
+            LOG.error(_('Malformed endpoint - %(url)r is not a string'),
+                      {"url": url})
+            raise exception.MalformedEndpoint(endpoint=url)
+
+        whitelist = CONF.catalog.endpoint_substitution_whitelist or []
+        # The literal text before each field, and after the last one.
+        self._literals = []
+        # The (key, conversion specifier) pair of each field.
+        self._fields = []
+        literal = []
+        pos = 0
+        while True:
+            start = template.find('%', pos)
+            if start == -1:
+                break
+            match = _FIELD_RE.match(template, start)
+            if match is None:
+                LOG.error(_LE("Malformed endpoint %s - incomplete format "
+                              "(are you missing a type notifier ?)"), url)
+                raise exception.MalformedEndpoint(endpoint=url)
+            literal.append(template[pos:start])
+            pos = match.end()
+            key = match.group('key')
+            if key is None:
+                literal.append('%')
+                continue
+            if key not in whitelist:
+                self._raise_unknown_key(key)
+            self._literals.append(''.join(literal))
+            self._fields.append((key, '%' + match.group('spec')))
+            literal = []
+        literal.append(template[pos:])
+        self._literals.append(''.join(literal))
+
+    def _raise_unknown_key(self, key):
+        LOG.error(_LE("Malformed endpoint %(url)s - unknown key %(keyerror)s"),
+                  {"url": self.url,
+                   "keyerror": key})
+        raise exception.MalformedEndpoint(endpoint=self.url)
+
+    def _format_field(self, key, spec, substitutions):
+        try:
+            return spec % (substitutions[key],)
+        except KeyError:
+            self._raise_unknown_key(key)
+        except TypeError as e:
+            LOG.error(_LE("Malformed endpoint '%(url)s'. The following type "
+                          "error occurred during string substitution: "
+                          "%(typeerror)s"),
+                      {"url": self.url,
+                       "typeerror": e})
+            raise exception.MalformedEndpoint(endpoint=self.url)
+
+    def render(self, substitutions):
+        """Returns the URL formatted with the given substitutions.
+
+        :param dict substitutions: the values of the fields
+        :raises: keystone.exception.MalformedEndpoint
+
+        """
+        literals = self._literals
+        if not self._fields:
+            return literals[0]
+        parts = [literals[0]]
+        for i, (key, spec) in enumerate(self._fields):
+            parts.append(self._format_field(key, spec, substitutions))
+            parts.append(literals[i + 1])
+        return ''.join(parts)
+
+    def partial(self, substitutions, remaining=()):
+        """Returns a template with the fields substituted but for some.
+
+        :param dict substitutions: the values of the fields
+        :param remaining: the keys of the fields left in the template
+        :raises: keystone.exception.MalformedEndpoint
+
+        """
+        template = UrlTemplate.__new__(UrlTemplate)
+        template.url = self.url
+        template._literals = [self._literals[0]]
+        template._fields = []
+        for i, (key, spec) in enumerate(self._fields):
+            if key in remaining:
+                template._fields.append((key, spec))
+                template._literals.append(self._literals[i + 1])
+            else:
+                template._literals[-1] += (
+                    self._format_field(key, spec, substitutions) +
+                    self._literals[i + 1])
+        return template
+
+
 def format_url(url, substitutions):
     """Formats a user-defined URL with the given substitutions.
 
@@ -47,31 +167,195 @@ def format_url(url, substitutions):
     :returns: a formatted URL
 
     """
-    substitutions = utils.WhiteListedItemFilter(
-        CONF.catalog.endpoint_substitution_whitelist,
-        substitutions)
-    try:
-        result = url.replace('$(', '%(') % substitutions
-    except AttributeError:
-        LOG.error(_('Malformed endpoint - %(url)r is not a string'),
-                  {"url": url})
-        raise exception.MalformedEndpoint(endpoint=url)
-    except KeyError as e:
-        LOG.error(_LE("Malformed endpoint %(url)s - unknown key %(keyerror)s"),
-                  {"url": url,
-                   "keyerror": e})
-        raise exception.MalformedEndpoint(endpoint=url)
-    except TypeError as e:
-        LOG.error(_LE("Malformed endpoint '%(url)s'. The following type error "
-                      "occurred during string substitution: %(typeerror)s"),
-                  {"url": url,
-                   "typeerror": e})
-        raise exception.MalformedEndpoint(endpoint=url)
-    except ValueError as e:
-        LOG.error(_LE("Malformed endpoint %s - incomplete format "
-                      "(are you missing a type notifier ?)"), url)
-        raise exception.MalformedEndpoint(endpoint=url)
-    return result
+    return UrlTemplate(url).render(substitutions)
+
+
+def get_config_substitutions():
+    """Returns the configuration values that URLs can substitute.
+
+    :returns: a dictionary of the whitelisted configuration options
+
+    """
+    whitelist = CONF.catalog.endpoint_substitution_whitelist or []
+    return dict((key, CONF[key]) for key in whitelist if key in CONF)
+
+
+def compile_url(url, substitutions):
+    """Compiles a user-defined URL but for the per-token substitutions.
+
+    :param string url: the URL to be compiled
+    :param dict substitutions: the dictionary used for substitution, usually
+                               the configuration
+    :returns: a UrlTemplate to be rendered with `tenant_id` and `user_id`
+    :raises: keystone.exception.MalformedEndpoint
+
+    """
+    return UrlTemplate(url).partial(substitutions, _TOKEN_SUBSTITUTIONS)
+
+
+class CompiledCatalog(object):
+    """The enabled services and endpoints of a catalog, ready to render.
+
+    The endpoint URLs are formatted with the configuration values when the
+    catalog is compiled, so that rendering the catalog of a token only
+    substitutes `tenant_id` and `user_id`. Endpoints with a malformed URL are
+    left out.
+
+    :param services: the enabled service refs, each with the list of its
+                     enabled endpoint refs under 'endpoints'
+    :param generation: the catalog generation the services were read at
+
+    """
+
+    def __init__(self, services, generation=None):
+        self.generation = generation
+        substitutions = get_config_substitutions()
+
+        self._services = []
+        for service_ref in services:
+            service = {'id': service_ref['id'], 'type': service_ref['type']}
+            if service_ref.get('name'):
+                service['name'] = service_ref['name']
+            endpoints = []
+            for endpoint_ref in service_ref['endpoints']:
+                try:
+                    url = compile_url(endpoint_ref['url'], substitutions)
+                except exception.MalformedEndpoint:
+                    continue  # this failure is already logged in UrlTemplate
+                endpoint = dict(
+                    (k, v) for k, v in six.iteritems(endpoint_ref)
+                    if k not in ('service_id', 'legacy_endpoint_id',
+                                 'enabled', 'url'))
+                endpoint['region'] = endpoint['region_id']
+                endpoints.append((endpoint, url))
+            self._services.append((service, service_ref.get('name'),
+                                   endpoints))
+
+    def render_v2(self, user_id, tenant_id):
+        """Renders the V2 catalog of a token.
+
+        See :meth:`Driver.get_catalog` for the format.
+
+        """
+        substitutions = {'tenant_id': tenant_id, 'user_id': user_id}
+        catalog = {}
+        for service, name, endpoints in self._services:
+            for endpoint, url in endpoints:
+                try:
+                    url = url.render(substitutions)
+                except exception.MalformedEndpoint:
+                    continue  # this failure is already logged in UrlTemplate
+                region = endpoint['region_id']
+                default_service = {
+                    'id': endpoint['id'],
+                    'name': name,
+                    'publicURL': ''
+                }
+                catalog.setdefault(region, {})
+                catalog[region].setdefault(service['type'], default_service)
+                interface_url = '%sURL' % endpoint['interface']
+                catalog[region][service['type']][interface_url] = url
+        return catalog
+
+    def render_v3(self, user_id, tenant_id):
+        """Renders the V3 catalog of a token.
+
+        See :meth:`Driver.get_v3_catalog` for the format.
+
+        """
+        substitutions = {'tenant_id': tenant_id, 'user_id': user_id}
+        catalog = []
+        for service, name, endpoints in self._services:
+            service = service.copy()
+            service['endpoints'] = []
+            for endpoint, url in endpoints:
+                try:
+                    url = url.render(substitutions)
+                except exception.MalformedEndpoint:
+                    continue  # this failure is already logged in UrlTemplate
+                endpoint = endpoint.copy()
+                endpoint['url'] = url
+                service['endpoints'].append(endpoint)
+            catalog.append(service)
+        return catalog
+
+
+def _log_circular_region_reference(region_id):
+    LOG.error(_LE('Circular reference or a repeated entry found in region '
+                  'tree - %(region_id)s.'), {'region_id': region_id})
+
+
+class RegionTree(object):
+    """The regions of a catalog, with the endpoints of each region.
+
+    The tree keeps a pointer from every region to its parent and to its
+    children, and indexes the endpoints by service and region, so that
+    walking the tree in either direction only costs the regions and
+    endpoints that are returned.
+
+    :param regions: the region refs of the catalog
+    :param endpoints: the endpoint refs of the catalog
+    :param generation: the catalog generation the refs were read at
+
+    """
+
+    def __init__(self, regions, endpoints, generation=None):
+        self.generation = generation
+        self._parents = {}
+        self._children = {}
+        for region in regions:
+            parent_region_id = region.get('parent_region_id')
+            self._parents[region['id']] = parent_region_id
+            if parent_region_id is not None:
+                self._children.setdefault(parent_region_id, []).append(
+                    region['id'])
+
+        self._endpoints_by_service = {}
+        self._endpoints_by_region = {}
+        for endpoint in endpoints:
+            service_id = endpoint['service_id']
+            self._endpoints_by_service.setdefault(service_id, []).append(
+                endpoint)
+            self._endpoints_by_region.setdefault(
+                (service_id, endpoint.get('region_id')), []).append(endpoint)
+
+    def list_endpoints_for_service(self, service_id):
+        """Lists the endpoints of a service, in any region."""
+        return [endpoint.copy() for endpoint in
+                self._endpoints_by_service.get(service_id, [])]
+
+    def list_endpoints_for_service_and_region(self, service_id, region_id):
+        """Lists the endpoints of a service in a region and its subregions."""
+        endpoints = []
+        regions_examined = set()
+        regions_to_examine = [region_id]
+        while regions_to_examine:
+            region_id = regions_to_examine.pop()
+            if region_id in regions_examined:
+                _log_circular_region_reference(region_id)
+                continue
+            regions_examined.add(region_id)
+            endpoints.extend(
+                endpoint.copy() for endpoint in
+                self._endpoints_by_region.get((service_id, region_id), []))
+            regions_to_examine.extend(
+                reversed(self._children.get(region_id, [])))
+        return endpoints
+
+    def get_region_lineage(self, region_id):
+        """Yields a region, then each of its parents up to the root.
+
+        The walk stops at a region that is not in the tree.
+
+        """
+        regions_examined = set()
+        while region_id is not None:
+            if region_id in regions_examined:
+                _log_circular_region_reference(region_id)
+                return
+            regions_examined.add(region_id)
+            yield region_id
+            region_id = self._parents.get(region_id)
 
 
 @dependency.provider('catalog_api')
@@ -88,6 +372,74 @@ class Manager(manager.Manager):
 
     def __init__(self):
         super(Manager, self).__init__(CONF.catalog.driver)
+        self._compiled_catalog = None
+        self._region_tree = None
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_catalog_generation(self):
+        # NOTE: Each process keeps the catalog it compiled for as long as the
+        # generation it was compiled at is current. Any change to a region,
+        # a service or an endpoint invalidates the generation, and the next
+        # call returns a new one.
+        return uuid.uuid4().hex
+
+    def _invalidate_catalog_generation(self):
+        self._get_catalog_generation.invalidate(self)
+
+    def _get_compiled_catalog(self):
+        # The generation is read before the catalog, so that a change made
+        # while compiling is picked up by the next call.
+        generation = self._get_catalog_generation()
+        compiled = self._compiled_catalog
+        if compiled is None or compiled.generation != generation:
+            compiled = self.driver.compile_catalog()
+            if compiled is not None:
+                compiled.generation = generation
+            self._compiled_catalog = compiled
+        return compiled
+
+    def get_region_tree(self):
+        """Returns the region tree of the current catalog generation.
+
+        :returns: a :class:`RegionTree`
+
+        """
+        generation = self._get_catalog_generation()
+        tree = self._region_tree
+        if tree is None or tree.generation != generation:
+            tree = RegionTree(self.driver.list_regions(driver_hints.Hints()),
+                              self.driver.list_endpoints(
+                                  driver_hints.Hints()),
+                              generation=generation)
+            self._region_tree = tree
+        return tree
+
+    def get_region_lineage(self, region_id):
+        """Yields a region, then each of its parents up to the root.
+
+        The walk stops at a region that does not exist. The region tree is
+        only used when catalog caching is enabled, since it is otherwise
+        rebuilt from all the regions and endpoints on every call, and the
+        parents are looked up one at a time instead.
+
+        """
+        if SHOULD_CACHE(None):
+            return self.get_region_tree().get_region_lineage(region_id)
+        return self._walk_region_parents(region_id)
+
+    def _walk_region_parents(self, region_id):
+        regions_examined = set()
+        while region_id is not None:
+            if region_id in regions_examined:
+                _log_circular_region_reference(region_id)
+                return
+            regions_examined.add(region_id)
+            yield region_id
+            try:
+                region_id = self.get_region(region_id).get('parent_region_id')
+            except exception.RegionNotFound:
+                return
 
     @notifications.created(_REGION, public=False, result_id_arg_attr='id')
     def create_region(self, region_ref):
@@ -105,10 +457,12 @@ class Manager(manager.Manager):
         # set it to an empty string.
         region_ref.setdefault('description', '')
         try:
-            return self.driver.create_region(region_ref)
+            ret = self.driver.create_region(region_ref)
         except exception.NotFound:
             parent_region_id = region_ref.get('parent_region_id')
             raise exception.RegionNotFound(region_id=parent_region_id)
+        self._invalidate_catalog_generation()
+        return ret
 
     @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
                         expiration_time=EXPIRATION_TIME)
@@ -120,13 +474,17 @@ class Manager(manager.Manager):
 
     @notifications.updated(_REGION, public=False)
     def update_region(self, region_id, region_ref):
-        return self.driver.update_region(region_id, region_ref)
+        ret = self.driver.update_region(region_id, region_ref)
+        self.get_region.invalidate(self, region_id)
+        self._invalidate_catalog_generation()
+        return ret
 
     @notifications.deleted(_REGION, public=False)
     def delete_region(self, region_id):
         try:
             ret = self.driver.delete_region(region_id)
             self.get_region.invalidate(self, region_id)
+            self._invalidate_catalog_generation()
             return ret
         except exception.NotFound:
             raise exception.RegionNotFound(region_id=region_id)
@@ -138,7 +496,9 @@ class Manager(manager.Manager):
     @notifications.created(_SERVICE, public=False)
     def create_service(self, service_id, service_ref):
         service_ref.setdefault('enabled', True)
-        return self.driver.create_service(service_id, service_ref)
+        ret = self.driver.create_service(service_id, service_ref)
+        self._invalidate_catalog_generation()
+        return ret
 
     @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
                         expiration_time=EXPIRATION_TIME)
@@ -150,7 +510,9 @@ class Manager(manager.Manager):
 
     @notifications.updated(_SERVICE, public=False)
     def update_service(self, service_id, service_ref):
-        return self.driver.update_service(service_id, service_ref)
+        ret = self.driver.update_service(service_id, service_ref)
+        self._invalidate_catalog_generation()
+        return ret
 
     @notifications.deleted(_SERVICE, public=False)
     def delete_service(self, service_id):
@@ -161,6 +523,7 @@ class Manager(manager.Manager):
             for endpoint in endpoints:
                 if endpoint['service_id'] == service_id:
                     self.get_endpoint.invalidate(self, endpoint['id'])
+            self._invalidate_catalog_generation()
             return ret
         except exception.NotFound:
             raise exception.ServiceNotFound(service_id=service_id)
@@ -172,23 +535,29 @@ class Manager(manager.Manager):
     @notifications.created(_ENDPOINT, public=False)
     def create_endpoint(self, endpoint_id, endpoint_ref):
         try:
-            return self.driver.create_endpoint(endpoint_id, endpoint_ref)
+            ret = self.driver.create_endpoint(endpoint_id, endpoint_ref)
         except exception.RegionNotFound:
             raise exception.ValidationError(attribute='endpoint region_id',
                                             target='region table')
         except exception.NotFound:
             service_id = endpoint_ref.get('service_id')
             raise exception.ServiceNotFound(service_id=service_id)
+        self._invalidate_catalog_generation()
+        return ret
 
     @notifications.updated(_ENDPOINT, public=False)
     def update_endpoint(self, endpoint_id, endpoint_ref):
-        return self.driver.update_endpoint(endpoint_id, endpoint_ref)
+        ret = self.driver.update_endpoint(endpoint_id, endpoint_ref)
+        self.get_endpoint.invalidate(self, endpoint_id)
+        self._invalidate_catalog_generation()
+        return ret
 
     @notifications.deleted(_ENDPOINT, public=False)
     def delete_endpoint(self, endpoint_id):
         try:
             ret = self.driver.delete_endpoint(endpoint_id)
             self.get_endpoint.invalidate(self, endpoint_id)
+            self._invalidate_catalog_generation()
             return ret
         except exception.NotFound:
             raise exception.EndpointNotFound(endpoint_id=endpoint_id)
@@ -206,11 +575,20 @@ class Manager(manager.Manager):
         return self.driver.list_endpoints(hints or driver_hints.Hints())
 
     def get_catalog(self, user_id, tenant_id, metadata=None):
+        compiled = self._get_compiled_catalog()
+        if compiled is not None:
+            return compiled.render_v2(user_id, tenant_id)
         try:
             return self.driver.get_catalog(user_id, tenant_id, metadata)
         except exception.NotFound:
             raise exception.NotFound('Catalog not found for user and tenant')
 
+    def get_v3_catalog(self, user_id, tenant_id, metadata=None):
+        compiled = self._get_compiled_catalog()
+        if compiled is not None:
+            return compiled.render_v3(user_id, tenant_id)
+        return self.driver.get_v3_catalog(user_id, tenant_id, metadata)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Driver(object):
@@ -219,6 +597,20 @@ class Driver(object):
     def _get_list_limit(self):
         return CONF.catalog.list_limit or CONF.list_limit
 
+    def compile_catalog(self):
+        """Compile the current service catalog.
+
+        Drivers that can list their enabled services and endpoints return a
+        :class:`CompiledCatalog`, which the manager keeps until the catalog
+        changes. The default implementation returns None, so that the
+        catalog of every token is retrieved with :meth:`get_catalog` and
+        :meth:`get_v3_catalog`.
+
+        :returns: keystone.catalog.core.CompiledCatalog or None
+
+        """
+        return None
+
     @abc.abstractmethod
     def create_region(self, region_ref):
         """Creates a new region.
@@ -25,6 +25,7 @@ from keystone.common import sql
 from keystone.common.sql import migration_helpers
 from keystone.common import utils
 from keystone import config
+from keystone.contrib import revoke
 from keystone.i18n import _
 from keystone import identity
 from keystone.openstack.common import log
@@ -176,6 +177,17 @@ class TokenFlush(BaseApp):
         token_manager.driver.flush_expired_tokens()
 
 
+class RevocationFlush(BaseApp):
+    """Flush expired revocation events from the backend."""
+
+    name = 'revocation_flush'
+
+    @classmethod
+    def main(cls):
+        revoke_manager = revoke.Manager()
+        revoke_manager.driver.prune_expired_events()
+
+
 class MappingPurge(BaseApp):
     """Purge the mapping table."""
 
@@ -274,6 +286,7 @@ CMDS = [
     DbVersion,
     MappingPurge,
     PKISetup,
+    RevocationFlush,
     SamlIdentityProviderMetadata,
     SSLSetup,
     TokenFlush,
@@ -178,6 +178,13 @@ FILE_OPTIONS = {
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned in '
                         'an identity collection.'),
+        cfg.BoolOpt('caching', default=True,
+                    help='Toggle for identity caching. This has no effect '
+                         'unless global caching is enabled.'),
+        cfg.IntOpt('cache_time', default=60,
+                   help='TTL (in seconds) to cache the group memberships of '
+                        'users. This has no effect unless global and '
+                        'identity caching are enabled.'),
     ],
     'identity_mapping': [
         cfg.StrOpt('driver',
@@ -250,14 +257,25 @@ FILE_OPTIONS = {
                     help='Toggle for token system caching. This has no '
                          'effect unless global caching is enabled.'),
         cfg.IntOpt('revocation_cache_time', default=3600,
-                   help='Time to cache the revocation list and the revocation '
-                        'events if revoke extension is enabled (in seconds). '
-                        'This has no effect unless global and token '
-                        'caching are enabled.'),
+                   help='Time to cache the revocation list and its '
+                        'signed document (in seconds). This has no effect '
+                        'unless global and token caching are enabled.'),
         cfg.IntOpt('cache_time',
                    help='Time to cache tokens (in seconds). This has no '
                         'effect unless global and token caching are '
                         'enabled.'),
+        cfg.IntOpt('invalid_cache_time', default=5,
+                   help='Time (in seconds) each keystone process remembers '
+                        'that a token ID is invalid, to reject it again '
+                        'without reading the backend. Set to 0 to '
+                        'disable.'),
+        cfg.IntOpt('invalid_cache_size', default=10000,
+                   help='Maximum number of invalid token IDs each keystone '
+                        'process remembers.'),
+        cfg.IntOpt('invalid_cache_stats_interval', default=300,
+                   help='Interval (in seconds) at which each keystone '
+                        'process logs the hit, miss and eviction counts of '
+                        'its invalid token cache. Set to 0 to disable.'),
         cfg.BoolOpt('revoke_by_id', default=True,
                     help='Revoke token by token identifier. Setting '
                     'revoke_by_id to true enables various forms of '
@@ -284,8 +302,20 @@ FILE_OPTIONS = {
                         'expiration before a revocation event may be removed '
                         'from the backend.'),
         cfg.BoolOpt('caching', default=True,
-                    help='Toggle for revocation event caching. This has no '
-                         'effect unless global caching is enabled.'),
+                    help='Toggle for caching revocation events in each '
+                         'process. If disabled, new revocation events are '
+                         'fetched from the backend for every token '
+                         'validation.'),
+        cfg.IntOpt('sync_interval', default=5,
+                   help='Maximum time (in seconds) a process checks tokens '
+                        'against its cached revocation events before '
+                        'fetching the events revoked since the last fetch.'),
+        cfg.IntOpt('prune_interval', default=600,
+                   help='Minimum time (in seconds) between removals of '
+                        'expired revocation events from the backend by each '
+                        'process. Set to 0 to disable, for instance when '
+                        'running "keystone-manage revocation_flush" '
+                        'periodically instead.'),
     ],
     'cache': [
         cfg.StrOpt('config_prefix', default='cache.keystone',
@@ -396,6 +426,17 @@ FILE_OPTIONS = {
                             'CN=www.example.com'),
                    help='Certificate subject (auto generated certificate) for '
                         'token signing.'),
+        cfg.IntOpt('worker_pool_size', default=4,
+                   help='Number of long-lived workers signing PKI tokens and '
+                        'revocation lists. Set to 0 to sign in the thread '
+                        'handling the request.'),
+        cfg.IntOpt('worker_queue_size', default=100,
+                   help='Maximum number of signing requests waiting for a '
+                        'worker.'),
+        cfg.IntOpt('worker_timeout', default=10,
+                   help='Time (in seconds) a signing request waits to be '
+                        'queued, and then to be signed, before being '
+                        'rejected.'),
     ],
     'assignment': [
         # assignment has no default for backward compatibility reasons.
@@ -458,6 +499,13 @@ FILE_OPTIONS = {
         cfg.BoolOpt('return_all_endpoints_if_no_filter', default=True,
                     help='Toggle to return all active endpoints if no filter '
                          'exists.'),
+        cfg.BoolOpt('caching', default=True,
+                    help='Toggle for endpoint filter caching. This has no '
+                         'effect unless global caching is enabled.'),
+        cfg.IntOpt('cache_time',
+                   help='Time to cache the filtered catalogs of projects (in '
+                        'seconds). This has no effect unless global and '
+                        'endpoint filter caching are enabled.'),
     ],
     'endpoint_policy': [
         cfg.StrOpt('driver',
@@ -270,13 +270,20 @@ class KeyValueStore(object):
             raise exception.NotFound(target=key)
         return value
 
-    def get_multi(self, keys):
-        """Get multiple values in a single call from the KVS backend."""
+    def get_multi(self, keys, default=NO_VALUE):
+        """Get multiple values in a single call from the KVS backend.
+
+        If `default` is passed, it is returned in place of the value of any
+        non-existent key instead of raising NotFound.
+        """
         self._assert_configured()
         values = self._region.get_multi(keys)
         not_found = []
         for index, key in enumerate(keys):
             if values[index] is NO_VALUE:
+                if default is not NO_VALUE:
+                    values[index] = default
+                    continue
                 not_found.append(key)
         if not_found:
             # NOTE(morganfainberg): If any of the multi-get values are non-
@@ -0,0 +1,391 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process CMS signing.
+
+The signing functions of :mod:`keystoneclient.common.cms` fork an ``openssl
+cms -sign`` process for every document.  The functions of this module produce
+the same output, byte for byte, from a signing certificate and key loaded
+once and kept in memory.
+
+In-process signing requires the optional ``cryptography`` library, 1.4 or
+later, and an RSA signing key.  When either is missing, or the key cannot be
+loaded, signing falls back to :mod:`keystoneclient.common.cms`.
+
+Documents are signed by a pool of long-lived worker threads, which bounds the
+number of signatures (or openssl processes) in progress at once and queues
+the other requests, see ``[signing] worker_pool_size``.
+
+"""
+
+import base64
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+
+from keystoneclient.common import cms
+import six
+
+from keystone import config
+from keystone import exception
+from keystone.i18n import _LW
+from keystone.openstack.common import log
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives import serialization
+    from cryptography import x509
+except ImportError:
+    x509 = None
+
+
+CONF = config.CONF
+LOG = log.getLogger(__name__)
+
+PKIZ_PREFIX = 'PKIZ_'
+PKIZ_COMPRESSION_LEVEL = 6
+
+# DER encoding of the object identifiers used in the signed documents.
+_OID_DATA = b'\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x07\x01'
+_OID_SIGNED_DATA = b'\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x07\x02'
+_OID_SHA256 = b'\x06\x09\x60\x86\x48\x01\x65\x03\x04\x02\x01'
+_OID_RSA_ENCRYPTION = b'\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x01\x01'
+_NULL = b'\x05\x00'
+
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_SEQUENCE = 0x30
+_SET = 0x31
+_EXPLICIT_0 = 0xa0
+
+# NOTE: openssl converts the end of lines of the signed content to CRLF, as
+# it is not given the -binary option.
+_END_OF_LINE = re.compile(b'\r*\n')
+
+_signers = {}
+_signers_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _der(tag, content):
+    length = len(content)
+    if length < 0x80:
+        encoded_length = six.int2byte(length)
+    else:
+        encoded_length = b''
+        while length:
+            encoded_length = six.int2byte(length & 0xff) + encoded_length
+            length >>= 8
+        encoded_length = (six.int2byte(0x80 | len(encoded_length)) +
+                          encoded_length)
+    return six.int2byte(tag) + encoded_length + content
+
+
+def _der_elements(data):
+    """Split DER encoded values, returning them with their header."""
+    elements = []
+    offset = 0
+    while offset < len(data):
+        length = six.indexbytes(data, offset + 1)
+        header = 2
+        if length & 0x80:
+            header += length & 0x7f
+            length = 0
+            for i in range(offset + 2, offset + header):
+                length = (length << 8) | six.indexbytes(data, i)
+        elements.append((data[offset:offset + header + length],
+                         data[offset + header:offset + header + length]))
+        offset += header + length
+    return elements
+
+
+class CMSSigner(object):
+    """Signs documents with a certificate and an RSA key.
+
+    The documents are CMS signed data, as produced by ``openssl cms -sign
+    -nosmimecap -nodetach -nocerts -noattr -md sha256``.
+
+    """
+
+    def __init__(self, certfile, keyfile):
+        if x509 is None:
+            raise ValueError('cryptography is not available')
+        backend = default_backend()
+        with open(certfile, 'rb') as f:
+            cert = x509.load_pem_x509_certificate(f.read(), backend)
+        with open(keyfile, 'rb') as f:
+            key = serialization.load_pem_private_key(f.read(), None, backend)
+        if not isinstance(key, rsa.RSAPrivateKey):
+            raise ValueError('Only RSA signing keys are supported')
+        if not hasattr(key, 'sign'):
+            # NOTE: RSAPrivateKey.sign() was added in cryptography 1.4.
+            raise ValueError('cryptography 1.4 or later is required')
+        self._key = key
+
+        # NOTE: The signer is identified by the issuer and serial number of
+        # its certificate, copied as they are encoded in the certificate.
+        tbs_certificate = _der_elements(cert.tbs_certificate_bytes)[0][1]
+        fields = [value for value, content in _der_elements(tbs_certificate)]
+        if six.indexbytes(fields[0], 0) == _EXPLICIT_0:
+            fields = fields[1:]
+        serial, issuer = fields[0], fields[2]
+        self._issuer_and_serial = _der(_SEQUENCE, issuer + serial)
+
+    def sign(self, data):
+        """Return the DER encoded signed data of `data` (bytes)."""
+        data = _END_OF_LINE.sub(b'\r\n', data)
+        signature = self._key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+        digest_algorithm = _der(_SEQUENCE, _OID_SHA256)
+        signer_info = _der(_SEQUENCE, b''.join([
+            _der(_INTEGER, b'\x01'),
+            self._issuer_and_serial,
+            digest_algorithm,
+            _der(_SEQUENCE, _OID_RSA_ENCRYPTION + _NULL),
+            _der(_OCTET_STRING, signature)]))
+        signed_data = _der(_SEQUENCE, b''.join([
+            _der(_INTEGER, b'\x01'),
+            _der(_SET, digest_algorithm),
+            _der(_SEQUENCE, _OID_DATA + _der(
+                _EXPLICIT_0, _der(_OCTET_STRING, data))),
+            _der(_SET, signer_info)]))
+        return _der(_SEQUENCE, _OID_SIGNED_DATA + _der(_EXPLICIT_0,
+                                                       signed_data))
+
+
+def get_signer(certfile, keyfile):
+    """Return the signer for a certificate and key, or None.
+
+    Signers are kept in memory, and reloaded when the certificate or key file
+    is modified.
+
+    """
+    try:
+        mtimes = (os.stat(certfile).st_mtime, os.stat(keyfile).st_mtime)
+    except OSError:
+        return None
+
+    key = (certfile, keyfile)
+    signer_mtimes, signer = _signers.get(key, (None, None))
+    if signer_mtimes == mtimes:
+        return signer
+
+    with _signers_lock:
+        signer_mtimes, signer = _signers.get(key, (None, None))
+        if signer_mtimes != mtimes:
+            try:
+                signer = CMSSigner(certfile, keyfile)
+            except (IOError, ValueError, TypeError) as e:
+                LOG.warning(_LW('Unable to load %(certfile)s and %(keyfile)s '
+                                'for in-process signing, falling back to '
+                                'openssl: %(error)s'),
+                            {'certfile': certfile, 'keyfile': keyfile,
+                             'error': e})
+                signer = None
+            _signers[key] = (mtimes, signer)
+    return signer
+
+
+def _to_bytes(text):
+    if isinstance(text, six.text_type):
+        return text.encode('utf-8')
+    return text
+
+
+def _to_pem(der):
+    encoded = base64.b64encode(der).decode('ascii')
+    lines = [encoded[i:i + 64] for i in range(0, len(encoded), 64)]
+    return '-----BEGIN CMS-----\n%s\n-----END CMS-----\n' % '\n'.join(lines)
+
+
+class SigningPool(object):
+    """A pool of long-lived workers signing documents.
+
+    Requests are queued for the workers, up to `queue_size` of them.  A
+    request is rejected when no room is made in the queue within `timeout`
+    seconds, or when it is not signed within `timeout` seconds of being
+    queued.
+
+    """
+
+    def __init__(self, size, queue_size, timeout):
+        self._queue = six.moves.queue.Queue(queue_size)
+        self._timeout = timeout
+        self._stats_lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._workers = []
+        for i in range(size):
+            worker = threading.Thread(target=self._run,
+                                      name='signing-worker-%d' % i)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            try:
+                if not request.cancelled:
+                    request.run()
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args):
+        """Call `fn` with `args` in a worker, and return its result."""
+        request = _SigningRequest(fn, args)
+        start = time.time()
+        try:
+            self._queue.put(request, timeout=self._timeout)
+        except six.moves.queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            LOG.warning(_LW('Signing queue is full, rejecting request.'))
+            raise exception.SigningUnavailable()
+
+        # NOTE: Event.wait() only returns the flag from python 2.7 on.
+        request.done.wait(self._timeout)
+        if not request.done.is_set():
+            request.cancelled = True
+            with self._stats_lock:
+                self._timed_out += 1
+            LOG.warning(_LW('Signing request timed out after %s seconds.'),
+                        self._timeout)
+            raise exception.SigningUnavailable()
+
+        if request.exc_info is not None:
+            with self._stats_lock:
+                self._failed += 1
+            six.reraise(*request.exc_info)
+
+        latency = time.time() - start
+        with self._stats_lock:
+            self._completed += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+        LOG.debug('Signed in %(latency).3fs, %(depth)d requests queued.',
+                  {'latency': latency, 'depth': self._queue.qsize()})
+        return request.result
+
+    def get_stats(self):
+        """Return the queue depth and signing latency of the pool.
+
+        Latencies are in seconds, include the time spent in the queue, and
+        are only those of the requests completed without error.
+
+        """
+        with self._stats_lock:
+            completed = self._completed
+            return {
+                'workers': len(self._workers),
+                'queue_depth': self._queue.qsize(),
+                'completed': completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'average_latency': (self._total_latency / completed
+                                    if completed else 0.0),
+                'max_latency': self._max_latency,
+            }
+
+
+class _SigningRequest(object):
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.done = threading.Event()
+        self.cancelled = False
+        self.result = None
+        self.exc_info = None
+
+    def run(self):
+        try:
+            self.result = self.fn(*self.args)
+        except Exception:
+            self.exc_info = sys.exc_info()
+        finally:
+            self.done.set()
+
+
+def get_pool():
+    """Return the signing pool, or None if signing is done by the caller."""
+    global _pool
+    if CONF.signing.worker_pool_size <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SigningPool(CONF.signing.worker_pool_size,
+                                    CONF.signing.worker_queue_size,
+                                    CONF.signing.worker_timeout)
+    return _pool
+
+
+def _submit(fn, *args):
+    pool = get_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args)
+
+
+def _cms_sign_text(text, signing_cert_file_name, signing_key_file_name):
+    signer = get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return cms.cms_sign_text(text, signing_cert_file_name,
+                                 signing_key_file_name)
+    return _to_pem(signer.sign(_to_bytes(text)))
+
+
+def _cms_sign_token(text, signing_cert_file_name, signing_key_file_name):
+    signer = get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return cms.cms_sign_token(text, signing_cert_file_name,
+                                  signing_key_file_name)
+    return cms.cms_to_token(_to_pem(signer.sign(_to_bytes(text))))
+
+
+def _pkiz_sign(text, signing_cert_file_name, signing_key_file_name):
+    signer = get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return cms.pkiz_sign(text, signing_cert_file_name,
+                             signing_key_file_name)
+    compressed = zlib.compress(signer.sign(_to_bytes(text)),
+                               PKIZ_COMPRESSION_LEVEL)
+    return PKIZ_PREFIX + base64.urlsafe_b64encode(compressed).decode('utf-8')
+
+
+def cms_sign_text(text, signing_cert_file_name, signing_key_file_name):
+    """Sign `text`, returning a PEM encoded CMS document."""
+    return _submit(_cms_sign_text, text, signing_cert_file_name,
+                   signing_key_file_name)
+
+
+def cms_sign_token(text, signing_cert_file_name, signing_key_file_name):
+    """Sign `text`, returning a PKI token."""
+    return _submit(_cms_sign_token, text, signing_cert_file_name,
+                   signing_key_file_name)
+
+
+def pkiz_sign(text, signing_cert_file_name, signing_key_file_name):
+    """Sign and compress `text`, returning a PKIZ token."""
+    return _submit(_pkiz_sign, text, signing_cert_file_name,
+                   signing_key_file_name)
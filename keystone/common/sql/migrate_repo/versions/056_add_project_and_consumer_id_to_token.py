@@ -0,0 +1,87 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Adds `project_id` and `consumer_id` columns to the `token` table.
+
+The project and the OAuth consumer of a token were only stored in the `extra`
+JSON, so filtering tokens by project or consumer required loading and parsing
+every token of the user.
+
+To upgrade, the indexed columns are added and populated from the `extra` JSON
+of the tokens that are still valid; expired and revoked tokens are never
+filtered on these columns.  Indexes are also added on `user_id` and
+`trust_id`, which token revocation filters on.
+
+"""
+
+from oslo.utils import timeutils
+import sqlalchemy as sql
+
+from keystone.openstack.common import jsonutils
+
+
+_TOKEN_TABLE_NAME = 'token'
+
+_INDEXES = [('ix_token_user_id', 'user_id'),
+            ('ix_token_trust_id', 'trust_id'),
+            ('ix_token_project_id', 'project_id'),
+            ('ix_token_consumer_id', 'consumer_id')]
+
+
+def _migrate_ids_from_extra(migrate_engine, token_table):
+    query = sql.select([token_table.c.id, token_table.c.extra])
+    query = query.where(token_table.c.valid == sql.sql.expression.true())
+    query = query.where(token_table.c.expires > timeutils.utcnow())
+
+    for token in list(migrate_engine.execute(query)):
+        extra_dict = jsonutils.loads(token.extra)
+        tenant = extra_dict.get('tenant') or {}
+        token_data = extra_dict.get('token_data') or {}
+        oauth = token_data.get('token', {}).get('OS-OAUTH1') or {}
+        new_values = {
+            'project_id': tenant.get('id'),
+            'consumer_id': oauth.get('consumer_id'),
+        }
+        if not any(new_values.values()):
+            continue
+        f = token_table.c.id == token.id
+        update = token_table.update().where(f).values(new_values)
+        migrate_engine.execute(update)
+
+
+def upgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    token_table = sql.Table(_TOKEN_TABLE_NAME, meta, autoload=True)
+    project_id = sql.Column('project_id', sql.String(64), nullable=True)
+    consumer_id = sql.Column('consumer_id', sql.String(64), nullable=True)
+    token_table.create_column(project_id)
+    token_table.create_column(consumer_id)
+
+    for name, column in _INDEXES:
+        sql.Index(name, token_table.c[column]).create(migrate_engine)
+
+    _migrate_ids_from_extra(migrate_engine, token_table)
+
+
+def downgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    token_table = sql.Table(_TOKEN_TABLE_NAME, meta, autoload=True)
+    for name, column in _INDEXES:
+        sql.Index(name, token_table.c[column]).drop(migrate_engine)
+
+    token_table.drop_column('project_id')
+    token_table.drop_column('consumer_id')
@@ -0,0 +1,74 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Adds an `audit_id` column to the `token` table.
+
+As with `project_id` and `consumer_id`, the value is populated from the
+`extra` JSON of the tokens that are still valid.
+
+"""
+
+from oslo.utils import timeutils
+import sqlalchemy as sql
+
+from keystone.openstack.common import jsonutils
+
+
+_TOKEN_TABLE_NAME = 'token'
+
+
+def _audit_id_from_extra(extra_dict):
+    token_data = extra_dict.get('token_data') or {}
+    # v3 tokens keep their data under 'token', v2 tokens under 'access'.
+    token = token_data.get('token') or token_data.get('access', {}).get(
+        'token', {})
+    audit_ids = token.get('audit_ids')
+    if audit_ids:
+        return audit_ids[0]
+
+
+def _migrate_audit_id_from_extra(migrate_engine, token_table):
+    query = sql.select([token_table.c.id, token_table.c.extra])
+    query = query.where(token_table.c.valid == sql.sql.expression.true())
+    query = query.where(token_table.c.expires > timeutils.utcnow())
+
+    for token in list(migrate_engine.execute(query)):
+        audit_id = _audit_id_from_extra(jsonutils.loads(token.extra))
+        if audit_id is None:
+            continue
+        f = token_table.c.id == token.id
+        update = token_table.update().where(f).values(audit_id=audit_id)
+        migrate_engine.execute(update)
+
+
+def upgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    token_table = sql.Table(_TOKEN_TABLE_NAME, meta, autoload=True)
+    audit_id = sql.Column('audit_id', sql.String(32), nullable=True)
+    token_table.create_column(audit_id)
+    sql.Index('ix_token_audit_id', token_table.c.audit_id).create(
+        migrate_engine)
+
+    _migrate_audit_id_from_extra(migrate_engine, token_table)
+
+
+def downgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    token_table = sql.Table(_TOKEN_TABLE_NAME, meta, autoload=True)
+    sql.Index('ix_token_audit_id', token_table.c.audit_id).drop(
+        migrate_engine)
+    token_table.drop_column('audit_id')
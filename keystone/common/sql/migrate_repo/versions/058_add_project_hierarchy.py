@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""Adds the `project_hierarchy` closure table.
+
+The table has a row for each project and each of its ancestors, including the
+project itself at depth 0, so that the parents and the subtree of a project
+are each read with a single query.
+
+To upgrade, the rows of the existing projects are computed from their
+`parent_id`.
+
+"""
+
+import sqlalchemy as sql
+
+
+HIERARCHY_TABLE = 'project_hierarchy'
+
+
+def _hierarchy_rows(parent_ids):
+    """Return the closure rows of the projects, given their parent IDs."""
+    rows = []
+    for project_id in parent_ids:
+        ancestor_id = project_id
+        depth = 0
+        # NOTE: Guard against cycles in a corrupted hierarchy, which would
+        # loop forever.
+        seen = set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append({'ancestor_id': ancestor_id,
+                         'descendant_id': project_id,
+                         'depth': depth})
+            ancestor_id = parent_ids.get(ancestor_id)
+            depth += 1
+    return rows
+
+
+def upgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    project_table = sql.Table('project', meta, autoload=True)
+    hierarchy_table = sql.Table(
+        HIERARCHY_TABLE,
+        meta,
+        sql.Column('ancestor_id', sql.String(64), sql.ForeignKey('project.id'),
+                   primary_key=True),
+        sql.Column('descendant_id', sql.String(64),
+                   sql.ForeignKey('project.id'), primary_key=True),
+        sql.Column('depth', sql.Integer, nullable=False),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+    hierarchy_table.create(migrate_engine, checkfirst=True)
+    sql.Index('ix_project_hierarchy_descendant_id',
+              hierarchy_table.c.descendant_id).create(migrate_engine)
+
+    query = sql.select([project_table.c.id, project_table.c.parent_id])
+    parent_ids = dict((project.id, project.parent_id)
+                      for project in migrate_engine.execute(query))
+    rows = _hierarchy_rows(parent_ids)
+    if rows:
+        migrate_engine.execute(hierarchy_table.insert(), rows)
+
+
+def downgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    hierarchy_table = sql.Table(HIERARCHY_TABLE, meta, autoload=True)
+    hierarchy_table.drop(migrate_engine, checkfirst=True)
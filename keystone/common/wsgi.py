@@ -756,6 +756,36 @@ def render_response(body=None, status=None, headers=None, method=None):
     return resp
 
 
+def etag_matches(context, etag):
+    """Returns True if the ``If-None-Match`` header of a request matches."""
+    if_none_match = context.get('headers', {}).get('If-None-Match', '')
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"') in (etag, '*'):
+            return True
+    return False
+
+
+def render_not_modified(etag):
+    """Forms a ``304 Not Modified`` WSGI response with an entity tag."""
+    return render_response(status=(304, 'Not Modified'),
+                           headers=[('ETag', '"%s"' % etag)])
+
+
+def render_conditional_response(context, body, etag):
+    """Forms a WSGI response with an entity tag.
+
+    If the request has an ``If-None-Match`` header matching ``etag``, a
+    ``304 Not Modified`` response without body is formed instead.
+
+    """
+    if etag_matches(context, etag):
+        return render_not_modified(etag)
+    return render_response(body=body, headers=[('ETag', '"%s"' % etag)])
+
+
 def render_exception(error, context=None, request=None, user_locale=None):
     """Forms a WSGI response based on the current error."""
 
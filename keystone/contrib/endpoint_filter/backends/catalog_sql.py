@@ -12,65 +12,29 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import six
-
 from keystone.catalog.backends import sql
 from keystone.catalog import core as catalog_core
 from keystone.common import dependency
 from keystone import config
-from keystone import exception
 
 CONF = config.CONF
 
 
 @dependency.requires('endpoint_filter_api')
 class EndpointFilterCatalog(sql.Catalog):
-    def get_v3_catalog(self, user_id, project_id, metadata=None):
-        substitutions = dict(six.iteritems(CONF))
-        substitutions.update({'tenant_id': project_id, 'user_id': user_id})
-
-        services = {}
+    def compile_catalog(self):
+        # NOTE: The V3 catalog is filtered per project, so it cannot be
+        # rendered from a catalog shared by all the tokens.
+        return None
 
-        refs = self.endpoint_filter_api.list_endpoints_for_project(project_id)
+    def get_v3_catalog(self, user_id, project_id, metadata=None):
+        services = self.endpoint_filter_api.get_catalog_for_project(
+            project_id)
 
-        if (not refs and
+        if (services is None and
                 CONF.endpoint_filter.return_all_endpoints_if_no_filter):
             return super(EndpointFilterCatalog, self).get_v3_catalog(
                 user_id, project_id, metadata=metadata)
 
-        for entry in refs:
-            try:
-                endpoint = self.get_endpoint(entry.endpoint_id)
-                if not endpoint['enabled']:
-                    # Skip disabled endpoints.
-                    continue
-                service_id = endpoint['service_id']
-                services.setdefault(
-                    service_id,
-                    self.get_service(service_id))
-                service = services[service_id]
-                del endpoint['service_id']
-                del endpoint['enabled']
-                del endpoint['legacy_endpoint_id']
-                endpoint['url'] = catalog_core.format_url(
-                    endpoint['url'], substitutions)
-                # populate filtered endpoints
-                if 'endpoints' in services[service_id]:
-                    service['endpoints'].append(endpoint)
-                else:
-                    service['endpoints'] = [endpoint]
-            except exception.EndpointNotFound:
-                # remove bad reference from association
-                self.endpoint_filter_api.remove_endpoint_from_project(
-                    entry.endpoint_id, project_id)
-
-        # format catalog
-        catalog = []
-        for service_id, service in six.iteritems(services):
-            formatted_service = {}
-            formatted_service['id'] = service['id']
-            formatted_service['type'] = service['type']
-            formatted_service['endpoints'] = service['endpoints']
-            catalog.append(formatted_service)
-
-        return catalog
+        compiled = catalog_core.CompiledCatalog(services or [])
+        return compiled.render_v3(user_id, project_id)
@@ -12,6 +12,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import six
+import sqlalchemy
+
+from keystone.catalog.backends import sql as catalog_sql
 from keystone.common import sql
 from keystone import exception
 from keystone.i18n import _
@@ -111,6 +115,53 @@ class EndpointFilter(object):
             query = query.filter_by(project_id=project_id)
             query.delete(synchronize_session=False)
 
+    def get_catalog_for_project(self, project_id):
+        session = sql.get_session()
+        query = session.query(EndpointGroup.filters)
+        query = query.join(
+            ProjectEndpointGroupMembership,
+            ProjectEndpointGroupMembership.endpoint_group_id ==
+            EndpointGroup.id)
+        query = query.filter(
+            ProjectEndpointGroupMembership.project_id == project_id)
+        endpoint_group_filters = [ref.filters for ref in query]
+
+        project_endpoints = session.query(ProjectEndpoint.endpoint_id)
+        project_endpoints = project_endpoints.filter_by(project_id=project_id)
+        if (not endpoint_group_filters and
+                not session.query(project_endpoints.exists()).scalar()):
+            return None
+
+        Endpoint = catalog_sql.Endpoint
+        criteria = [Endpoint.id.in_(project_endpoints)]
+        for filters in endpoint_group_filters:
+            if not filters:
+                # An endpoint group without filters holds every endpoint.
+                criteria = None
+                break
+            if any(key not in Endpoint.attributes for key in filters):
+                continue
+            criteria.append(sqlalchemy.and_(
+                *[getattr(Endpoint, key) == value
+                  for key, value in six.iteritems(filters)]))
+
+        t = True  # variable for singleton for PEP8, E712.
+        query = session.query(Endpoint)
+        query = query.options(sql.joinedload(Endpoint.service))
+        query = query.filter(Endpoint.enabled == t)
+        if criteria is not None:
+            query = query.filter(sqlalchemy.or_(*criteria))
+
+        services = {}
+        for endpoint_ref in query:
+            service = services.get(endpoint_ref.service_id)
+            if service is None:
+                service = endpoint_ref.service.to_dict()
+                service['endpoints'] = []
+                services[endpoint_ref.service_id] = service
+            service['endpoints'].append(endpoint_ref.to_dict())
+        return list(six.itervalues(services))
+
     def create_endpoint_group(self, endpoint_group_id, endpoint_group):
         session = sql.get_session()
         with session.begin():
@@ -27,33 +27,22 @@ class _ControllerBase(controller.V3Controller):
     """Base behaviors for endpoint filter controllers."""
 
     def _get_endpoint_groups_for_project(self, project_id):
-        # recover the project endpoint group memberships and for each
-        # membership recover the endpoint group
+        # recover the project endpoint group memberships and the endpoint
+        # groups they refer to
         self.assignment_api.get_project(project_id)
-        try:
-            refs = self.endpoint_filter_api.list_endpoint_groups_for_project(
-                project_id)
-            endpoint_groups = [self.endpoint_filter_api.get_endpoint_group(
-                ref.endpoint_group_id) for ref in refs]
-            return endpoint_groups
-        except exception.EndpointGroupNotFound:
+        refs = self.endpoint_filter_api.list_endpoint_groups_for_project(
+            project_id)
+        endpoint_group_ids = set(ref.endpoint_group_id for ref in refs)
+        if not endpoint_group_ids:
             return []
+        return [endpoint_group for endpoint_group
+                in self.endpoint_filter_api.list_endpoint_groups()
+                if endpoint_group['id'] in endpoint_group_ids]
 
     def _get_endpoints_filtered_by_endpoint_group(self, endpoint_group_id):
-        endpoints = self.catalog_api.list_endpoints()
         filters = self.endpoint_filter_api.get_endpoint_group(
             endpoint_group_id)['filters']
-        filtered_endpoints = []
-
-        for endpoint in endpoints:
-            is_candidate = True
-            for key, value in six.iteritems(filters):
-                if endpoint[key] != value:
-                    is_candidate = False
-                    break
-            if is_candidate:
-                filtered_endpoints.append(endpoint)
-        return filtered_endpoints
+        return self.endpoint_filter_api.list_endpoints_for_filters(filters)
 
 
 class EndpointFilterV3Controller(_ControllerBase):
@@ -111,8 +100,9 @@ class EndpointFilterV3Controller(_ControllerBase):
         # then for each endpoint group return the endpoints.
         endpoint_groups = self._get_endpoint_groups_for_project(project_id)
         for endpoint_group in endpoint_groups:
-            endpoint_refs = self._get_endpoints_filtered_by_endpoint_group(
-                endpoint_group['id'])
+            endpoint_refs = (
+                self.endpoint_filter_api.list_endpoints_for_filters(
+                    endpoint_group['filters']))
             # now check if any endpoints for current endpoint group are not
             # contained in the list of filtered endpoints
             for endpoint_ref in endpoint_refs:
@@ -13,19 +13,25 @@
 # under the License.
 
 import abc
+import uuid
 
 import six
 
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import extension
 from keystone.common import manager
 from keystone import config
 from keystone import exception
+from keystone import notifications
 from keystone.openstack.common import log
 
 
 CONF = config.CONF
 LOG = log.getLogger(__name__)
+SHOULD_CACHE = cache.should_cache_fn('endpoint_filter')
+
+EXPIRATION_TIME = lambda: CONF.endpoint_filter.cache_time
 
 extension_data = {
     'name': 'OpenStack Keystone Endpoint Filter API',
@@ -47,7 +53,64 @@ extension_data = {
 extension.register_admin_extension(extension_data['alias'], extension_data)
 
 
+class EndpointIndex(object):
+    """An inverted index of endpoints, for evaluating endpoint groups.
+
+    Each (attribute, value) pair of the endpoints maps to the IDs of the
+    endpoints that have it, so that the endpoints matching the filters of an
+    endpoint group are the intersection of the sets of the filters' pairs.
+
+    """
+
+    def __init__(self, endpoints=(), generation=None):
+        self.generation = generation
+        self._endpoints = {}
+        self._index = {}
+        for endpoint in endpoints:
+            self.add(endpoint)
+
+    @staticmethod
+    def _items(endpoint):
+        for item in six.iteritems(endpoint):
+            try:
+                hash(item)
+            except TypeError:
+                # Attributes like the extra dictionaries cannot be filtered
+                # on; filters are compared for equality.
+                continue
+            yield item
+
+    def add(self, endpoint):
+        """Adds an endpoint to the index."""
+        self._endpoints[endpoint['id']] = endpoint
+        for item in self._items(endpoint):
+            self._index.setdefault(item, set()).add(endpoint['id'])
+
+    def match(self, filters):
+        """Returns copies of the endpoints matching the filters.
+
+        :param filters: the filters of an endpoint group
+        :type filters: dictionary
+        :returns: a list of endpoint refs
+
+        """
+        if not filters:
+            endpoint_ids = self._endpoints
+        else:
+            try:
+                matches = sorted((self._index.get(item, ())
+                                  for item in six.iteritems(filters)),
+                                 key=len)
+            except TypeError:
+                # A value that cannot be hashed matches no endpoint.
+                return []
+            endpoint_ids = set(matches[0]).intersection(*matches[1:])
+        return [self._endpoints[endpoint_id].copy()
+                for endpoint_id in endpoint_ids]
+
+
 @dependency.provider('endpoint_filter_api')
+@dependency.requires('catalog_api')
 class Manager(manager.Manager):
     """Default pivot point for the Endpoint Filter backend.
 
@@ -56,10 +119,116 @@ class Manager(manager.Manager):
 
     """
 
+    _ENDPOINT = 'endpoint'
+    _SERVICE = 'service'
+
     def __init__(self):
         super(Manager, self).__init__(CONF.endpoint_filter.driver)
+        self._endpoint_index = None
+        catalog_callbacks = {
+            self._ENDPOINT: [self._catalog_callback],
+            self._SERVICE: [self._catalog_callback],
+        }
+        self.event_callbacks = {
+            notifications.ACTIONS.created: catalog_callbacks,
+            notifications.ACTIONS.updated: catalog_callbacks,
+            notifications.ACTIONS.deleted: catalog_callbacks,
+        }
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_catalog_generation(self):
+        # NOTE: The cached catalogs of the projects are keyed on a generation
+        # that is invalidated by the changes which can affect any project: to
+        # the endpoints, the services and the endpoint groups.
+        return uuid.uuid4().hex
+
+    def _invalidate_catalogs(self):
+        self._get_catalog_generation.invalidate(self)
+
+    def _invalidate_catalog_for_project(self, project_id):
+        self._get_catalog_for_project.invalidate(
+            self, project_id, self._get_catalog_generation())
+
+    def _catalog_callback(self, service, resource_type, operation, payload):
+        self._invalidate_catalogs()
+
+    def _get_endpoint_index(self):
+        generation = self._get_catalog_generation()
+        index = self._endpoint_index
+        if index is None or index.generation != generation:
+            index = EndpointIndex(self.catalog_api.list_endpoints(),
+                                  generation=generation)
+            self._endpoint_index = index
+        return index
+
+    def list_endpoints_for_filters(self, filters):
+        """List the endpoints matching the filters of an endpoint group.
+
+        :param filters: the filters of an endpoint group
+        :type filters: dictionary
+        :returns: a list of endpoint refs or an empty list.
+
+        """
+        return self._get_endpoint_index().match(filters)
+
+    def get_catalog_for_project(self, project_id):
+        """Get the services and endpoints of the catalog of a project.
+
+        See :meth:`Driver.get_catalog_for_project`.
+
+        """
+        return self._get_catalog_for_project(project_id,
+                                             self._get_catalog_generation())
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_catalog_for_project(self, project_id, generation):
+        return self.driver.get_catalog_for_project(project_id)
 
+    def add_endpoint_to_project(self, endpoint_id, project_id):
+        self.driver.add_endpoint_to_project(endpoint_id, project_id)
+        self._invalidate_catalog_for_project(project_id)
+
+    def remove_endpoint_from_project(self, endpoint_id, project_id):
+        self.driver.remove_endpoint_from_project(endpoint_id, project_id)
+        self._invalidate_catalog_for_project(project_id)
+
+    def delete_association_by_endpoint(self, endpoint_id):
+        self.driver.delete_association_by_endpoint(endpoint_id)
+        self._invalidate_catalogs()
+
+    def delete_association_by_project(self, project_id):
+        self.driver.delete_association_by_project(project_id)
+        self._invalidate_catalog_for_project(project_id)
+
+    def update_endpoint_group(self, endpoint_group_id, endpoint_group):
+        ref = self.driver.update_endpoint_group(endpoint_group_id,
+                                                endpoint_group)
+        self._invalidate_catalogs()
+        return ref
+
+    def delete_endpoint_group(self, endpoint_group_id):
+        self.driver.delete_endpoint_group(endpoint_group_id)
+        self._invalidate_catalogs()
+
+    def add_endpoint_group_to_project(self, endpoint_group_id, project_id):
+        self.driver.add_endpoint_group_to_project(endpoint_group_id,
+                                                  project_id)
+        self._invalidate_catalog_for_project(project_id)
 
+    def remove_endpoint_group_from_project(self, endpoint_group_id,
+                                           project_id):
+        self.driver.remove_endpoint_group_from_project(endpoint_group_id,
+                                                       project_id)
+        self._invalidate_catalog_for_project(project_id)
+
+    def delete_endpoint_group_association_by_project(self, project_id):
+        self.driver.delete_endpoint_group_association_by_project(project_id)
+        self._invalidate_catalog_for_project(project_id)
+
+
+@dependency.requires('catalog_api')
 @six.add_metaclass(abc.ABCMeta)
 class Driver(object):
     """Interface description for an Endpoint Filter driver."""
@@ -150,6 +319,51 @@ class Driver(object):
         """
         raise exception.NotImplemented()
 
+    def get_catalog_for_project(self, project_id):
+        """Get the services and endpoints of the catalog of a project.
+
+        The endpoints are the enabled ones associated with the project,
+        either directly or through an endpoint group. Drivers able to
+        select them in a single query should override this method; by
+        default the catalog is rebuilt from the associations of the project.
+
+        :param project_id: identity of the project to check
+        :type project_id: string
+        :returns: a list of service refs, each with the list of its
+                  endpoint refs under 'endpoints', or None if no endpoint
+                  and no endpoint group is associated with the project.
+
+        """
+        endpoint_ids = set(
+            ref.endpoint_id
+            for ref in self.list_endpoints_for_project(project_id))
+        endpoint_groups = [
+            self.get_endpoint_group(ref.endpoint_group_id)
+            for ref in self.list_endpoint_groups_for_project(project_id)]
+        if not endpoint_ids and not endpoint_groups:
+            return None
+
+        all_endpoints = self.catalog_api.list_endpoints()
+        endpoints = dict((endpoint['id'], endpoint.copy())
+                         for endpoint in all_endpoints
+                         if endpoint['id'] in endpoint_ids)
+        index = EndpointIndex(all_endpoints)
+        for endpoint_group in endpoint_groups:
+            for endpoint in index.match(endpoint_group['filters']):
+                endpoints[endpoint['id']] = endpoint
+
+        services = {}
+        for endpoint in six.itervalues(endpoints):
+            if not endpoint.get('enabled', True):
+                continue
+            service = services.get(endpoint['service_id'])
+            if service is None:
+                service = self.catalog_api.get_service(endpoint['service_id'])
+                service = dict(service, endpoints=[])
+                services[endpoint['service_id']] = service
+            service['endpoints'].append(endpoint)
+        return list(six.itervalues(services))
+
     @abc.abstractmethod
     def create_endpoint_group(self, endpoint_group):
         """Create an endpoint group.
@@ -20,7 +20,7 @@ from keystone.common import dependency
 from keystone.common import manager
 from keystone import config
 from keystone import exception
-from keystone.i18n import _, _LE, _LW
+from keystone.i18n import _, _LW
 from keystone.openstack.common import log
 
 CONF = config.CONF
@@ -94,68 +94,8 @@ class Manager(manager.Manager):
                                   'endpoint_id': endpoint_id})
                 raise
 
-        def _get_endpoints_for_service(service_id, endpoints):
-            # TODO(henry-nash): Consider optimizing this in the future by
-            # adding an explicit list_endpoints_for_service to the catalog API.
-            return [ep for ep in endpoints if ep['service_id'] == service_id]
-
-        def _get_endpoints_for_service_and_region(
-                service_id, region_id, endpoints, regions):
-            # TODO(henry-nash): Consider optimizing this in the future.
-            # The lack of a two-way pointer in the region tree structure
-            # makes this somewhat inefficient.
-
-            def _recursively_get_endpoints_for_region(
-                region_id, service_id, endpoint_list, region_list,
-                    endpoints_found, regions_examined):
-                """Recursively search down a region tree for endpoints.
-
-                :param region_id: the point in the tree to examine
-                :param service_id: the service we are interested in
-                :param endpoint_list: list of all endpoints
-                :param region_list: list of all regions
-                :param endpoints_found: list of matching endpoints found so
-                                        far - which will be updated if more are
-                                        found in this iteration
-                :param regions_examined: list of regions we have already looked
-                                         at - used to spot illegal circular
-                                         references in the tree to avoid never
-                                         completing search
-                :returns: list of endpoints that match
-
-                """
-
-                if region_id in regions_examined:
-                    msg = _LE('Circular reference or a repeated entry found '
-                              'in region tree - %(region_id)s.')
-                    LOG.error(msg, {'region_id': ref.region_id})
-                    return
-
-                regions_examined.append(region_id)
-                endpoints_found += (
-                    [ep for ep in endpoint_list if
-                     ep['service_id'] == service_id and
-                     ep['region_id'] == region_id])
-
-                for region in region_list:
-                    if region['parent_region_id'] == region_id:
-                        _recursively_get_endpoints_for_region(
-                            region['id'], service_id, endpoints, regions,
-                            endpoints_found, regions_examined)
-
-            endpoints_found = []
-            regions_examined = []
-
-            # Now walk down the region tree
-            _recursively_get_endpoints_for_region(
-                region_id, service_id, endpoints, regions,
-                endpoints_found, regions_examined)
-
-            return endpoints_found
-
         matching_endpoints = []
-        endpoints = self.catalog_api.list_endpoints()
-        regions = self.catalog_api.list_regions()
+        region_tree = self.catalog_api.get_region_tree()
         for ref in self.driver.list_associations_for_policy(policy_id):
             if ref.get('endpoint_id') is not None:
                 matching_endpoints.append(
@@ -164,16 +104,15 @@ class Manager(manager.Manager):
 
             if (ref.get('service_id') is not None and
                     ref.get('region_id') is None):
-                matching_endpoints += _get_endpoints_for_service(
-                    ref['service_id'], endpoints)
+                matching_endpoints += region_tree.list_endpoints_for_service(
+                    ref['service_id'])
                 continue
 
             if (ref.get('service_id') is not None and
                     ref.get('region_id') is not None):
                 matching_endpoints += (
-                    _get_endpoints_for_service_and_region(
-                        ref['service_id'], ref['region_id'],
-                        endpoints, regions))
+                    region_tree.list_endpoints_for_service_and_region(
+                        ref['service_id'], ref['region_id']))
                 continue
 
             msg = _LW('Unsupported policy association found - '
@@ -206,9 +145,8 @@ class Manager(manager.Manager):
             the region tree to find one.
 
             """
-            region_id = endpoint['region_id']
-            regions_examined = []
-            while region_id is not None:
+            for region_id in self.catalog_api.get_region_lineage(
+                    endpoint['region_id']):
                 try:
                     ref = self.driver.get_policy_association(
                         service_id=endpoint['service_id'],
@@ -217,19 +155,6 @@ class Manager(manager.Manager):
                 except exception.PolicyAssociationNotFound:
                     pass
 
-                # There wasn't one for that region & service, let's
-                # chase up the region tree
-                regions_examined.append(region_id)
-                region = self.catalog_api.get_region(region_id)
-                region_id = None
-                if region.get('parent_region_id') is not None:
-                    region_id = region['parent_region_id']
-                    if region_id in regions_examined:
-                        msg = _LE('Circular reference or a repeated entry '
-                                  'found in region tree - %(region_id)s.')
-                        LOG.error(msg, {'region_id': region_id})
-                        break
-
         # First let's see if there is a policy explicitly defined for
         # this endpoint.
 
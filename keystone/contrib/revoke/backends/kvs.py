@@ -45,7 +45,7 @@ class Revoke(revoke.Driver):
         except exception.NotFound:
             return []
 
-    def _prune_expired_events_and_get(self, last_fetch=None, new_event=None):
+    def _prune_expired_events_and_get(self, last_fetch=None, new_events=()):
         pruned = []
         results = []
         expire_delta = datetime.timedelta(seconds=CONF.token.expiration)
@@ -54,8 +54,7 @@ class Revoke(revoke.Driver):
         # prune process can be skipped if none of the events have timed out.
         with self._store.get_lock(_EVENT_KEY) as lock:
             events = self._get_event()
-            if new_event is not None:
-                events.append(new_event)
+            events.extend(new_events)
 
             for event in events:
                 revoked_at = event.revoked_at
@@ -69,5 +68,11 @@ class Revoke(revoke.Driver):
     def get_events(self, last_fetch=None):
         return self._prune_expired_events_and_get(last_fetch=last_fetch)
 
+    def prune_expired_events(self):
+        self._prune_expired_events_and_get()
+
     def revoke(self, event):
-        self._prune_expired_events_and_get(new_event=event)
+        self._prune_expired_events_and_get(new_events=[event])
+
+    def revoke_events(self, events):
+        self._prune_expired_events_and_get(new_events=events)
@@ -33,7 +33,7 @@ class RevocationEvent(sql.ModelBase, sql.ModelDictMixin):
     access_token_id = sql.Column(sql.String(64))
     issued_before = sql.Column(sql.DateTime(), nullable=False)
     expires_at = sql.Column(sql.DateTime())
-    revoked_at = sql.Column(sql.DateTime(), nullable=False)
+    revoked_at = sql.Column(sql.DateTime(), index=True, nullable=False)
     audit_id = sql.Column(sql.String(32))
     audit_chain_id = sql.Column(sql.String(32))
 
@@ -57,7 +57,7 @@ class Revoke(revoke.Driver):
             # been increased beyond the default.
         return batch_size
 
-    def _prune_expired_events(self):
+    def prune_expired_events(self):
         oldest = revoke.revoked_before_cutoff_time()
 
         session = sql.get_session()
@@ -81,24 +81,37 @@ class Revoke(revoke.Driver):
         session.flush()
 
     def get_events(self, last_fetch=None):
-        self._prune_expired_events()
         session = sql.get_session()
         query = session.query(RevocationEvent).order_by(
             RevocationEvent.revoked_at)
 
         if last_fetch:
             query = query.filter(RevocationEvent.revoked_at > last_fetch)
+        else:
+            # Expired events are pruned separately, so they may still be
+            # present in the table.
+            query = query.filter(RevocationEvent.revoked_at >=
+                                 revoke.revoked_before_cutoff_time())
 
         events = [model.RevokeEvent(**e.to_dict()) for e in query]
 
         return events
 
-    def revoke(self, event):
+    def _event_to_record(self, event):
         kwargs = dict()
         for attr in model.REVOKE_KEYS:
             kwargs[attr] = getattr(event, attr)
         kwargs['id'] = uuid.uuid4().hex
-        record = RevocationEvent(**kwargs)
+        return RevocationEvent(**kwargs)
+
+    def revoke(self, event):
+        record = self._event_to_record(event)
         session = sql.get_session()
         with session.begin():
             session.add(record)
+
+    def revoke_events(self, events):
+        session = sql.get_session()
+        with session.begin():
+            session.add_all([self._event_to_record(event)
+                             for event in events])
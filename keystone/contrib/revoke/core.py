@@ -12,11 +12,11 @@
 
 import abc
 import datetime
+import threading
 
 from oslo.utils import timeutils
 import six
 
-from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import extension
 from keystone.common import manager
@@ -52,9 +52,11 @@ EXTENSION_DATA = {
 extension.register_admin_extension(EXTENSION_DATA['alias'], EXTENSION_DATA)
 extension.register_public_extension(EXTENSION_DATA['alias'], EXTENSION_DATA)
 
-SHOULD_CACHE = cache.should_cache_fn('revoke')
-# TODO(ayoung): migrate from the token section
-REVOCATION_CACHE_EXPIRATION_TIME = lambda: CONF.token.revocation_cache_time
+
+# Events are fetched again from slightly before the newest event already
+# applied, to pick up events committed late by other processes or stored
+# with a timestamp truncated to the second.
+SYNC_OVERLAP = datetime.timedelta(seconds=10)
 
 
 def revoked_before_cutoff_time():
@@ -76,11 +78,21 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = model
+        self._revoke_index = model.RevokeIndex()
+        self._last_fetch = None
+        self._last_sync = None
+        self._last_prune = None
+        self._sync_lock = threading.Lock()
 
     def _user_callback(self, service, resource_type, operation,
                        payload):
         self.revoke_by_user(payload['resource_info'])
 
+    def _users_callback(self, service, resource_type, operation,
+                        payload):
+        for user_id in payload['resource_info']['user_ids']:
+            self.revoke_by_user(user_id)
+
     def _role_callback(self, service, resource_type, operation,
                        payload):
         self.revoke(
@@ -135,6 +147,8 @@ class Manager(manager.Manager):
             notifications.ACTIONS.internal: [
                 [notifications.INVALIDATE_USER_TOKEN_PERSISTENCE,
                  self._user_callback],
+                [notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE,
+                 self._users_callback],
             ]
         }
 
@@ -189,6 +203,20 @@ class Manager(manager.Manager):
                               domain_id=domain_id,
                               project_id=project_id))
 
+    def revoke_by_grants(self, grants):
+        """Revoke the tokens of several grants with a batch of events.
+
+        :param grants: list of dicts holding a role_id, a user_id, and
+                       either a domain_id or a project_id
+
+        """
+        self.revoke_events([
+            model.RevokeEvent(user_id=grant['user_id'],
+                              role_id=grant['role_id'],
+                              domain_id=grant.get('domain_id'),
+                              project_id=grant.get('project_id'))
+            for grant in grants])
+
     def revoke_by_user_and_project(self, user_id, project_id):
         self.revoke(
             model.RevokeEvent(project_id=project_id, user_id=user_id))
@@ -199,13 +227,62 @@ class Manager(manager.Manager):
     def revoke_by_domain_role_assignment(self, domain_id, role_id):
         self.revoke(model.RevokeEvent(domain_id=domain_id, role_id=role_id))
 
-    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
-                        expiration_time=REVOCATION_CACHE_EXPIRATION_TIME)
-    def _get_revoke_tree(self):
-        events = self.driver.get_events()
-        revoke_tree = model.RevokeTree(revoke_events=events)
+    def _get_revoke_index(self):
+        """Return the local revocation index, synchronized if stale.
+
+        Rather than rebuilding the index from every event, only the events
+        revoked since the newest one already applied are fetched from the
+        backend, at most once every `sync_interval` seconds.  Applying an
+        event twice is harmless, so an event revoked locally may safely be
+        fetched again later.
+
+        """
+        now = timeutils.utcnow()
+        if CONF.revoke.caching:
+            interval = datetime.timedelta(seconds=CONF.revoke.sync_interval)
+        else:
+            interval = datetime.timedelta(0)
+        if (self._last_sync is not None and
+                now - self._last_sync < interval):
+            return self._revoke_index
+
+        if not self._sync_lock.acquire(False):
+            # Another thread is synchronizing the index; use it as it is.
+            return self._revoke_index
+        try:
+            last_fetch = self._last_fetch
+            if last_fetch is not None:
+                last_fetch -= SYNC_OVERLAP
+            events = self.driver.get_events(last_fetch=last_fetch)
+            self._revoke_index.add_events(events)
+            for event in events:
+                if (self._last_fetch is None or
+                        event.revoked_at > self._last_fetch):
+                    self._last_fetch = event.revoked_at
+            self._revoke_index.prune(revoked_before_cutoff_time())
+            self._last_sync = now
+            self._prune_expired_events(now)
+        finally:
+            self._sync_lock.release()
+        return self._revoke_index
+
+    def _prune_expired_events(self, now):
+        """Remove expired events from the backend, at most once per interval.
+
+        Pruning is kept off the path of every synchronization so that reading
+        new events remains a small range scan.
 
-        return revoke_tree
+        """
+        if CONF.revoke.prune_interval <= 0:
+            return
+        interval = datetime.timedelta(seconds=CONF.revoke.prune_interval)
+        if self._last_prune is not None and now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        try:
+            self.driver.prune_expired_events()
+        except exception.NotImplemented:
+            pass
 
     def check_token(self, token_values):
         """Checks the values from a token against the revocation list
@@ -217,12 +294,18 @@ class Manager(manager.Manager):
         :raises exception.TokenNotFound: if the token is invalid
 
          """
-        if self._get_revoke_tree().is_revoked(token_values):
+        if self._get_revoke_index().is_revoked(token_values):
             raise exception.TokenNotFound(_('Failed to validate token'))
 
     def revoke(self, event):
         self.driver.revoke(event)
-        self._get_revoke_tree.invalidate(self)
+        self._revoke_index.add_event(event)
+
+    def revoke_events(self, events):
+        if not events:
+            return
+        self.driver.revoke_events(events)
+        self._revoke_index.add_events(events)
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -242,6 +325,18 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def prune_expired_events(self):
+        """remove the events revoked before the expiration cutoff
+
+        Drivers which do not remove expired events by themselves should
+        override this method.
+
+        :raises: keystone.exception.NotImplemented if the backend removes
+                 expired events by itself.
+
+        """
+        raise exception.NotImplemented()
+
     @abc.abstractmethod
     def revoke(self, event):
         """register a revocation event
@@ -251,3 +346,16 @@ class Driver(object):
 
         """
         raise exception.NotImplemented()  # pragma: no cover
+
+    def revoke_events(self, events):
+        """register several revocation events at once
+
+        Drivers able to store the events in a single operation should
+        override this method; by default the events are registered in turn.
+
+        :param events: A list of
+            keystone.contrib.revoke.model.RevocationEvent
+
+        """
+        for event in events:
+            self.revoke(event)
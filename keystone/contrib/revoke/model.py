@@ -10,7 +10,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import heapq
+import itertools
+
 from oslo.utils import timeutils
+import six
 
 
 # The set of attributes common between the RevokeEvent
@@ -46,6 +50,16 @@ _TOKEN_KEYS = ['identity_domain_id',
 
 REVOKE_KEYS = _NAMES + _EVENT_ARGS
 
+# Alternative names to be checked in the token for an event attribute.
+# Attributes not listed here are compared against the token attribute with
+# the same name.
+_TOKEN_ALTERNATIVES = {
+    'user_id': ('user_id', 'trustor_id', 'trustee_id'),
+    'domain_id': ('identity_domain_id', 'assignment_domain_id'),
+    # For a domain-scoped token, the domain is in assignment_domain_id.
+    'domain_scope_id': ('assignment_domain_id',),
+}
+
 
 def blank_token_data(issued_at):
     token_data = dict()
@@ -249,6 +263,121 @@ class RevokeTree(object):
         return False
 
 
+class RevokeIndex(object):
+    """Compiled Revocation Index
+
+    An alternative to the RevokeTree that avoids walking one level of the
+    tree per attribute.  Events are grouped by their signature: the tuple of
+    attribute names the event constrains (i.e. those that are not None).
+    Each group maps the tuple of constrained values to the latest
+    'issued_before' of the events sharing those values.
+
+    Checking a token probes every group once for each combination of the
+    token's candidate values, so the cost depends on the number of distinct
+    signatures, which is small and fixed by the revoke API, rather than on
+    the number of events.
+
+    Adding an event that is already present is a no-op, so overlapping
+    batches of events can be applied incrementally.
+
+    """
+
+    def __init__(self, revoke_events=None):
+        self.revoke_map = dict()
+        # Heap of (revoked_at, sequence, event) used to prune old events.
+        self._revoked = []
+        self._sequence = itertools.count()
+        self.add_events(revoke_events)
+
+    @staticmethod
+    def _signature(event):
+        names = tuple(name for name in _EVENT_NAMES
+                      if getattr(event, name) is not None)
+        values = tuple(getattr(event, name) for name in names)
+        return names, values
+
+    def add_event(self, event):
+        """Updates the index based on a revocation event.
+
+        :param:  Event to add to the index
+
+        :returns:  the event that was passed in.
+
+        """
+        names, values = self._signature(event)
+        group = self.revoke_map.setdefault(names, {})
+        issued_before = group.get(values)
+        if issued_before is None or event.issued_before > issued_before:
+            group[values] = event.issued_before
+            heapq.heappush(self._revoked,
+                           (event.revoked_at, next(self._sequence), event))
+        return event
+
+    def add_events(self, revoke_events):
+        return [self.add_event(event) for event in revoke_events or []]
+
+    def remove_event(self, event):
+        """Update the index based on the removal of a Revocation Event
+
+        As with the RevokeTree, only the latest 'issued_before' is stored for
+        events that are otherwise identical, so only an exact match on
+        'issued_before' ever triggers a removal.
+
+        :param: Event to remove from the index
+
+        """
+        names, values = self._signature(event)
+        group = self.revoke_map.get(names)
+        if group is None:
+            return
+        if group.get(values) == event.issued_before:
+            del group[values]
+            if not group:
+                del self.revoke_map[names]
+
+    def prune(self, oldest):
+        """Remove the events revoked before `oldest`.
+
+        :param oldest: cutoff time; events with an older 'revoked_at' can no
+                       longer match an unexpired token.
+
+        """
+        revoked = self._revoked
+        while revoked and revoked[0][0] < oldest:
+            self.remove_event(heapq.heappop(revoked)[2])
+
+    def is_revoked(self, token_data):
+        """Check if a token matches any of the indexed revocation events.
+
+        token_data is a map based on a flattened view of token, with the
+        same required fields as for RevokeTree.is_revoked.
+
+        """
+        issued_at = token_data['issued_at']
+        candidates = {}
+        # Take a snapshot of the groups so that events can be added
+        # concurrently with the check.
+        for names, group in list(six.iteritems(self.revoke_map)):
+            choices = []
+            for name in names:
+                values = candidates.get(name)
+                if values is None:
+                    if name == 'role_id':
+                        # A token has a list of roles. If the revocation
+                        # event matches any one of them, revoke the token.
+                        values = token_data.get('roles', [])
+                    else:
+                        values = [token_data.get(alt_name) for alt_name in
+                                  _TOKEN_ALTERNATIVES.get(name, (name,))]
+                    candidates[name] = values
+                choices.append(values)
+            for values in itertools.product(*choices):
+                issued_before = group.get(values)
+                if issued_before is not None and issued_before > issued_at:
+                    return True
+        return False
+
+
 def build_token_values_v2(access, default_domain_id):
     token_data = access['token']
 
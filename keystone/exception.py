@@ -386,6 +386,13 @@ class NotImplemented(Error):
     title = 'Not Implemented'
 
 
+class SigningUnavailable(Error):
+    message_format = _("The server is too busy to sign the request, please "
+                       "try again later.")
+    code = 503
+    title = 'Service Unavailable'
+
+
 class Gone(Error):
     message_format = _("The service you have requested is no"
                        " longer available on this server.")
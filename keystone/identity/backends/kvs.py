@@ -201,6 +201,10 @@ class Identity(kvs.Base, identity.Driver):
         group_ids = user_ref.get('groups', [])
         return [self.get_group(x) for x in group_ids]
 
+    def list_group_ids_for_user(self, user_id):
+        user_ref = self._get_user(user_id)
+        return list(user_ref.get('groups', []))
+
     def delete_user(self, user_id):
         try:
             old_user = self.db.get('user-%s' % user_id)
@@ -155,6 +155,11 @@ class Identity(identity.Driver):
         user_dn = user_ref['dn']
         return self.group.list_user_groups_filtered(user_dn)
 
+    def list_group_ids_for_user(self, user_id):
+        user_ref = self._get_user(user_id)
+        user_dn = user_ref['dn']
+        return self.group.list_user_group_ids(user_dn)
+
     def list_groups(self, hints):
         return self.group.get_all_filtered()
 
@@ -359,6 +364,22 @@ class GroupApi(common_ldap.BaseLdap):
                                                   self.ldap_filter or '')
         return self.get_all_filtered(query)
 
+    def list_user_group_ids(self, user_dn):
+        """Return the IDs of the groups for which the user is a member."""
+
+        user_dn_esc = ldap.filter.escape_filter_chars(user_dn)
+        query = '(&(objectClass=%s)(%s=%s)%s)' % (self.object_class,
+                                                  self.member_attribute,
+                                                  user_dn_esc,
+                                                  self.ldap_filter or '')
+        with self.get_connection() as conn:
+            try:
+                res = conn.search_s(self.tree_dn, self.LDAP_SCOPE, query,
+                                    [self.id_attr])
+            except ldap.NO_SUCH_OBJECT:
+                return []
+        return [self._ldap_res_to_model(x)['id'] for x in res]
+
     def list_group_users(self, group_id):
         """Return a list of user dns which are members of a group."""
         group_ref = self.get(group_id)
@@ -26,6 +26,9 @@ from keystone.assignment.backends import sql as assignment_sql  # noqa
 
 CONF = config.CONF
 
+# Maximum number of values in the IN clauses of a statement.
+_IN_CLAUSE_BATCH_SIZE = 500
+
 
 class User(sql.ModelBase, sql.DictBase):
     __tablename__ = 'user'
@@ -142,6 +145,21 @@ class Identity(identity.Driver):
         session = sql.get_session()
         return identity.filter_user(self._get_user(session, user_id).to_dict())
 
+    def _check_entities_exist(self, model, entity_ids, not_found):
+        entity_ids = list(entity_ids)
+        session = sql.get_session()
+        for i in range(0, len(entity_ids), _IN_CLAUSE_BATCH_SIZE):
+            batch = entity_ids[i:i + _IN_CLAUSE_BATCH_SIZE]
+            query = session.query(model.id).filter(model.id.in_(batch))
+            missing_ids = set(batch) - set(ref.id for ref in query)
+            if missing_ids:
+                raise not_found(missing_ids.pop())
+
+    def check_users_exist(self, user_ids):
+        self._check_entities_exist(
+            User, user_ids,
+            lambda user_id: exception.UserNotFound(user_id=user_id))
+
     def get_user_by_name(self, user_name, domain_id):
         session = sql.get_session()
         query = session.query(User)
@@ -230,6 +248,17 @@ class Identity(identity.Driver):
         query = query.filter(UserGroupMembership.user_id == user_id)
         return [g.to_dict() for g in query]
 
+    def list_group_ids_for_user(self, user_id):
+        session = sql.get_session()
+        # Only the primary key of the membership table is read.
+        query = session.query(UserGroupMembership.group_id)
+        query = query.filter(UserGroupMembership.user_id == user_id)
+        group_ids = [ref.group_id for ref in query]
+        if not group_ids:
+            # Raise UserNotFound for an unknown user.
+            self.get_user(user_id)
+        return group_ids
+
     def list_users_in_group(self, group_id, hints):
         # TODO(henry-nash) We could implement full filtering here by enhancing
         # the join below.  However, since it is likely to be a fairly rare
@@ -282,6 +311,11 @@ class Identity(identity.Driver):
         session = sql.get_session()
         return self._get_group(session, group_id).to_dict()
 
+    def check_groups_exist(self, group_ids):
+        self._check_entities_exist(
+            Group, group_ids,
+            lambda group_id: exception.GroupNotFound(group_id=group_id))
+
     @sql.handle_conflicts(conflict_type='group')
     def update_group(self, group_id, group):
         session = sql.get_session()
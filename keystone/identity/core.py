@@ -23,6 +23,7 @@ from oslo.config import cfg
 import six
 
 from keystone import clean
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import manager
@@ -39,6 +40,10 @@ CONF = config.CONF
 
 LOG = log.getLogger(__name__)
 
+SHOULD_CACHE = cache.should_cache_fn('identity')
+
+# NOTE(blk-u): The config option is not available at import time.
+EXPIRATION_TIME = lambda: CONF.identity.cache_time
 
 DOMAIN_CONF_FHEAD = 'keystone.'
 DOMAIN_CONF_FTAIL = '.conf'
@@ -659,6 +664,7 @@ class Manager(manager.Manager):
         domain_id, driver, entity_id = (
             self._get_domain_driver_and_entity_id(user_id))
         driver.delete_user(entity_id)
+        self.list_group_ids_for_user.invalidate(self, user_id)
         self.assignment_api.delete_user(user_id)
         self.credential_api.delete_credentials_for_user(user_id)
         self.id_mapping_api.delete_id_mapping(user_id)
@@ -693,6 +699,38 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
 
+    def _check_entities_exist(self, public_ids, driver_method):
+        # Look the entities up with a single call to each of the drivers
+        # they belong to.
+        entity_ids_by_driver = {}
+        for public_id in set(public_ids):
+            domain_id, driver, entity_id = (
+                self._get_domain_driver_and_entity_id(public_id))
+            entity_ids_by_driver.setdefault(
+                id(driver), (driver, []))[1].append(entity_id)
+        for driver, entity_ids in entity_ids_by_driver.values():
+            getattr(driver, driver_method)(entity_ids)
+
+    @domains_configured
+    @exception_translated('user')
+    def check_users_exist(self, user_ids):
+        """Checks that several users exist.
+
+        :raises: keystone.exception.UserNotFound
+
+        """
+        self._check_entities_exist(user_ids, 'check_users_exist')
+
+    @domains_configured
+    @exception_translated('group')
+    def check_groups_exist(self, group_ids):
+        """Checks that several groups exist.
+
+        :raises: keystone.exception.GroupNotFound
+
+        """
+        self._check_entities_exist(group_ids, 'check_groups_exist')
+
     @notifications.updated(_GROUP)
     @domains_configured
     @exception_translated('group')
@@ -712,11 +750,12 @@ class Manager(manager.Manager):
     def delete_group(self, group_id):
         domain_id, driver, entity_id = (
             self._get_domain_driver_and_entity_id(group_id))
-        user_ids = (u['id'] for u in self.list_users_in_group(group_id))
+        user_ids = [u['id'] for u in self.list_users_in_group(group_id)]
         driver.delete_group(entity_id)
         self.id_mapping_api.delete_id_mapping(group_id)
         self.assignment_api.delete_group(group_id)
         for uid in user_ids:
+            self.list_group_ids_for_user.invalidate(self, uid)
             self.emit_invalidate_user_token_persistence(uid)
 
     @domains_configured
@@ -737,6 +776,8 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.add_user_to_group(user_entity_id, group_entity_id)
+        self.list_group_ids_for_user.invalidate(self, user_id)
+        self.assignment_api.invalidate_roles_for_user(user_id)
 
     @domains_configured
     @exception_translated('group')
@@ -756,6 +797,7 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.remove_user_from_group(user_entity_id, group_entity_id)
+        self.list_group_ids_for_user.invalidate(self, user_id)
         self.emit_invalidate_user_token_persistence(user_id)
 
     @notifications.internal(notifications.INVALIDATE_USER_TOKEN_PERSISTENCE)
@@ -785,6 +827,32 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref_list, domain_id, driver, mapping.EntityType.GROUP)
 
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    @domains_configured
+    @exception_translated('user')
+    def list_group_ids_for_user(self, user_id):
+        """List the IDs of the groups a user is in.
+
+        Unlike list_groups_for_user, the group entities are not built, which
+        makes this suitable for resolving the roles of a user.
+
+        :param user_id: the user in question
+        :returns: a list of group IDs or an empty list.
+
+        """
+        domain_id, driver, entity_id = (
+            self._get_domain_driver_and_entity_id(user_id))
+        group_ids = driver.list_group_ids_for_user(entity_id)
+        if not self._needs_post_processing(driver):
+            return group_ids
+        # The groups of a user are held by the driver of the user's domain.
+        ref_list = self._set_domain_id_and_mapping(
+            [{'id': group_id, 'domain_id': domain_id}
+             for group_id in group_ids],
+            domain_id, driver, mapping.EntityType.GROUP)
+        return [ref['id'] for ref in ref_list]
+
     @manager.response_truncated
     @domains_configured
     @exception_translated('group')
@@ -1022,6 +1090,20 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_group_ids_for_user(self, user_id):
+        """List the IDs of the groups a user is in.
+
+        Drivers able to read the IDs without building the group entities
+        should override this method.
+
+        :param user_id: the user in question
+        :returns: a list of group IDs or an empty list.
+        :raises: keystone.exception.UserNotFound
+
+        """
+        return [group['id'] for group in
+                self.list_groups_for_user(user_id, driver_hints.Hints())]
+
     @abc.abstractmethod
     def get_group(self, group_id):
         """Get a group by ID.
@@ -1032,6 +1114,30 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def check_users_exist(self, user_ids):
+        """Checks that several users exist.
+
+        Drivers able to look up several users in a single operation should
+        override this method; by default each user is fetched in turn.
+
+        :raises: keystone.exception.UserNotFound
+
+        """
+        for user_id in user_ids:
+            self.get_user(user_id)
+
+    def check_groups_exist(self, group_ids):
+        """Checks that several groups exist.
+
+        Drivers able to look up several groups in a single operation should
+        override this method; by default each group is fetched in turn.
+
+        :raises: keystone.exception.GroupNotFound
+
+        """
+        for group_id in group_ids:
+            self.get_group(group_id)
+
     @abc.abstractmethod
     def update_group(self, group_id, group):
         """Updates an existing group.
@@ -82,6 +82,7 @@ except AttributeError:  # Python 2.6 support
 INVALIDATE_USER_TOKEN_PERSISTENCE = 'invalidate_user_tokens'
 INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE = 'invalidate_user_project_tokens'
 INVALIDATE_USER_OAUTH_CONSUMER_TOKENS = 'invalidate_user_consumer_tokens'
+INVALIDATE_USERS_TOKEN_PERSISTENCE = 'invalidate_users_tokens'
 
 
 class ManagerNotificationWrapper(object):
@@ -400,6 +401,57 @@ class CadfRoleAssignmentNotificationWrapper(object):
         return wrapper
 
 
+class CadfRoleAssignmentsNotificationWrapper(object):
+    """Send a CADF notification for bulk ``role_assignment`` methods.
+
+    A single notification describes all the role assignments of the call.
+    It is sent if the wrapped method does not raise an ``Exception``.
+
+    :param operation: one of the values from ACTIONS (create or delete)
+    """
+
+    ROLE_ASSIGNMENTS = 'role_assignments'
+
+    def __init__(self, operation):
+        self.operation = "%s.%s" % (operation, self.ROLE_ASSIGNMENTS)
+
+    def __call__(self, f):
+        def wrapper(wrapped_self, grants, context=None):
+            """Send a notification if the wrapped callable is successful."""
+            initiator = _get_request_audit_info(context)
+
+            role_assignments = []
+            for grant in grants:
+                audit_info = {
+                    'role': grant['role_id'],
+                    'inherited_to_projects': grant.get(
+                        'inherited_to_projects', False)}
+                if grant.get('project_id'):
+                    audit_info['project'] = grant['project_id']
+                elif grant.get('domain_id'):
+                    audit_info['domain'] = grant['domain_id']
+                if grant.get('user_id'):
+                    audit_info['user'] = grant['user_id']
+                elif grant.get('group_id'):
+                    audit_info['group'] = grant['group_id']
+                role_assignments.append(audit_info)
+
+            try:
+                result = f(wrapped_self, grants, context=context)
+            except Exception:
+                _send_audit_notification(self.operation, initiator,
+                                         taxonomy.OUTCOME_FAILURE,
+                                         role_assignments=role_assignments)
+                raise
+            else:
+                _send_audit_notification(self.operation, initiator,
+                                         taxonomy.OUTCOME_SUCCESS,
+                                         role_assignments=role_assignments)
+                return result
+
+        return wrapper
+
+
 def send_saml_audit_notification(action, context, user_id, group_ids,
                                  identity_provider, protocol, token_id,
                                  outcome):
@@ -461,3 +513,6 @@ emit_event = CadfNotificationWrapper
 
 
 role_assignment = CadfRoleAssignmentNotificationWrapper
+
+
+role_assignments = CadfRoleAssignmentsNotificationWrapper
@@ -15,6 +15,8 @@
 import copy
 import uuid
 
+import mock
+
 # NOTE(morganfainberg): import endpoint filter to populate the SQL model
 from keystone.contrib import endpoint_filter  # flake8: noqa
 from keystone.tests import test_v3
@@ -538,6 +540,82 @@ class EndpointFilterTokenRequestTestCase(TestExtensionCase):
         endpoint_ids = [ep['id'] for ep in endpoints]
         self.assertEqual([self.endpoint_id], endpoint_ids)
 
+    def test_project_scoped_token_using_endpoint_group(self):
+        """Verify endpoints of an endpoint group are in the catalog."""
+        # create an endpoint group holding the default endpoint
+        body = {'endpoint_group': {
+            'name': uuid.uuid4().hex,
+            'filters': {'service_id': self.service_id}}}
+        r = self.post('/OS-EP-FILTER/endpoint_groups', body=body)
+        endpoint_group_url = ('/OS-EP-FILTER/endpoint_groups/%s' %
+                              r.result['endpoint_group']['id'])
+
+        # add the endpoint group to the default project
+        self.put('%(endpoint_group_url)s/projects/%(project_id)s' % {
+                 'endpoint_group_url': endpoint_group_url,
+                 'project_id': self.project['id']})
+
+        auth_data = self.build_authentication_request(
+            user_id=self.user['id'],
+            password=self.user['password'],
+            project_id=self.project['id'])
+        r = self.post('/auth/tokens', body=auth_data)
+        endpoints = r.result['token']['catalog'][0]['endpoints']
+        self.assertEqual([self.endpoint_id], [ep['id'] for ep in endpoints])
+
+        # once the endpoint group no longer holds it, the endpoint is out of
+        # the catalog
+        body['endpoint_group']['filters'] = {'service_id': uuid.uuid4().hex}
+        self.patch(endpoint_group_url, body=body)
+        r = self.post('/auth/tokens', body=auth_data)
+        self.assertEqual([], r.result['token']['catalog'])
+
+    def test_default_catalog_for_project(self):
+        """Verify the default of the driver interface matches the SQL one."""
+        driver = self.endpoint_filter_api.driver
+
+        def default_catalog(project_id):
+            # The SQL driver does not inherit the interface, so lend it the
+            # catalog it needs to run the default.
+            with mock.patch.object(driver, 'catalog_api', self.catalog_api,
+                                   create=True):
+                return endpoint_filter.Driver.get_catalog_for_project(
+                    driver, project_id)
+
+        def endpoint_ids(services):
+            return sorted(endpoint['id'] for service in services
+                          for endpoint in service['endpoints'])
+
+        self.assertIsNone(default_catalog(self.project['id']))
+
+        # a disabled endpoint associated directly is left out
+        disabled_endpoint_ref = copy.copy(self.endpoint)
+        disabled_endpoint_id = uuid.uuid4().hex
+        disabled_endpoint_ref.update({'id': disabled_endpoint_id,
+                                      'enabled': False})
+        self.catalog_api.create_endpoint(disabled_endpoint_id,
+                                         disabled_endpoint_ref)
+        self.endpoint_filter_api.add_endpoint_to_project(
+            disabled_endpoint_id, self.project['id'])
+        self.assertEqual([], default_catalog(self.project['id']))
+
+        # an endpoint group holding the default endpoint brings it in
+        body = {'endpoint_group': {
+            'name': uuid.uuid4().hex,
+            'filters': {'service_id': self.service_id}}}
+        r = self.post('/OS-EP-FILTER/endpoint_groups', body=body)
+        self.put('/OS-EP-FILTER/endpoint_groups/%(endpoint_group_id)s'
+                 '/projects/%(project_id)s' % {
+                     'endpoint_group_id': r.result['endpoint_group']['id'],
+                     'project_id': self.project['id']})
+
+        services = default_catalog(self.project['id'])
+        self.assertEqual([self.service_id], [s['id'] for s in services])
+        self.assertEqual([self.endpoint_id], endpoint_ids(services))
+        self.assertEqual(
+            endpoint_ids(driver.get_catalog_for_project(self.project['id'])),
+            endpoint_ids(services))
+
 
 class JsonHomeTests(TestExtensionCase, test_v3.JsonHomeTestMixin):
     JSON_HOME_DATA = {
@@ -926,6 +1004,47 @@ class EndpointGroupCRUDTestCase(TestExtensionCase):
         self.assertNotEmpty(r.result['endpoints'])
         self.assertEqual(endpoint_id, r.result['endpoints'][0].get('id'))
 
+    def test_list_endpoints_associated_with_endpoint_group_after_changes(self):
+        """GET /OS-EP-FILTER/endpoint_groups/{endpoint_group}/endpoints
+
+        Endpoints which are updated or deleted test case.
+
+        """
+        # create an endpoint group matching a new service
+        service_id = uuid.uuid4().hex
+        body = copy.deepcopy(self.DEFAULT_ENDPOINT_GROUP_BODY)
+        body['endpoint_group']['filters'] = {'service_id': service_id}
+        endpoint_group_id = self._create_valid_endpoint_group(
+            self.DEFAULT_ENDPOINT_GROUP_URL, body)
+        url = ('/OS-EP-FILTER/endpoint_groups/%(endpoint_group_id)s'
+               '/endpoints' % {'endpoint_group_id': endpoint_group_id})
+        r = self.get(url)
+        self.assertEqual([], r.result['endpoints'])
+
+        # create the service and an endpoint for it
+        service_ref = self.new_service_ref()
+        service_ref['id'] = service_id
+        self.catalog_api.create_service(service_id, service_ref)
+        endpoint_ref = self.new_endpoint_ref(service_id=service_id)
+        r = self.post('/endpoints', body={'endpoint': endpoint_ref})
+        endpoint_id = r.result['endpoint']['id']
+        r = self.get(url)
+        self.assertEqual([endpoint_id],
+                         [e['id'] for e in r.result['endpoints']])
+
+        # move the default endpoint to the service
+        self.patch('/endpoints/%s' % self.endpoint_id,
+                   body={'endpoint': {'service_id': service_id}})
+        r = self.get(url)
+        self.assertEqual(sorted([endpoint_id, self.endpoint_id]),
+                         sorted(e['id'] for e in r.result['endpoints']))
+
+        # delete the new endpoint
+        self.delete('/endpoints/%s' % endpoint_id)
+        r = self.get(url)
+        self.assertEqual([self.endpoint_id],
+                         [e['id'] for e in r.result['endpoints']])
+
     def test_list_endpoints_associated_with_project_endpoint_group(self):
         """GET /OS-EP-FILTER/projects/{project_id}/endpoints
 
@@ -552,6 +552,57 @@ class IdentityTests(object):
              'role_id': 'admin'},
             assignment_list)
 
+    def test_list_role_assignments_filtered(self):
+        new_user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                    'enabled': True, 'domain_id': DEFAULT_DOMAIN_ID}
+        new_user = self.identity_api.create_user(new_user)
+        new_group = {'domain_id': DEFAULT_DOMAIN_ID, 'name': uuid.uuid4().hex}
+        new_group = self.identity_api.create_group(new_group)
+        new_projects = []
+        for i in range(2):
+            new_project = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+                           'domain_id': DEFAULT_DOMAIN_ID}
+            self.assignment_api.create_project(new_project['id'], new_project)
+            new_projects.append(new_project)
+        self.assignment_api.create_grant(user_id=new_user['id'],
+                                         project_id=new_projects[0]['id'],
+                                         role_id='member')
+        self.assignment_api.create_grant(group_id=new_group['id'],
+                                         project_id=new_projects[1]['id'],
+                                         role_id='other')
+
+        user_assignment = {'user_id': new_user['id'],
+                           'project_id': new_projects[0]['id'],
+                           'role_id': 'member'}
+        group_assignment = {'group_id': new_group['id'],
+                            'project_id': new_projects[1]['id'],
+                            'role_id': 'other'}
+        self.assertEqual(
+            [user_assignment],
+            self.assignment_api.list_role_assignments(
+                user_id=new_user['id']))
+        self.assertEqual(
+            [group_assignment],
+            self.assignment_api.list_role_assignments(
+                group_ids=[new_group['id']]))
+        assignment_list = self.assignment_api.list_role_assignments(
+            user_id=new_user['id'], group_ids=[new_group['id']])
+        self.assertEqual(2, len(assignment_list))
+        self.assertIn(user_assignment, assignment_list)
+        self.assertIn(group_assignment, assignment_list)
+        self.assertEqual(
+            [group_assignment],
+            self.assignment_api.list_role_assignments(
+                user_id=new_user['id'], group_ids=[new_group['id']],
+                project_ids=[new_projects[1]['id']]))
+        self.assertEqual(
+            [],
+            self.assignment_api.list_role_assignments(
+                user_id=new_user['id'], role_id='other'))
+        self.assertEqual(
+            [],
+            self.assignment_api.list_role_assignments(group_ids=[]))
+
     def test_list_group_role_assignment(self):
         # When a group role assignment is created and the role assignments are
         # listed then the group role assignment is included in the list.
@@ -845,6 +896,47 @@ class IdentityTests(object):
                           project_id=self.tenant_baz['id'],
                           role_id='member')
 
+    def test_create_and_delete_grants(self):
+        new_group = {'domain_id': DEFAULT_DOMAIN_ID,
+                     'name': uuid.uuid4().hex}
+        new_group = self.identity_api.create_group(new_group)
+        grants = [
+            {'user_id': self.user_foo['id'],
+             'project_id': self.tenant_baz['id'],
+             'role_id': 'member'},
+            {'group_id': new_group['id'],
+             'project_id': self.tenant_bar['id'],
+             'role_id': 'member'},
+        ]
+        self.assignment_api.create_grants(grants)
+        # Creating existing grants again is silent.
+        self.assignment_api.create_grants(grants)
+        roles_ref = self.assignment_api.list_grants(
+            user_id=self.user_foo['id'],
+            project_id=self.tenant_baz['id'])
+        self.assertDictEqual(self.role_member, roles_ref[0])
+        roles_ref = self.assignment_api.list_grants(
+            group_id=new_group['id'],
+            project_id=self.tenant_bar['id'])
+        self.assertDictEqual(self.role_member, roles_ref[0])
+
+        self.assignment_api.delete_grants(grants)
+        # Deleting missing grants is silent as well.
+        self.assignment_api.delete_grants(grants)
+        self.assertEqual([], self.assignment_api.list_grants(
+            user_id=self.user_foo['id'],
+            project_id=self.tenant_baz['id']))
+        self.assertEqual([], self.assignment_api.list_grants(
+            group_id=new_group['id'],
+            project_id=self.tenant_bar['id']))
+
+        grants.append({'user_id': self.user_foo['id'],
+                       'project_id': uuid.uuid4().hex,
+                       'role_id': 'member'})
+        self.assertRaises(exception.ProjectNotFound,
+                          self.assignment_api.create_grants,
+                          grants)
+
     def test_get_and_remove_role_grant_by_group_and_project(self):
         new_domain = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
         self.assignment_api.create_domain(new_domain['id'], new_domain)
@@ -3256,6 +3348,81 @@ class IdentityTests(object):
                           self.assignment_api.get_role,
                           role_id)
 
+    @tests.skip_if_cache_disabled('identity')
+    def test_list_group_ids_for_user(self):
+        domain = self._get_domain_fixture()
+        user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                'enabled': True, 'domain_id': domain['id']}
+        user = self.identity_api.create_user(user)
+        self.assertEqual([],
+                         self.identity_api.list_group_ids_for_user(user['id']))
+
+        group_ids = set()
+        for x in range(0, 3):
+            group = {'domain_id': domain['id'], 'name': uuid.uuid4().hex}
+            group = self.identity_api.create_group(group)
+            self.identity_api.add_user_to_group(user['id'], group['id'])
+            group_ids.add(group['id'])
+            self.assertEqual(
+                group_ids,
+                set(self.identity_api.list_group_ids_for_user(user['id'])))
+        self.assertEqual(
+            set(g['id'] for g in
+                self.identity_api.list_groups_for_user(user['id'])),
+            set(self.identity_api.list_group_ids_for_user(user['id'])))
+
+        group_id = group_ids.pop()
+        self.identity_api.remove_user_from_group(user['id'], group_id)
+        self.assertEqual(
+            group_ids,
+            set(self.identity_api.list_group_ids_for_user(user['id'])))
+        group_id = group_ids.pop()
+        self.identity_api.delete_group(group_id)
+        self.assertEqual(
+            group_ids,
+            set(self.identity_api.list_group_ids_for_user(user['id'])))
+
+        self.identity_api.delete_user(user['id'])
+        self.assertRaises(exception.UserNotFound,
+                          self.identity_api.list_group_ids_for_user,
+                          user['id'])
+
+    @tests.skip_if_cache_disabled('assignment')
+    def test_cache_layer_roles_for_user_and_project(self):
+        role = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+        self.assignment_api.create_role(role['id'], role)
+        roles = self.assignment_api.get_roles_for_user_and_project(
+            self.user_foo['id'], self.tenant_bar['id'])
+        self.assertNotIn(role['id'], roles)
+        # Add role, bypassing the assignment api manager
+        self.assignment_api.driver.add_role_to_user_and_project(
+            self.user_foo['id'], self.tenant_bar['id'], role['id'])
+        # Verify the cached roles are still returned
+        self.assertNotIn(role['id'],
+                         self.assignment_api.get_roles_for_user_and_project(
+                             self.user_foo['id'], self.tenant_bar['id']))
+        # Invalidate the roles of the user
+        self.assignment_api.invalidate_roles_for_user(self.user_foo['id'])
+        self.assertIn(role['id'],
+                      self.assignment_api.get_roles_for_user_and_project(
+                          self.user_foo['id'], self.tenant_bar['id']))
+        # Remove role via the assignment api manager
+        self.assignment_api.remove_role_from_user_and_project(
+            self.user_foo['id'], self.tenant_bar['id'], role['id'])
+        self.assertNotIn(role['id'],
+                         self.assignment_api.get_roles_for_user_and_project(
+                             self.user_foo['id'], self.tenant_bar['id']))
+        # Add role via the assignment api manager, and delete it
+        self.assignment_api.add_role_to_user_and_project(
+            self.user_foo['id'], self.tenant_bar['id'], role['id'])
+        self.assertIn(role['id'],
+                      self.assignment_api.get_roles_for_user_and_project(
+                          self.user_foo['id'], self.tenant_bar['id']))
+        self.assignment_api.delete_role(role['id'])
+        self.assertNotIn(role['id'],
+                         self.assignment_api.get_roles_for_user_and_project(
+                             self.user_foo['id'], self.tenant_bar['id']))
+
     def create_user_dict(self, **attributes):
         user_dict = {'name': uuid.uuid4().hex,
                      'domain_id': DEFAULT_DOMAIN_ID,
@@ -3597,6 +3764,75 @@ class TokenTests(object):
         self._test_token_list(
             self.token_provider_api._persistence._list_tokens)
 
+    def test_create_tokens(self):
+        tokens = []
+        for i in range(3):
+            token_id = self._create_token_id()
+            tokens.append((token_id, {'id': token_id, 'a': 'b',
+                                      'trust_id': None,
+                                      'user': {'id': 'testuserid'}}))
+        token_refs = self.token_provider_api._persistence.create_tokens(
+            tokens)
+        self.assertEqual(3, len(token_refs))
+        for token_id, data in tokens:
+            token_ref = self.token_provider_api._persistence.get_token(
+                token_id)
+            self.assertEqual('b', token_ref['a'])
+        self.assertEqual([], self.token_provider_api._persistence.
+                         create_tokens([]))
+
+    def test_delete_tokens_bulk(self):
+        tenant_id = uuid.uuid4().hex
+        token_id1, data = self.create_token_sample_data(
+            tenant_id=tenant_id, user_id='testuserid1')
+        token_id2, data = self.create_token_sample_data(
+            tenant_id=tenant_id, user_id='testuserid2')
+        token_id3, data = self.create_token_sample_data(
+            tenant_id=uuid.uuid4().hex, user_id='testuserid2')
+        token_id4, data = self.create_token_sample_data(
+            tenant_id=tenant_id, user_id='testuserid3')
+
+        self.token_provider_api._persistence.delete_tokens_bulk(
+            ['testuserid1', 'testuserid2'], tenant_id=tenant_id)
+        for token_id in (token_id1, token_id2):
+            self.assertRaises(exception.TokenNotFound,
+                              self.token_provider_api._persistence.get_token,
+                              token_id)
+        self.token_provider_api._persistence.get_token(token_id3)
+        self.token_provider_api._persistence.get_token(token_id4)
+
+        self.token_provider_api._persistence.delete_tokens_bulk(
+            ['testuserid2'])
+        self.assertRaises(exception.TokenNotFound,
+                          self.token_provider_api._persistence.get_token,
+                          token_id3)
+        self.token_provider_api._persistence.get_token(token_id4)
+
+    def test_delete_tokens_for_users_and_projects(self):
+        tenant_id1 = uuid.uuid4().hex
+        tenant_id2 = uuid.uuid4().hex
+        token_id1, data = self.create_token_sample_data(
+            tenant_id=tenant_id1, user_id='testuserid1')
+        token_id2, data = self.create_token_sample_data(
+            tenant_id=tenant_id2, user_id='testuserid1')
+        token_id3, data = self.create_token_sample_data(
+            tenant_id=tenant_id1, user_id='testuserid2')
+        token_id4, data = self.create_token_sample_data(
+            tenant_id=tenant_id2, user_id='testuserid2')
+        token_id5, data = self.create_token_sample_data(
+            tenant_id=tenant_id1, user_id='testuserid3')
+
+        persistence = self.token_provider_api._persistence
+        persistence.delete_tokens_for_users_and_projects(
+            user_ids=['testuserid1'],
+            user_project_ids=[('testuserid1', tenant_id2),
+                              ('testuserid2', tenant_id1)])
+        for token_id in (token_id1, token_id2, token_id3):
+            self.assertRaises(exception.TokenNotFound,
+                              persistence.get_token, token_id)
+        for token_id in (token_id4, token_id5):
+            persistence.get_token(token_id)
+
     def test_token_list_trust(self):
         trust_id = uuid.uuid4().hex
         token_id5, data = self.create_token_sample_data(trust_id=trust_id)
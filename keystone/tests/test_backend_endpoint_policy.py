@@ -14,6 +14,7 @@
 
 import uuid
 
+import mock
 from testtools import matchers
 
 from keystone import exception
@@ -185,6 +186,47 @@ class PolicyAssociationTests(object):
         self._assert_correct_endpoints(
             self.policy[0], [self.endpoint[0], self.endpoint[5]])
 
+    def test_region_and_service_association_follows_region_changes(self):
+        self.endpoint_policy_api.create_policy_association(
+            self.policy[0]['id'], service_id=self.service[0]['id'],
+            region_id=self.region[1]['id'])
+        # Endpoint 5 is in region 2 below region 1, with service 0
+        self._assert_correct_policy(self.endpoint[5], self.policy[0])
+        self._assert_correct_endpoints(self.policy[0], [self.endpoint[5]])
+
+        # Add a region below region 2 with another endpoint of service 0,
+        # and move region 2 up to the top of the tree
+        region = {'id': uuid.uuid4().hex, 'description': uuid.uuid4().hex,
+                  'parent_region_id': self.region[2]['id']}
+        region = self.catalog_api.create_region(region)
+        endpoint = {'id': uuid.uuid4().hex, 'interface': 'test',
+                    'region_id': region['id'],
+                    'service_id': self.service[0]['id'], 'url': '/url'}
+        endpoint = self.catalog_api.create_endpoint(endpoint['id'], endpoint)
+        self._assert_correct_policy(endpoint, self.policy[0])
+        self._assert_correct_endpoints(self.policy[0],
+                                       [self.endpoint[5], endpoint])
+
+        self.catalog_api.update_region(self.region[2]['id'],
+                                       {'parent_region_id': None})
+        self.assertRaises(exception.NotFound,
+                          self.endpoint_policy_api.get_policy_for_endpoint,
+                          endpoint['id'])
+        self._assert_correct_endpoints(self.policy[0], [])
+
+    def test_region_walk_without_catalog_caching(self):
+        self.config_fixture.config(group='catalog', caching=False)
+        self.endpoint_policy_api.create_policy_association(
+            self.policy[0]['id'], service_id=self.service[0]['id'],
+            region_id=self.region[0]['id'])
+
+        # Without caching the region tree would be rebuilt for every
+        # endpoint, so the parent regions are looked up one at a time.
+        with mock.patch.object(self.catalog_api,
+                               'get_region_tree') as get_region_tree:
+            self._assert_correct_policy(self.endpoint[5], self.policy[0])
+        self.assertFalse(get_region_tree.called)
+
     def test_delete_association_by_entity(self):
         self.endpoint_policy_api.create_policy_association(
             self.policy[0]['id'], endpoint_id=self.endpoint[0]['id'])
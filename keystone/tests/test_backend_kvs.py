@@ -14,6 +14,7 @@
 import datetime
 import uuid
 
+import mock
 from oslo.utils import timeutils
 import six
 from testtools import matchers
@@ -24,6 +25,7 @@ from keystone import tests
 from keystone.tests import default_fixtures
 from keystone.tests.ksfixtures import database
 from keystone.tests import test_backend
+from keystone.token.persistence.backends import kvs
 
 
 CONF = config.CONF
@@ -153,70 +155,134 @@ class KvsToken(tests.TestCase, test_backend.TokenTests):
             exception.NotImplemented,
             self.token_provider_api._persistence.flush_expired_tokens)
 
-    def _update_user_token_index_direct(self, user_key, token_id, new_data):
-        persistence = self.token_provider_api._persistence
-        token_list = persistence.driver._get_user_token_list_with_expiry(
-            user_key)
-        # Update the user-index so that the expires time is _actually_ expired
-        # since we do not do an explicit get on the token, we only reference
-        # the data in the user index (to save extra round-trips to the kvs
-        # backend).
-        for i, data in enumerate(token_list):
-            if data[0] == token_id:
-                token_list[i] = new_data
-                break
-        self.token_provider_api._persistence.driver._store.set(user_key,
-                                                               token_list)
-
-    def test_cleanup_user_index_on_create(self):
+    def _pin_clock(self):
+        # Start at the top of an hour, so that the tokens expiring in the
+        # next hour fall in the next bucket.
+        now = timeutils.utcnow().replace(minute=0, second=0, microsecond=0)
+        patcher = mock.patch.object(timeutils, 'utcnow', return_value=now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return now
+
+    def test_user_index_bucketed_by_expiry(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_persistence = self.token_provider_api._persistence
+        driver = token_persistence.driver
+        user_key = driver._prefix_user_id(user_id)
+
+        now = self._pin_clock()
+        expires_1 = now + datetime.timedelta(minutes=5)
+        expires_2 = now + datetime.timedelta(minutes=65)
+        token_id_1, data = self.create_token_sample_data(user_id=user_id,
+                                                         expires=expires_1)
+        token_id_2, data = self.create_token_sample_data(user_id=user_id,
+                                                         expires=expires_2)
+
+        # Each token is stored with an integer expiry, in the bucket of the
+        # hour it expires in.
+        expires_1 = kvs._timestamp(expires_1)
+        expires_2 = kvs._timestamp(expires_2)
+        self.assertEqual(
+            [(token_id_1, expires_1)],
+            driver._index_store.get(driver._bucket_key(user_key, expires_1)))
+        self.assertEqual(
+            [(token_id_2, expires_2)],
+            driver._index_store.get(driver._bucket_key(user_key, expires_2)))
+        self.assertRaises(exception.NotFound, driver._index_store.get,
+                          user_key)
+
+        tokens = token_persistence._list_tokens(user_id)
+        self.assertEqual(set([token_id_1, token_id_2]), set(tokens))
+
+    def test_user_index_lists_tokens_expiring_after_expiration(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_persistence = self.token_provider_api._persistence
+
+        now = self._pin_clock()
+        expires = now + datetime.timedelta(seconds=CONF.token.expiration,
+                                           hours=3)
+        token_id, data = self.create_token_sample_data(user_id=user_id,
+                                                       expires=expires)
+        self.assertEqual([token_id], token_persistence._list_tokens(user_id))
+
+        token_persistence.delete_tokens(user_id)
+        self.assertRaises(exception.TokenNotFound,
+                          token_persistence.get_token, token_id)
+
+    def test_user_index_skips_revoked_and_expired_tokens(self):
         user_id = six.text_type(uuid.uuid4().hex)
+        token_persistence = self.token_provider_api._persistence
         valid_token_id, data = self.create_token_sample_data(user_id=user_id)
-        expired_token_id, expired_data = self.create_token_sample_data(
+        revoked_token_id, data = self.create_token_sample_data(
             user_id=user_id)
+        token_persistence.delete_token(revoked_token_id)
+
+        # Tokens are no longer checked against the revocation list when
+        # they are added to the index, only when the index is read.
+        tokens = token_persistence._list_tokens(user_id)
+        self.assertEqual([valid_token_id], tokens)
 
-        expire_delta = datetime.timedelta(seconds=86400)
+        expired = timeutils.utcnow() + datetime.timedelta(days=1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=expired):
+            self.assertEqual([], token_persistence._list_tokens(user_id))
 
-        # NOTE(morganfainberg): Directly access the data cache since we need to
-        # get expired tokens as well as valid tokens.
+    def test_user_index_reads_legacy_list(self):
+        user_id = six.text_type(uuid.uuid4().hex)
         token_persistence = self.token_provider_api._persistence
-        user_key = token_persistence.driver._prefix_user_id(user_id)
-        user_token_list = token_persistence.driver._store.get(user_key)
-        valid_token_ref = token_persistence.get_token(valid_token_id)
-        expired_token_ref = token_persistence.get_token(expired_token_id)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (expired_token_id, timeutils.isotime(expired_token_ref['expires'],
-                                                 subsecond=True))]
-        self.assertEqual(expected_user_token_list, user_token_list)
-        new_expired_data = (expired_token_id,
-                            timeutils.isotime(
-                                (timeutils.utcnow() - expire_delta),
-                                subsecond=True))
-        self._update_user_token_index_direct(user_key, expired_token_id,
-                                             new_expired_data)
-        valid_token_id_2, valid_data_2 = self.create_token_sample_data(
-            user_id=user_id)
-        valid_token_ref_2 = token_persistence.get_token(valid_token_id_2)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (valid_token_id_2, timeutils.isotime(valid_token_ref_2['expires'],
-                                                 subsecond=True))]
-        user_token_list = token_persistence.driver._store.get(user_key)
-        self.assertEqual(expected_user_token_list, user_token_list)
-
-        # Test that revoked tokens are removed from the list on create.
-        token_persistence.delete_token(valid_token_id_2)
-        new_token_id, data = self.create_token_sample_data(user_id=user_id)
-        new_token_ref = token_persistence.get_token(new_token_id)
-        expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
-            (new_token_id, timeutils.isotime(new_token_ref['expires'],
-                                             subsecond=True))]
-        user_token_list = token_persistence.driver._store.get(user_key)
-        self.assertEqual(expected_user_token_list, user_token_list)
+        driver = token_persistence.driver
+        token_id, data = self.create_token_sample_data(user_id=user_id)
+        token_ref = token_persistence.get_token(token_id)
+
+        # Move the token to the list used before the index was bucketed.
+        user_key = driver._prefix_user_id(user_id)
+        expires = kvs._timestamp(token_ref['expires'])
+        driver._index_store.delete(driver._bucket_key(user_key, expires))
+        driver._index_store.set(user_key, [
+            (token_id, timeutils.isotime(token_ref['expires'],
+                                         subsecond=True))])
+
+        self.assertEqual([token_id], token_persistence._list_tokens(user_id))
+
+    def test_revocation_list_bucketed_by_expiry(self):
+        token_persistence = self.token_provider_api._persistence
+        driver = token_persistence.driver
+
+        now = self._pin_clock()
+        expires_1 = now + datetime.timedelta(minutes=5)
+        expires_2 = now + datetime.timedelta(minutes=65)
+        token_id_1, data = self.create_token_sample_data(expires=expires_1)
+        token_id_2, data = self.create_token_sample_data(expires=expires_2)
+        token_persistence.delete_token(token_id_1)
+        token_persistence.delete_token(token_id_2)
+
+        for token_id, expires in [(token_id_1, expires_1),
+                                  (token_id_2, expires_2)]:
+            bucket_key = driver._bucket_key(driver.revocation_key,
+                                            kvs._timestamp(expires))
+            revoked = driver._index_store.get(bucket_key)
+            self.assertEqual([token_id], [t['id'] for t in revoked])
+        self.assertRaises(exception.NotFound, driver._index_store.get,
+                          driver.revocation_key)
+
+        revoked = [t['id'] for t in token_persistence.list_revoked_tokens()]
+        self.assertEqual(set([token_id_1, token_id_2]), set(revoked))
+
+        later = now + datetime.timedelta(minutes=10)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            revoked = [t['id'] for t in driver.list_revoked_tokens()]
+        self.assertEqual([token_id_2], revoked)
+
+    def test_revocation_list_lists_tokens_expiring_after_expiration(self):
+        token_persistence = self.token_provider_api._persistence
+
+        now = self._pin_clock()
+        expires = now + datetime.timedelta(seconds=CONF.token.expiration,
+                                           hours=3)
+        token_id, data = self.create_token_sample_data(expires=expires)
+        token_persistence.delete_token(token_id)
+
+        revoked = [t['id'] for t in token_persistence.list_revoked_tokens()]
+        self.assertEqual([token_id], revoked)
 
 
 class KvsTrust(tests.TestCase, test_backend.TrustTests):
@@ -105,6 +105,12 @@ class SqlModels(SqlTests):
                 ('extra', sql.JsonBlob, None))
         self.assertExpectedSchema('project', cols)
 
+    def test_project_hierarchy_model(self):
+        cols = (('ancestor_id', sql.String, 64),
+                ('descendant_id', sql.String, 64),
+                ('depth', sql.Integer, None))
+        self.assertExpectedSchema('project_hierarchy', cols)
+
     def test_role_model(self):
         cols = (('id', sql.String, 64),
                 ('name', sql.String, 255))
@@ -371,6 +377,151 @@ class SqlIdentity(SqlTests, test_backend.IdentityTests):
         user_domains = self.assignment_api.list_domains_for_user(user['id'])
         self.assertThat(user_domains, matchers.HasLength(3))
 
+    def _create_project_chain(self, count):
+        projects = []
+        parent_id = None
+        for i in range(count):
+            project = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+                       'domain_id': DEFAULT_DOMAIN_ID, 'parent_id': parent_id}
+            self.assignment_api.create_project(project['id'], project)
+            projects.append(project)
+            parent_id = project['id']
+        return projects
+
+    def _get_project_hierarchy(self):
+        session = sql.get_session()
+        table = sqlalchemy.Table('project_hierarchy', sql.ModelBase.metadata,
+                                 autoload=True)
+        return set(tuple(row) for row in
+                   session.execute(sqlalchemy.select([table])))
+
+    def test_project_hierarchy_maintained(self):
+        initial = self._get_project_hierarchy()
+        a, b, c = self._create_project_chain(3)
+        self.assertEqual(
+            set([(a['id'], a['id'], 0), (b['id'], b['id'], 0),
+                 (c['id'], c['id'], 0), (a['id'], b['id'], 1),
+                 (b['id'], c['id'], 1), (a['id'], c['id'], 2)]),
+            self._get_project_hierarchy() - initial)
+
+        self.assignment_api.delete_project(c['id'])
+        self.assertEqual(
+            set([(a['id'], a['id'], 0), (b['id'], b['id'], 0),
+                 (a['id'], b['id'], 1)]),
+            self._get_project_hierarchy() - initial)
+
+    def test_move_project_in_hierarchy(self):
+        a, b, c = self._create_project_chain(3)
+        d, = self._create_project_chain(1)
+
+        # The manager does not allow to update parent_id, but the driver
+        # supports it.
+        self.assignment_api.driver.update_project(b['id'],
+                                                  {'parent_id': d['id']})
+        parents = self.assignment_api.list_project_parents(c['id'])
+        self.assertEqual([b['id'], d['id']], [p['id'] for p in parents])
+        subtree = self.assignment_api.get_project_subtree(a['id'])
+        self.assertEqual([], subtree)
+
+        self.assertRaises(exception.ValidationError,
+                          self.assignment_api.driver.update_project,
+                          b['id'], {'parent_id': c['id']})
+
+    def test_get_effective_roles(self):
+        self.config_fixture.config(group='os_inherit', enabled=True)
+        roles = []
+        for i in range(5):
+            role = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+            self.assignment_api.create_role(role['id'], role)
+            roles.append(role['id'])
+        user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                'domain_id': DEFAULT_DOMAIN_ID, 'enabled': True}
+        user = self.identity_api.create_user(user)
+        group = {'name': uuid.uuid4().hex, 'domain_id': DEFAULT_DOMAIN_ID}
+        group = self.identity_api.create_group(group)
+        self.identity_api.add_user_to_group(user['id'], group['id'])
+        root, parent, project = self._create_project_chain(3)
+
+        # A direct and a group role on the project, inherited roles on the
+        # domain and on the root, and a role on the parent which is not
+        # inherited.
+        self.assignment_api.create_grant(roles[0], user_id=user['id'],
+                                         project_id=project['id'])
+        self.assignment_api.create_grant(roles[1], group_id=group['id'],
+                                         project_id=project['id'])
+        self.assignment_api.create_grant(roles[2], group_id=group['id'],
+                                         domain_id=DEFAULT_DOMAIN_ID,
+                                         inherited_to_projects=True)
+        self.assignment_api.create_grant(roles[3], user_id=user['id'],
+                                         project_id=root['id'],
+                                         inherited_to_projects=True)
+        self.assignment_api.create_grant(roles[4], user_id=user['id'],
+                                         project_id=parent['id'])
+
+        role_ids = self.assignment_api.driver.get_effective_roles(
+            user['id'], [group['id']], project['id'])
+        self.assertEqual(set(roles[:4]), set(role_ids))
+        self.assertEqual(4, len(role_ids))
+        self.assertEqual(
+            set(roles[:4]),
+            set(self.assignment_api.get_roles_for_user_and_project(
+                user['id'], project['id'])))
+
+        self.config_fixture.config(group='os_inherit', enabled=False)
+        role_ids = self.assignment_api.driver.get_effective_roles(
+            user['id'], [group['id']], project['id'])
+        self.assertEqual(set(roles[:2]), set(role_ids))
+
+    def test_delete_domain_with_project_tree(self):
+        initial = self._get_project_hierarchy()
+        domain = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+        self.assignment_api.create_domain(domain['id'], domain)
+        projects = []
+        for parent_id in [None, 0, 0, 1, 3]:
+            project = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+                       'domain_id': domain['id'], 'parent_id': None}
+            if parent_id is not None:
+                project['parent_id'] = projects[parent_id]['id']
+            self.assignment_api.create_project(project['id'], project)
+            projects.append(project)
+        self.assignment_api.create_grant('member', user_id=self.user_foo['id'],
+                                         project_id=projects[4]['id'])
+
+        domain['enabled'] = False
+        self.assignment_api.update_domain(domain['id'], domain)
+        self.assignment_api.delete_domain(domain['id'])
+
+        for project in projects:
+            self.assertRaises(exception.ProjectNotFound,
+                              self.assignment_api.get_project,
+                              project['id'])
+        self.assertEqual(initial, self._get_project_hierarchy())
+        self.assertEqual(
+            [], self.assignment_api.list_role_assignments(
+                project_ids=[projects[4]['id']]))
+
+    def test_list_projects_for_user_with_hints(self):
+        self.config_fixture.config(group='os_inherit', enabled=True)
+        user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                'domain_id': DEFAULT_DOMAIN_ID, 'enabled': True}
+        user = self.identity_api.create_user(user)
+        root, parent, project = self._create_project_chain(3)
+        self.assignment_api.create_grant('member', user_id=user['id'],
+                                         project_id=parent['id'],
+                                         inherited_to_projects=True)
+
+        refs = self.assignment_api.list_projects_for_user(user['id'])
+        self.assertEqual(set([parent['id'], project['id']]),
+                         set(ref['id'] for ref in refs))
+
+        # The filters are satisfied by the driver.
+        hints = driver_hints.Hints()
+        hints.add_filter('name', project['name'])
+        refs = self.assignment_api.list_projects_for_user(user['id'],
+                                                          hints=hints)
+        self.assertEqual([project['id']], [ref['id'] for ref in refs])
+        self.assertEqual([], hints.filters)
+
 
 class SqlTrust(SqlTests, test_backend.TrustTests):
     pass
@@ -392,6 +543,17 @@ class SqlToken(SqlTests, test_backend.TokenTests):
         mock_query = mock_sql.get_session().query
         mock_query.assert_called_with(*expected_query_args)
 
+    def test_list_tokens_for_user_uses_right_columns(self):
+        # Filtering on the project is done in SQL, so the token data never
+        # needs to be loaded.
+        with mock.patch.object(token_sql, 'sql') as mock_sql:
+            tok = token_sql.Token()
+            tok._list_tokens_for_user(uuid.uuid4().hex,
+                                      tenant_id=uuid.uuid4().hex)
+
+        mock_query = mock_sql.get_session().query
+        mock_query.assert_called_with(token_sql.TokenModel.id)
+
     def test_flush_expired_tokens_batch(self):
         # TODO(dstanek): This test should be rewritten to be less
         # brittle. The code will likely need to be changed first. I
@@ -520,6 +682,45 @@ class SqlCatalog(SqlTests, test_backend.CatalogTests):
         self.assertIsNone(catalog_endpoint.get('adminURL'))
         self.assertIsNone(catalog_endpoint.get('internalURL'))
 
+    @tests.skip_if_cache_disabled('catalog')
+    def test_compiled_catalog_follows_endpoint_changes(self):
+        service = {
+            'id': uuid.uuid4().hex,
+            'type': uuid.uuid4().hex,
+            'name': uuid.uuid4().hex,
+        }
+        self.catalog_api.create_service(service['id'], service.copy())
+
+        endpoint = {
+            'id': uuid.uuid4().hex,
+            'region_id': None,
+            'interface': 'public',
+            'url': 'http://compute/v2/$(tenant_id)s?user=$(user_id)s',
+            'service_id': service['id'],
+        }
+        self.catalog_api.create_endpoint(endpoint['id'], endpoint.copy())
+
+        # The catalog is compiled once, and rendered for each token.
+        with mock.patch.object(self.catalog_api.driver, 'compile_catalog',
+                               wraps=self.catalog_api.driver.compile_catalog
+                               ) as compile_catalog:
+            catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+            self.assertEqual('http://compute/v2/tenant?user=user',
+                             catalog[0]['endpoints'][0]['url'])
+            catalog = self.catalog_api.get_catalog('other', 'project')
+            catalog_endpoint = catalog[None][service['type']]
+            self.assertEqual('http://compute/v2/project?user=other',
+                             catalog_endpoint['publicURL'])
+            self.assertEqual(1, compile_catalog.call_count)
+
+            # Changing an endpoint makes the next token compile it again.
+            self.catalog_api.update_endpoint(endpoint['id'],
+                                             {'url': 'http://compute/v3'})
+            catalog = self.catalog_api.get_v3_catalog('user', 'tenant')
+            self.assertEqual('http://compute/v3',
+                             catalog[0]['endpoints'][0]['url'])
+            self.assertEqual(2, compile_catalog.call_count)
+
     def test_create_endpoint_region_404(self):
         service = {
             'id': uuid.uuid4().hex,
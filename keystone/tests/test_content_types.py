@@ -17,10 +17,12 @@ import time
 import uuid
 
 from keystoneclient.common import cms
+import mock
 import six
 from testtools import matchers
 
 from keystone.common import extension as keystone_extension
+from keystone.common import signing
 from keystone import config
 from keystone.tests import rest
 
@@ -1210,6 +1212,41 @@ class JsonTestCase(RestfulTestCase, CoreApiTests, LegacyV2UsernameTests):
             expected_status=200)
         self.assertValidRevocationListResponse(r)
 
+    def test_fetch_revocation_list_not_modified(self):
+        token = self.get_scoped_token()
+        r = self.admin_request(
+            method='GET',
+            path='/v2.0/tokens/revoked',
+            token=token,
+            expected_status=200)
+        etag = r.headers['ETag']
+
+        # A matching conditional request is answered without signing.
+        self.token_provider_api.invalidate_signed_revocation_list()
+        with mock.patch.object(signing, 'cms_sign_text') as cms_sign_text:
+            self.admin_request(
+                method='GET',
+                path='/v2.0/tokens/revoked',
+                token=token,
+                headers={'If-None-Match': etag},
+                convert=False,
+                expected_status=304)
+        self.assertFalse(cms_sign_text.called)
+
+        # Revoking a token changes the revocation list and its entity tag.
+        token2 = self.get_scoped_token()
+        self.admin_request(method='DELETE',
+                           path='/v2.0/tokens/%s' % token2,
+                           token=token)
+        r = self.admin_request(
+            method='GET',
+            path='/v2.0/tokens/revoked',
+            token=token,
+            headers={'If-None-Match': etag},
+            expected_status=200)
+        self.assertValidRevocationListResponse(r)
+        self.assertNotEqual(etag, r.headers['ETag'])
+
     def assertValidRevocationListResponse(self, response):
         self.assertIsNotNone(response.result['signed'])
 
@@ -1404,6 +1441,9 @@ class RevokeApiJsonTestCase(JsonTestCase):
     def test_fetch_revocation_list_sha256(self):
         self.skipTest('Revoke API disables revocation_list.')
 
+    def test_fetch_revocation_list_not_modified(self):
+        self.skipTest('Revoke API disables revocation_list.')
+
 
 class XmlTestCase(RestfulTestCase, CoreApiTests, LegacyV2UsernameTests):
     xmlns = 'http://docs.openstack.org/identity/api/v2.0'
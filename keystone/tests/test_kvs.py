@@ -276,6 +276,9 @@ class KVSTest(tests.TestCase):
         # Make sure get_multi raises NotFound if one of the keys isn't found
         kvs.set(self.key_foo, self.value_foo)
         self.assertRaises(exception.NotFound, kvs.get_multi, keys=keys)
+        # Unless a default is given for the missing keys
+        self.assertEqual([self.value_foo, None],
+                         kvs.get_multi(keys, default=None))
 
     def test_kvs_multi_get_set_delete(self):
         kvs = self._get_kvs_region()
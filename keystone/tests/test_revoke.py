@@ -19,6 +19,8 @@ from oslo.utils import timeutils
 from testtools import matchers
 
 from keystone.common import dependency
+from keystone import config
+from keystone.contrib import revoke
 from keystone.contrib.revoke import model
 from keystone import exception
 from keystone import tests
@@ -26,6 +28,9 @@ from keystone.tests import test_backend_sql
 from keystone.token import provider
 
 
+CONF = config.CONF
+
+
 def _new_id():
     return uuid.uuid4().hex
 
@@ -179,6 +184,51 @@ class RevokeTests(object):
                 project_id=project_id),
             matchers.raises(exception.UnexpectedError))
 
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_check_token_fetches_only_new_events(self, mock_utcnow):
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.revoke_by_user(_new_id())
+        self.revoke_api.check_token(token_values)
+
+        # Simulate a revocation recorded by another process, which is not
+        # seen until the next synchronization.
+        self.revoke_api.driver.revoke(
+            model.RevokeEvent(user_id=token_values['user_id']))
+        self.revoke_api.check_token(token_values)
+
+        mock_utcnow.return_value = now + datetime.timedelta(
+            seconds=CONF.revoke.sync_interval)
+        with mock.patch.object(self.revoke_api.driver, 'get_events',
+                               wraps=self.revoke_api.driver.get_events
+                               ) as get_events:
+            self.assertRaises(exception.TokenNotFound,
+                              self.revoke_api.check_token,
+                              token_values)
+            get_events.assert_called_once_with(
+                last_fetch=now - revoke.SYNC_OVERLAP)
+
+    def test_prune_expired_events(self):
+        event = model.RevokeEvent(user_id=_new_id(), revoked_at=_past_time())
+        self.revoke_api.driver.revoke(event)
+        self.revoke_api.driver.prune_expired_events()
+        self.assertEqual(
+            0, len(self.revoke_api.get_events(last_fetch=_past_time() -
+                                              datetime.timedelta(days=1))))
+
+    def test_prune_not_implemented_by_driver(self):
+        driver = self.revoke_api.driver
+        self.assertRaises(exception.NotImplemented,
+                          revoke.Driver.prune_expired_events, driver)
+
+        # Drivers relying on the default are tolerated by the manager.
+        with mock.patch.object(driver, 'prune_expired_events',
+                               side_effect=exception.NotImplemented()):
+            self.revoke_api._last_prune = None
+            self.revoke_api._prune_expired_events(timeutils.utcnow())
+
 
 class SqlRevokeTests(test_backend_sql.SqlTests, RevokeTests):
     def config_overrides(self):
@@ -637,3 +687,50 @@ class RevokeTreeTests(tests.TestCase):
         for event in self.events:
             self.tree.remove_event(event)
         self._assertEmpty(self.tree.revoke_map)
+
+
+class RevokeIndexTests(RevokeTreeTests):
+    def setUp(self):
+        super(RevokeIndexTests, self).setUp()
+        self.tree = model.RevokeIndex()
+
+    def test_cleanup(self):
+        self._assertEmpty(self.tree.revoke_map)
+        expiry_base_time = _future_time()
+        for i in range(0, 10):
+            self.events.append(self._revoke_by_user(_new_id()))
+            self._revoke_by_expiration(
+                _new_id(), expiry_base_time + datetime.timedelta(seconds=i))
+            self._revoke_by_project_role_assignment(_new_id(), _new_id())
+            self._revoke_by_domain_role_assignment(_new_id(), _new_id())
+            self._revoke_by_user_and_project(_new_id(), _new_id())
+        # One group per combination of constrained attributes.
+        self.assertEqual(5, len(self.tree.revoke_map))
+
+        for event in self.events:
+            self.tree.remove_event(event)
+        self._assertEmpty(self.tree.revoke_map)
+
+    def test_add_event_twice(self):
+        user_id = _new_id()
+        event = self._revoke_by_user(user_id)
+        self.tree.add_event(event)
+        self.events.append(event)
+        token_data = _sample_blank_token()
+        token_data['user_id'] = user_id
+        self._assertTokenRevoked(token_data)
+        self.removeEvent(event)
+        self._assertTokenNotRevoked(token_data)
+
+    def test_prune(self):
+        user_id = _new_id()
+        event = model.RevokeEvent(user_id=user_id, revoked_at=_past_time())
+        self.tree.add_event(event)
+        token_data = _sample_blank_token()
+        token_data['user_id'] = user_id
+        token_data['issued_at'] = _past_time() - datetime.timedelta(days=1)
+        self.assertTrue(self.tree.is_revoked(token_data))
+
+        self.tree.prune(timeutils.utcnow())
+        self.assertFalse(self.tree.is_revoked(token_data))
+        self._assertEmpty(self.tree.revoke_map)
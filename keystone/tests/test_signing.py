@@ -0,0 +1,115 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import threading
+
+from keystoneclient.common import cms
+import mock
+import testtools
+
+from keystone.common import signing
+from keystone import exception
+from keystone.openstack.common import jsonutils
+from keystone import tests
+
+
+CERTFILE = os.path.join(tests.ROOTDIR, 'examples', 'pki', 'certs',
+                        'signing_cert.pem')
+KEYFILE = os.path.join(tests.ROOTDIR, 'examples', 'pki', 'private',
+                       'signing_key.pem')
+CACERT = os.path.join(tests.ROOTDIR, 'examples', 'pki', 'certs',
+                      'cacert.pem')
+SAMPLE_TEXTS = [
+    jsonutils.dumps({'access': {'token': {'id': 'placeholder'}}}),
+    u'{"name": "\u00e9t\u00e9"}',
+    'line\nline\r\nline\r\r\nline',
+]
+
+
+@testtools.skipIf(signing.x509 is None, 'cryptography is not available')
+class InProcessSigningTests(tests.BaseTestCase):
+    def test_sign_text_matches_openssl(self):
+        for text in SAMPLE_TEXTS:
+            self.assertEqual(cms.cms_sign_text(text, CERTFILE, KEYFILE),
+                             signing.cms_sign_text(text, CERTFILE, KEYFILE))
+
+    def test_sign_token_matches_openssl(self):
+        for text in SAMPLE_TEXTS:
+            self.assertEqual(cms.cms_sign_token(text, CERTFILE, KEYFILE),
+                             signing.cms_sign_token(text, CERTFILE, KEYFILE))
+
+    def test_pkiz_signed_text_verifies(self):
+        # The compressed output of keystoneclient depends on the format of
+        # the openssl output it requests, so verify the result instead of
+        # comparing it byte for byte.
+        for text in SAMPLE_TEXTS:
+            signed = signing.pkiz_sign(text, CERTFILE, KEYFILE)
+            verified = cms.pkiz_verify(signed, CERTFILE, CACERT)
+            self.assertEqual(signing._to_bytes(text),
+                             signing._to_bytes(verified))
+
+    def test_signed_token_verifies(self):
+        text = SAMPLE_TEXTS[0]
+        token = signing.cms_sign_token(text, CERTFILE, KEYFILE)
+        self.assertEqual(text, cms.cms_verify(cms.token_to_cms(token),
+                                              CERTFILE, CACERT))
+
+    def test_signer_is_reused(self):
+        self.assertIs(signing.get_signer(CERTFILE, KEYFILE),
+                      signing.get_signer(CERTFILE, KEYFILE))
+
+    def test_fallback_without_signer(self):
+        with mock.patch.object(signing, 'get_signer', return_value=None):
+            with mock.patch.object(cms, 'cms_sign_token') as sign_token:
+                signing.cms_sign_token('text', CERTFILE, KEYFILE)
+        sign_token.assert_called_once_with('text', CERTFILE, KEYFILE)
+
+
+class SigningPoolTests(tests.BaseTestCase):
+    def test_submit_returns_result(self):
+        pool = signing.SigningPool(1, 1, 10)
+        self.assertEqual(3, pool.submit(lambda x, y: x + y, 1, 2))
+        stats = pool.get_stats()
+        self.assertEqual(1, stats['completed'])
+        self.assertEqual(0, stats['queue_depth'])
+
+    def test_submit_reraises(self):
+        def fail():
+            raise ValueError()
+
+        pool = signing.SigningPool(1, 1, 10)
+        self.assertRaises(ValueError, pool.submit, fail)
+        stats = pool.get_stats()
+        self.assertEqual(0, stats['completed'])
+        self.assertEqual(1, stats['failed'])
+
+    def test_requests_rejected_when_busy(self):
+        pool = signing.SigningPool(1, 1, 0.1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        # The worker is kept busy, so the first request submitted times out
+        # in the queue, and the second one finds the queue full.
+        pool._queue.put(signing._SigningRequest(block, ()))
+        started.wait()
+        self.assertRaises(exception.SigningUnavailable, pool.submit, block)
+        self.assertRaises(exception.SigningUnavailable, pool.submit, block)
+        release.set()
+
+        stats = pool.get_stats()
+        self.assertEqual(1, stats['timed_out'])
+        self.assertEqual(1, stats['rejected'])
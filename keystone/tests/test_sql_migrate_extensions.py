@@ -271,3 +271,15 @@ class RevokeExtension(test_sql_upgrade.SqlMigrateBase):
                                 _REVOKE_COLUMN_NAMES)
         self.downgrade(0, repository=self.repo_path)
         self.assertTableDoesNotExist('revocation_event')
+
+    def test_revoked_at_index(self):
+        def index_data():
+            table = utils.get_table(self.engine, 'revocation_event')
+            return [(idx.name, idx.columns.keys()) for idx in table.indexes]
+
+        self.upgrade(3, repository=self.repo_path)
+        self.assertIn(('ix_revocation_event_revoked_at', ['revoked_at']),
+                      index_data())
+        self.downgrade(2, repository=self.repo_path)
+        self.assertNotIn(('ix_revocation_event_revoked_at', ['revoked_at']),
+                         index_data())
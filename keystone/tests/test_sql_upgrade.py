@@ -30,6 +30,7 @@ WARNING::
 """
 
 import copy
+import datetime
 import json
 import uuid
 
@@ -37,6 +38,7 @@ from migrate.versioning import api as versioning_api
 from oslo.db import exception as db_exception
 from oslo.db.sqlalchemy import migration
 from oslo.db.sqlalchemy import session as db_session
+from oslo.utils import timeutils
 import six
 import sqlalchemy.exc
 
@@ -1400,6 +1402,113 @@ class SqlUpgradeTests(SqlMigrateBase):
         index_data = [(idx.name, idx.columns.keys()) for idx in table.indexes]
         self.assertNotIn(('ix_actor_id', ['actor_id']), index_data)
 
+    def test_token_project_and_consumer_columns(self):
+        self.upgrade(56)
+        self.assertTableColumns('token',
+                                ['id', 'expires', 'extra', 'valid', 'user_id',
+                                 'trust_id', 'project_id', 'consumer_id'])
+        table = sqlalchemy.Table('token', self.metadata, autoload=True)
+        index_data = [(idx.name, idx.columns.keys()) for idx in table.indexes]
+        self.assertIn(('ix_token_project_id', ['project_id']), index_data)
+        self.assertIn(('ix_token_consumer_id', ['consumer_id']), index_data)
+
+        self.downgrade(55)
+        self.assertTableColumns('token',
+                                ['id', 'expires', 'extra', 'valid', 'user_id',
+                                 'trust_id'])
+
+    def test_token_project_id_migration(self):
+        session = self.Session()
+        self.upgrade(55)
+        project_id = uuid.uuid4().hex
+        token_id = uuid.uuid4().hex
+        token = {
+            'id': token_id,
+            'expires': timeutils.utcnow() + datetime.timedelta(hours=1),
+            'extra': json.dumps({'tenant': {'id': project_id}}),
+            'valid': True,
+            'user_id': uuid.uuid4().hex,
+        }
+        self.insert_dict(session, 'token', token)
+
+        self.upgrade(56)
+        self.metadata.clear()
+        token_table = sqlalchemy.Table('token', self.metadata, autoload=True)
+        cols = [token_table.c.project_id, token_table.c.consumer_id]
+        s = sqlalchemy.select(cols).where(token_table.c.id == token_id)
+        token_ref = session.execute(s).fetchone()
+        self.assertEqual(project_id, token_ref.project_id)
+        self.assertIsNone(token_ref.consumer_id)
+
+    def test_token_audit_id_column(self):
+        self.upgrade(57)
+        self.assertTableColumns('token',
+                                ['id', 'expires', 'extra', 'valid', 'user_id',
+                                 'trust_id', 'project_id', 'consumer_id',
+                                 'audit_id'])
+        self.downgrade(56)
+        self.assertTableColumns('token',
+                                ['id', 'expires', 'extra', 'valid', 'user_id',
+                                 'trust_id', 'project_id', 'consumer_id'])
+
+    def test_token_audit_id_migration(self):
+        session = self.Session()
+        self.upgrade(56)
+        audit_id = uuid.uuid4().hex[:22]
+        token_id = uuid.uuid4().hex
+        extra = {'token_data': {'access': {'token': {
+            'audit_ids': [audit_id]}}}}
+        token = {
+            'id': token_id,
+            'expires': timeutils.utcnow() + datetime.timedelta(hours=1),
+            'extra': json.dumps(extra),
+            'valid': True,
+            'user_id': uuid.uuid4().hex,
+        }
+        self.insert_dict(session, 'token', token)
+
+        self.upgrade(57)
+        self.metadata.clear()
+        token_table = sqlalchemy.Table('token', self.metadata, autoload=True)
+        s = sqlalchemy.select([token_table.c.audit_id]).where(
+            token_table.c.id == token_id)
+        self.assertEqual(audit_id, session.execute(s).fetchone().audit_id)
+
+    def test_project_hierarchy_migration(self):
+        session = self.Session()
+        self.upgrade(57)
+        self.assertTableDoesNotExist('project_hierarchy')
+        parent_id = None
+        project_ids = []
+        for i in range(3):
+            project = {
+                'id': uuid.uuid4().hex,
+                'name': uuid.uuid4().hex,
+                'domain_id': DEFAULT_DOMAIN_ID,
+                'enabled': True,
+                'parent_id': parent_id,
+                'extra': '{}',
+            }
+            self.insert_dict(session, 'project', project)
+            project_ids.append(project['id'])
+            parent_id = project['id']
+
+        self.upgrade(58)
+        self.assertTableColumns('project_hierarchy',
+                                ['ancestor_id', 'descendant_id', 'depth'])
+        self.metadata.clear()
+        hierarchy_table = sqlalchemy.Table('project_hierarchy', self.metadata,
+                                           autoload=True)
+        rows = session.execute(sqlalchemy.select([hierarchy_table]))
+        expected = set()
+        for i, descendant_id in enumerate(project_ids):
+            for j, ancestor_id in enumerate(project_ids[:i + 1]):
+                expected.add((ancestor_id, descendant_id, i - j))
+        self.assertEqual(expected, set(tuple(row) for row in rows))
+
+        self.downgrade(57)
+        self.assertTableDoesNotExist('project_hierarchy')
+
     def populate_user_table(self, with_pass_enab=False,
                             with_pass_enab_domain=False):
         # Populate the appropriate fields in the user
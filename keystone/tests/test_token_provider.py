@@ -13,7 +13,9 @@
 # under the License.
 
 import datetime
+import uuid
 
+import mock
 from oslo.utils import timeutils
 
 from keystone import config
@@ -806,6 +808,66 @@ class TestTokenProvider(tests.TestCase):
         self.assertIsNone(
             self.token_provider_api._is_valid_token(create_v3_token()))
 
+    def _validate_missing_token(self, token_id, count):
+        with mock.patch.object(
+                self.token_provider_api._persistence, 'get_token',
+                side_effect=exception.TokenNotFound(token_id=token_id)
+        ) as get_token:
+            for i in range(count):
+                self.assertRaises(exception.TokenNotFound,
+                                  self.token_provider_api.validate_token,
+                                  token_id)
+        return get_token.call_count
+
+    def test_invalid_token_is_cached(self):
+        token_id = uuid.uuid4().hex
+        self.assertEqual(1, self._validate_missing_token(token_id, 3))
+        stats = self.token_provider_api.invalid_tokens.get_stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(1, stats['size'])
+
+    def test_invalid_token_cache_disabled(self):
+        self.config_fixture.config(group='token', invalid_cache_time=0)
+        token_id = uuid.uuid4().hex
+        self.assertEqual(3, self._validate_missing_token(token_id, 3))
+
+    def test_invalid_token_cache_expires(self):
+        token_id = uuid.uuid4().hex
+        self.assertEqual(1, self._validate_missing_token(token_id, 1))
+        later = timeutils.utcnow() + datetime.timedelta(
+            seconds=CONF.token.invalid_cache_time + 1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            self.assertEqual(1, self._validate_missing_token(token_id, 1))
+
+    def test_invalid_token_cache_is_bounded(self):
+        self.config_fixture.config(group='token', invalid_cache_size=2)
+        token_ids = [uuid.uuid4().hex for i in range(3)]
+        for token_id in token_ids:
+            self._validate_missing_token(token_id, 1)
+        invalid_tokens = self.token_provider_api.invalid_tokens
+        self.assertNotIn(token_ids[0], invalid_tokens)
+        self.assertIn(token_ids[2], invalid_tokens)
+        self.assertEqual(1, invalid_tokens.get_stats()['evictions'])
+
+    def test_created_token_is_not_invalid(self):
+        token_id = uuid.uuid4().hex
+        self._validate_missing_token(token_id, 1)
+        with mock.patch.object(self.token_provider_api._persistence,
+                               'create_token'):
+            self.token_provider_api._create_token(
+                token_id, {'expires': timeutils.utcnow() + FUTURE_DELTA})
+        self.assertNotIn(token_id, self.token_provider_api.invalid_tokens)
+
+    def test_bulk_created_token_is_not_invalid(self):
+        token_id = uuid.uuid4().hex
+        self._validate_missing_token(token_id, 1)
+        persistence = self.token_provider_api._persistence
+        with mock.patch.object(persistence.driver, 'create_tokens',
+                               return_value=[]):
+            persistence.create_tokens([(token_id, {})])
+        self.assertNotIn(token_id, self.token_provider_api.invalid_tokens)
+
 
 class TestTokenProviderOAuth1(tests.TestCase):
     def setUp(self):
@@ -1298,6 +1298,72 @@ class IdentityTestCase(test_v3.RestfulTestCase):
                   headers={'x-subject-token': token},
                   expected_status=404)
 
+    def test_create_and_delete_role_assignments(self):
+        """Call ``PUT`` and ``DELETE /role_assignments``."""
+        user = self.new_user_ref(domain_id=self.domain_id)
+        user = self.identity_api.create_user(user)
+        role = self.new_role_ref()
+        self.assignment_api.create_role(role['id'], role)
+
+        role_assignments = [
+            {'user': {'id': user['id']},
+             'scope': {'project': {'id': self.project_id}},
+             'role': {'id': role['id']}},
+            {'group': {'id': self.group_id},
+             'scope': {'domain': {'id': self.domain_id}},
+             'role': {'id': role['id']}},
+        ]
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments})
+        # Existing grants are ignored.
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments})
+        self.assertIn(role['id'], [r['id'] for r in
+                      self.assignment_api.list_grants(
+                          user_id=user['id'], project_id=self.project_id)])
+        self.assertIn(role['id'], [r['id'] for r in
+                      self.assignment_api.list_grants(
+                          group_id=self.group_id, domain_id=self.domain_id)])
+
+        self.delete('/role_assignments',
+                    body={'role_assignments': role_assignments})
+        self.assertEqual([], self.assignment_api.list_grants(
+            user_id=user['id'], project_id=self.project_id))
+        self.assertNotIn(role['id'], [r['id'] for r in
+                         self.assignment_api.list_grants(
+                             group_id=self.group_id,
+                             domain_id=self.domain_id)])
+
+    def test_create_role_assignments_validation(self):
+        # A role is assigned to a user or a group, not both.
+        role_assignments = [
+            {'user': {'id': self.user_id},
+             'group': {'id': self.group_id},
+             'scope': {'project': {'id': self.project_id}},
+             'role': {'id': self.role_id}},
+        ]
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments},
+                 expected_status=400)
+        # All the referenced entities must exist.
+        role_assignments = [
+            {'user': {'id': self.user_id},
+             'scope': {'project': {'id': self.project_id}},
+             'role': {'id': uuid.uuid4().hex}},
+        ]
+        self.put('/role_assignments',
+                 body={'role_assignments': role_assignments},
+                 expected_status=404)
+        for actor in ('user', 'group'):
+            role_assignments = [
+                {actor: {'id': uuid.uuid4().hex},
+                 'scope': {'project': {'id': self.project_id}},
+                 'role': {'id': self.role_id}},
+            ]
+            self.put('/role_assignments',
+                     body={'role_assignments': role_assignments},
+                     expected_status=404)
+
     def test_get_role_assignments(self):
         """Call ``GET /role_assignments``.
 
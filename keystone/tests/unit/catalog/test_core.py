@@ -74,3 +74,35 @@ class FormatUrlTests(testtools.TestCase):
                           core.format_url,
                           url_template,
                           values)
+
+
+class UrlTemplateTests(testtools.TestCase):
+
+    def setUp(self):
+        super(UrlTemplateTests, self).setUp()
+        fixture = self.useFixture(config_fixture.Config(CONF))
+        fixture.config(
+            group='catalog',
+            endpoint_substitution_whitelist=['host', 'port', 'tenant_id'])
+
+    def test_render(self):
+        template = core.UrlTemplate('http://$(host)s:%(port)d/v2/$(tenant_id)s'
+                                    '?discount=10%%')
+        url = template.render({'host': 'server', 'port': 9090,
+                               'tenant_id': 'A'})
+        self.assertEqual('http://server:9090/v2/A?discount=10%', url)
+
+    def test_partial(self):
+        url = 'http://$(host)s:%(port)d/v2/$(tenant_id)s'
+        template = core.UrlTemplate(url).partial(
+            {'host': 'server', 'port': 9090, 'tenant_id': 'ignored'},
+            remaining=['tenant_id'])
+        self.assertEqual('http://server:9090/v2/A',
+                         template.render({'tenant_id': 'A'}))
+        self.assertEqual('http://server:9090/v2/B',
+                         template.render({'tenant_id': 'B'}))
+
+    def test_key_not_whitelisted_fails_to_compile(self):
+        self.assertRaises(exception.MalformedEndpoint,
+                          core.UrlTemplate,
+                          'http://$(host)s/$(user_id)s')
@@ -12,10 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import datetime
 import sys
 
-from keystoneclient.common import cms
 from oslo.utils import timeutils
 import six
 
@@ -26,7 +24,6 @@ from keystone import config
 from keystone import exception
 from keystone.i18n import _
 from keystone.models import token_model
-from keystone.openstack.common import jsonutils
 from keystone.openstack.common import log
 from keystone.token import provider
 
@@ -456,19 +453,14 @@ class Auth(controller.V2Controller):
     def revocation_list(self, context, auth=None):
         if not CONF.token.revoke_by_id:
             raise exception.Gone()
-        tokens = self.token_provider_api.list_revoked_tokens()
-
-        for t in tokens:
-            expires = t['expires']
-            if expires and isinstance(expires, datetime.datetime):
-                    t['expires'] = timeutils.isotime(expires)
-        data = {'revoked': tokens}
-        json_data = jsonutils.dumps(data)
-        signed_text = cms.cms_sign_text(json_data,
-                                        CONF.signing.certfile,
-                                        CONF.signing.keyfile)
-
-        return {'signed': signed_text}
+        # Answer a conditional request before paying for the signature.
+        etag = self.token_provider_api.get_revocation_list_etag()
+        if wsgi.etag_matches(context, etag):
+            return wsgi.render_not_modified(etag)
+        etag, signed_text = (
+            self.token_provider_api.get_signed_revocation_list())
+        return wsgi.render_conditional_response(
+            context, {'signed': signed_text}, etag)
 
     @controller.v2_deprecated
     def endpoints(self, context, token_id):
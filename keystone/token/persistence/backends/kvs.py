@@ -14,6 +14,7 @@
 # under the License.
 
 from __future__ import absolute_import
+import calendar
 import copy
 
 from oslo.utils import timeutils
@@ -31,6 +32,16 @@ from keystone.token import provider
 CONF = config.CONF
 LOG = log.getLogger(__name__)
 
+# Width (in seconds) of the buckets the token indexes are split in, by token
+# expiry time.  A bucket is only written to while tokens expiring in that
+# window are issued, and is never read once they are all expired.
+INDEX_BUCKET_SIZE = 3600
+
+
+def _timestamp(dt):
+    """Return the (UTC) datetime `dt` as an integer number of seconds."""
+    return calendar.timegm(dt.timetuple())
+
 
 class Token(token.persistence.Driver):
     """KeyValueStore backend for tokens.
@@ -51,6 +62,10 @@ class Token(token.persistence.Driver):
         if not self._store.is_configured:
             # Do not re-configure the backend if the store has been initialized
             self._store.configure(backing_store=self.kvs_backend, **kwargs)
+        # NOTE: The user token indexes and the revocation list are kept in
+        # their own store, which a backend may configure differently from
+        # the store of the tokens, see the memcache backend.
+        self._index_store = self._store
         if self.__class__ == Token:
             # NOTE(morganfainberg): Only warn if the base KVS implementation
             # is instantiated.
@@ -66,12 +81,54 @@ class Token(token.persistence.Driver):
     def _prefix_user_id(self, user_id):
         return 'usertokens-%s' % user_id.encode('utf-8')
 
+    def _bucket_key(self, key, expires):
+        return '%s-%d' % (key, expires // INDEX_BUCKET_SIZE)
+
+    def _last_bucket_key(self, key):
+        return '%s-last' % key
+
+    def _update_last_bucket(self, key, expires):
+        """Record the latest bucket of `key` that a token was written to.
+
+        The record only ever grows, and is written before the bucket itself,
+        so that a reader never misses a bucket holding unexpired tokens.
+        """
+        bucket = expires // INDEX_BUCKET_SIZE
+        last_bucket_key = self._last_bucket_key(key)
+        if self._get_index_or_default(last_bucket_key, default=-1) >= bucket:
+            return
+        with self._index_store.get_lock(last_bucket_key) as lock:
+            if (self._get_index_or_default(last_bucket_key, default=-1) <
+                    bucket):
+                self._index_store.set(last_bucket_key, bucket, lock)
+
+    def _live_bucket_keys(self, key):
+        """Return the keys of the buckets that may hold unexpired tokens.
+
+        The buckets run from the current one to the latest one written to,
+        which may be past the default expiration of tokens if a token was
+        issued with an explicit expiry, or before [token] expiration was
+        lowered.
+        """
+        current_time = _timestamp(self._get_current_time())
+        first = current_time // INDEX_BUCKET_SIZE
+        last = (current_time + CONF.token.expiration) // INDEX_BUCKET_SIZE
+        last = max(last, self._get_index_or_default(
+            self._last_bucket_key(key), default=last))
+        return ['%s-%d' % (key, bucket) for bucket in range(first, last + 1)]
+
     def _get_key_or_default(self, key, default=None):
         try:
             return self._store.get(key)
         except exception.NotFound:
             return default
 
+    def _get_index_or_default(self, key, default=None):
+        try:
+            return self._index_store.get(key)
+        except exception.NotFound:
+            return default
+
     def _get_key(self, key):
         return self._store.get(key)
 
@@ -105,14 +162,14 @@ class Token(token.persistence.Driver):
 
         # NOTE(morganfainberg): for ease of manipulating the data without
         # concern about the backend, always store the value(s) in the
-        # index as the isotime (string) version so this is where the string is
-        # built.
-        expires_str = timeutils.isotime(data_copy['expires'], subsecond=True)
+        # index as an integer timestamp, so this is where it is computed.
+        expires = _timestamp(
+            timeutils.normalize_time(data_copy['expires']))
 
         self._set_key(ptk, data_copy)
         user_id = data['user']['id']
         user_key = self._prefix_user_id(user_id)
-        self._update_user_token_list(user_key, token_id, expires_str)
+        self._update_user_token_list(user_key, token_id, expires)
         if CONF.trust.enabled and data.get('trust_id'):
             # NOTE(morganfainberg): If trusts are enabled and this is a trust
             # scoped token, we add the token to the trustee list as well.  This
@@ -133,64 +190,42 @@ class Token(token.persistence.Driver):
                     data_copy.get('token_version'))
 
             trustee_key = self._prefix_user_id(trustee_user_id)
-            self._update_user_token_list(trustee_key, token_id, expires_str)
+            self._update_user_token_list(trustee_key, token_id, expires)
 
         return data_copy
 
     def _get_user_token_list_with_expiry(self, user_key):
         """Return a list of tuples in the format (token_id, token_expiry) for
         the user_key.
-        """
-        return self._get_key_or_default(user_key, default=[])
 
-    def _get_user_token_list(self, user_key):
-        """Return a list of token_ids for the user_key."""
-        token_list = self._get_user_token_list_with_expiry(user_key)
-        # Each element is a tuple of (token_id, token_expiry). Most code does
-        # not care about the expiry, it is stripped out and only a
-        # list of token_ids are returned.
-        return [t[0] for t in token_list]
-
-    def _update_user_token_list(self, user_key, token_id, expires_isotime_str):
-        current_time = self._get_current_time()
-        revoked_token_list = set([t['id'] for t in
-                                  self.list_revoked_tokens()])
-
-        with self._store.get_lock(user_key) as lock:
-            filtered_list = []
-            token_list = self._get_user_token_list_with_expiry(user_key)
-            for item in token_list:
-                try:
-                    item_id, expires = self._format_token_index_item(item)
-                except (ValueError, TypeError):
-                    # NOTE(morganfainberg): Skip on expected errors
-                    # possibilities from the `_format_token_index_item` method.
-                    continue
-
-                if expires < current_time:
-                    LOG.debug(('Token `%(token_id)s` is expired, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-
-                if item_id in revoked_token_list:
-                    # NOTE(morganfainberg): If the token has been revoked, it
-                    # can safely be removed from this list.  This helps to keep
-                    # the user_token_list as reasonably small as possible.
-                    LOG.debug(('Token `%(token_id)s` is revoked, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-                filtered_list.append(item)
-            filtered_list.append((token_id, expires_isotime_str))
-            self._set_key(user_key, filtered_list, lock)
-            return filtered_list
+        The index of a user is made of the buckets of tokens that may not be
+        expired yet, and of the single list used before the index was split
+        in buckets, which may still hold tokens issued before an upgrade.
+        """
+        keys = [user_key] + self._live_bucket_keys(user_key)
+        token_list = []
+        for bucket in self._index_store.get_multi(keys, default=None):
+            if isinstance(bucket, list):
+                token_list.extend(bucket)
+        return token_list
+
+    def _update_user_token_list(self, user_key, token_id, expires):
+        # NOTE: Only the bucket of tokens expiring at about the same time is
+        # rewritten. Expired and revoked tokens are not filtered out here but
+        # when the index is read, so that issuing a token neither reads the
+        # rest of the index nor the revocation list.
+        self._update_last_bucket(user_key, expires)
+        bucket_key = self._bucket_key(user_key, expires)
+        with self._index_store.get_lock(bucket_key) as lock:
+            token_list = self._get_index_or_default(bucket_key, default=[])
+            token_list.append((token_id, expires))
+            self._index_store.set(bucket_key, token_list, lock)
+            return token_list
 
     def _get_current_time(self):
         return timeutils.normalize_time(timeutils.utcnow())
 
-    def _add_to_revocation_list(self, data, lock):
-        filtered_list = []
+    def _add_to_revocation_list(self, data):
         revoked_token_data = {}
 
         current_time = self._get_current_time()
@@ -210,48 +245,59 @@ class Token(token.persistence.Driver):
                                                           subsecond=True)
         revoked_token_data['id'] = data['id']
 
-        token_list = self._get_key_or_default(self.revocation_key, default=[])
-        if not isinstance(token_list, list):
-            # NOTE(morganfainberg): In the case that the revocation list is not
-            # in a format we understand, reinitialize it. This is an attempt to
-            # not allow the revocation list to be completely broken if
-            # somehow the key is changed outside of keystone (e.g. memcache
-            # that is shared by multiple applications). Logging occurs at error
-            # level so that the cloud administrators have some awareness that
-            # the revocation_list needed to be cleared out. In all, this should
-            # be recoverable. Keystone cannot control external applications
-            # from changing a key in some backends, however, it is possible to
-            # gracefully handle and notify of this event.
-            LOG.error(_('Reinitializing revocation list due to error '
-                        'in loading revocation list from backend.  '
-                        'Expected `list` type got `%(type)s`. Old '
-                        'revocation list data: %(list)r'),
-                      {'type': type(token_list), 'list': token_list})
-            token_list = []
-
-        # NOTE(morganfainberg): on revocation, cleanup the expired entries, try
-        # to keep the list of tokens revoked at the minimum.
+        # NOTE: The revocation list is split in buckets by token expiry, the
+        # same way as the user token indexes, so that revocations only contend
+        # with the revocations of tokens expiring at about the same time.
+        # Expired entries are not cleaned up here, a bucket is simply no
+        # longer read (and expires in backends supporting it) once all of its
+        # tokens have expired.
+        expires = _timestamp(expires)
+        self._update_last_bucket(self.revocation_key, expires)
+        bucket_key = self._bucket_key(self.revocation_key, expires)
+        with self._index_store.get_lock(bucket_key) as lock:
+            token_list = self._get_index_or_default(bucket_key, default=[])
+            if not isinstance(token_list, list):
+                # NOTE(morganfainberg): In the case that the revocation list
+                # is not in a format we understand, reinitialize it. This is
+                # an attempt to not allow the revocation list to be completely
+                # broken if somehow the key is changed outside of keystone
+                # (e.g. memcache that is shared by multiple applications).
+                # Logging occurs at error level so that the cloud
+                # administrators have some awareness that the revocation_list
+                # needed to be cleared out. In all, this should be
+                # recoverable. Keystone cannot control external applications
+                # from changing a key in some backends, however, it is
+                # possible to gracefully handle and notify of this event.
+                LOG.error(_('Reinitializing revocation list due to error '
+                            'in loading revocation list from backend.  '
+                            'Expected `list` type got `%(type)s`. Old '
+                            'revocation list data: %(list)r'),
+                          {'type': type(token_list), 'list': token_list})
+                token_list = []
+            token_list.append(revoked_token_data)
+            self._index_store.set(bucket_key, token_list, lock)
+
+    def _filter_expired_revocations(self, token_list, current_time):
+        filtered_list = []
         for token_data in token_list:
             try:
                 expires_at = timeutils.normalize_time(
                     timeutils.parse_isotime(token_data['expires']))
-            except ValueError:
+            except (KeyError, TypeError, ValueError):
                 LOG.warning(_('Removing `%s` from revocation list due to '
                               'invalid expires data in revocation list.'),
                             token_data.get('id', 'INVALID_TOKEN_DATA'))
                 continue
             if expires_at > current_time:
                 filtered_list.append(token_data)
-        filtered_list.append(revoked_token_data)
-        self._set_key(self.revocation_key, filtered_list, lock)
+        return filtered_list
 
     def delete_token(self, token_id):
         # Test for existence
-        with self._store.get_lock(self.revocation_key) as lock:
-            data = self.get_token(token_id)
-            ptk = self._prefix_token_id(token_id)
-            result = self._delete_key(ptk)
-            self._add_to_revocation_list(data, lock)
+        data = self.get_token(token_id)
+        ptk = self._prefix_token_id(token_id)
+        result = self._delete_key(ptk)
+        self._add_to_revocation_list(data)
         return result
 
     def delete_tokens(self, user_id, tenant_id=None, trust_id=None,
@@ -272,9 +318,14 @@ class Token(token.persistence.Driver):
                       dict(item=item))
             raise
 
+        if isinstance(expires, six.integer_types):
+            return token_id, expires
+
+        # NOTE: Entries written before the index was split in buckets hold
+        # the expiry as an isotime string.
         try:
-            expires = timeutils.normalize_time(
-                timeutils.parse_isotime(expires))
+            expires = _timestamp(timeutils.normalize_time(
+                timeutils.parse_isotime(expires)))
         except ValueError:
             LOG.debug(('Invalid expires time on token `%(token_id)s`:'
                        ' %(expires)r'),
@@ -313,7 +364,8 @@ class Token(token.persistence.Driver):
         tokens = []
         user_key = self._prefix_user_id(user_id)
         token_list = self._get_user_token_list_with_expiry(user_key)
-        current_time = self._get_current_time()
+        current_time = _timestamp(self._get_current_time())
+        token_ids = []
         for item in token_list:
             try:
                 token_id, expires = self._format_token_index_item(item)
@@ -324,12 +376,15 @@ class Token(token.persistence.Driver):
 
             if expires < current_time:
                 continue
-
-            try:
-                token_ref = self.get_token(token_id)
-            except exception.TokenNotFound:
-                # NOTE(morganfainberg): Token doesn't exist, skip it.
-                continue
+            token_ids.append(token_id)
+
+        if not token_ids:
+            return tokens
+        token_refs = self._store.get_multi(
+            [self._prefix_token_id(token_id) for token_id in token_ids],
+            default=None)
+        for token_id, token_ref in six.moves.zip(token_ids, token_refs):
+            # NOTE(morganfainberg): If the token doesn't exist, skip it.
             if token_ref:
                 if tenant_id is not None:
                     if not self._token_match_tenant(token_ref, tenant_id):
@@ -345,11 +400,23 @@ class Token(token.persistence.Driver):
         return tokens
 
     def list_revoked_tokens(self):
-        revoked_token_list = self._get_key_or_default(self.revocation_key,
-                                                      default=[])
-        if isinstance(revoked_token_list, list):
-            return revoked_token_list
-        return []
+        # NOTE: The first key is the single revocation list used before the
+        # list was split in buckets, and the second one is the bucket of the
+        # current hour; only these may hold expired tokens. All the later
+        # buckets, up to the latest one written to, are returned as they are.
+        keys = ([self.revocation_key] +
+                self._live_bucket_keys(self.revocation_key))
+        buckets = self._index_store.get_multi(keys, default=None)
+        current_time = self._get_current_time()
+        revoked_token_list = []
+        for i, bucket in enumerate(buckets):
+            if not isinstance(bucket, list):
+                continue
+            if i < 2:
+                bucket = self._filter_expired_revocations(bucket,
+                                                          current_time)
+            revoked_token_list.extend(bucket)
+        return revoked_token_list
 
     def flush_expired_tokens(self):
         """Archive or delete tokens that have expired."""
@@ -14,6 +14,7 @@
 # under the License.
 
 from keystone.common import config
+from keystone.common import kvs as kvs_store
 from keystone.token.persistence.backends import kvs
 
 
@@ -24,7 +25,20 @@ class Token(kvs.Token):
     kvs_backend = 'openstack.kvs.Memcached'
 
     def __init__(self, *args, **kwargs):
+        # NOTE: Tokens expire from memcached with the default expiration of
+        # tokens, but the user token indexes and the revocation list must
+        # not: a bucket holds tokens expiring in the hour it covers, which
+        # may be long after it was last written to, and so does the record
+        # of the latest bucket. They are kept in a store without expiry, and
+        # the buckets which are no longer read are left for memcached to
+        # evict.
+        kwargs['url'] = CONF.memcache.servers
+        index_kwargs = kwargs.copy()
         kwargs['no_expiry_keys'] = [self.revocation_key]
         kwargs['memcached_expire_time'] = CONF.token.expiration
-        kwargs['url'] = CONF.memcache.servers
         super(Token, self).__init__(*args, **kwargs)
+        self._index_store = kvs_store.get_key_value_store(
+            'token-driver-index')
+        if not self._index_store.is_configured:
+            self._index_store.configure(backing_store=self.kvs_backend,
+                                        **index_kwargs)
@@ -16,6 +16,7 @@ import copy
 import functools
 
 from oslo.utils import timeutils
+import sqlalchemy
 
 from keystone.common import sql
 from keystone import config
@@ -39,12 +40,56 @@ class TokenModel(sql.ModelBase, sql.DictBase):
     valid = sql.Column(sql.Boolean(), default=True, nullable=False)
     user_id = sql.Column(sql.String(64))
     trust_id = sql.Column(sql.String(64))
+    # NOTE: project_id, consumer_id and audit_id duplicate values held in
+    # `extra` so that tokens can be filtered on them in SQL. They are not part
+    # of `attributes` so that they are not returned with the token data.
+    project_id = sql.Column(sql.String(64))
+    consumer_id = sql.Column(sql.String(64))
+    audit_id = sql.Column(sql.String(32))
     __table_args__ = (
         sql.Index('ix_token_expires', 'expires'),
-        sql.Index('ix_token_expires_valid', 'expires', 'valid')
+        sql.Index('ix_token_expires_valid', 'expires', 'valid'),
+        sql.Index('ix_token_user_id', 'user_id'),
+        sql.Index('ix_token_trust_id', 'trust_id'),
+        sql.Index('ix_token_project_id', 'project_id'),
+        sql.Index('ix_token_consumer_id', 'consumer_id'),
+        sql.Index('ix_token_audit_id', 'audit_id'),
     )
 
 
+# Maximum number of values bound in a single IN clause.
+_IN_CLAUSE_BATCH_SIZE = 500
+
+
+def _batches(values, batch_size=_IN_CLAUSE_BATCH_SIZE):
+    values = list(values)
+    for i in range(0, len(values), batch_size):
+        yield values[i:i + batch_size]
+
+
+def _project_id_from_data(data):
+    tenant = data.get('tenant')
+    if tenant:
+        return tenant.get('id')
+
+
+def _consumer_id_from_data(data):
+    token_data = data.get('token_data') or {}
+    oauth = token_data.get('token', {}).get('OS-OAUTH1')
+    if oauth:
+        return oauth.get('consumer_id')
+
+
+def _audit_id_from_data(data):
+    token_data = data.get('token_data') or {}
+    # v3 tokens keep their data under 'token', v2 tokens under 'access'.
+    token = token_data.get('token') or token_data.get('access', {}).get(
+        'token', {})
+    audit_ids = token.get('audit_ids')
+    if audit_ids:
+        return audit_ids[0]
+
+
 def _expiry_range_batched(session, upper_bound_func, batch_size):
     """Returns the stop point of the next batch for expiration.
 
@@ -92,7 +137,7 @@ class Token(token.persistence.Driver):
             raise exception.TokenNotFound(token_id=token_id)
         return token_ref.to_dict()
 
-    def create_token(self, token_id, data):
+    def _token_ref_from_data(self, data):
         data_copy = copy.deepcopy(data)
         if not data_copy.get('expires'):
             data_copy['expires'] = provider.default_expire_time()
@@ -101,11 +146,31 @@ class Token(token.persistence.Driver):
 
         token_ref = TokenModel.from_dict(data_copy)
         token_ref.valid = True
+        token_ref.project_id = _project_id_from_data(data_copy)
+        token_ref.consumer_id = _consumer_id_from_data(data_copy)
+        token_ref.audit_id = _audit_id_from_data(data_copy)
+        return token_ref
+
+    def create_token(self, token_id, data):
+        token_ref = self._token_ref_from_data(data)
         session = sql.get_session()
         with session.begin():
             session.add(token_ref)
         return token_ref.to_dict()
 
+    def create_tokens(self, tokens):
+        token_refs = [self._token_ref_from_data(data)
+                      for token_id, data in tokens]
+        if not token_refs:
+            return []
+        columns = [column.name for column in TokenModel.__table__.columns]
+        rows = [dict((name, getattr(token_ref, name)) for name in columns)
+                for token_ref in token_refs]
+        session = sql.get_session()
+        with session.begin():
+            session.execute(TokenModel.__table__.insert(), rows)
+        return [token_ref.to_dict() for token_ref in token_refs]
+
     def delete_token(self, token_id):
         session = sql.get_session()
         with session.begin():
@@ -114,6 +179,11 @@ class Token(token.persistence.Driver):
                 raise exception.TokenNotFound(token_id=token_id)
             token_ref.valid = False
 
+    def _valid_tokens_query(self, session, *columns):
+        query = session.query(*columns)
+        query = query.filter_by(valid=True)
+        return query.filter(TokenModel.expires > timeutils.utcnow())
+
     def delete_tokens(self, user_id, tenant_id=None, trust_id=None,
                       consumer_id=None):
         """Deletes all tokens in one session
@@ -126,86 +196,87 @@ class Token(token.persistence.Driver):
         """
         session = sql.get_session()
         with session.begin():
-            now = timeutils.utcnow()
-            query = session.query(TokenModel)
-            query = query.filter_by(valid=True)
-            query = query.filter(TokenModel.expires > now)
+            query = self._valid_tokens_query(session, TokenModel)
             if trust_id:
                 query = query.filter(TokenModel.trust_id == trust_id)
             else:
                 query = query.filter(TokenModel.user_id == user_id)
-
-            for token_ref in query.all():
+            if tenant_id:
+                query = query.filter(TokenModel.project_id == tenant_id)
+            if consumer_id:
+                query = query.filter(TokenModel.consumer_id == consumer_id)
+            query.update({'valid': False}, synchronize_session=False)
+
+    def delete_tokens_bulk(self, user_ids, tenant_id=None, consumer_id=None):
+        token_ids = []
+        session = sql.get_session()
+        with session.begin():
+            for batch in _batches(user_ids):
+                query = self._valid_tokens_query(session, TokenModel.id)
+                query = query.filter(TokenModel.user_id.in_(batch))
                 if tenant_id:
-                    token_ref_dict = token_ref.to_dict()
-                    if not self._tenant_matches(tenant_id, token_ref_dict):
-                        continue
+                    query = query.filter(TokenModel.project_id == tenant_id)
                 if consumer_id:
-                    token_ref_dict = token_ref.to_dict()
-                    if not self._consumer_matches(consumer_id, token_ref_dict):
-                        continue
-
-                token_ref.valid = False
-
-    def _tenant_matches(self, tenant_id, token_ref_dict):
-        return ((tenant_id is None) or
-                (token_ref_dict.get('tenant') and
-                 token_ref_dict['tenant'].get('id') == tenant_id))
-
-    def _consumer_matches(self, consumer_id, ref):
-        if consumer_id is None:
-            return True
-        else:
-            try:
-                oauth = ref['token_data']['token'].get('OS-OAUTH1', {})
-                return oauth and oauth['consumer_id'] == consumer_id
-            except KeyError:
-                return False
+                    query = query.filter(
+                        TokenModel.consumer_id == consumer_id)
+                batch_ids = [token_ref[0] for token_ref in query]
+                if not batch_ids:
+                    continue
+                update = session.query(TokenModel)
+                update = update.filter(TokenModel.id.in_(batch_ids))
+                update.update({'valid': False}, synchronize_session=False)
+                token_ids.extend(batch_ids)
+        return token_ids
+
+    def delete_tokens_for_users_and_projects(self, user_ids, user_project_ids,
+                                             user_trust_ids):
+        criteria = [TokenModel.user_id.in_(batch)
+                    for batch in _batches(user_ids)]
+        # Each pair binds two values, keep the statements under the limit.
+        for batch in _batches(user_project_ids, _IN_CLAUSE_BATCH_SIZE // 2):
+            criteria.append(sqlalchemy.or_(*[
+                sqlalchemy.and_(TokenModel.user_id == user_id,
+                                TokenModel.project_id == tenant_id)
+                for user_id, tenant_id in batch]))
+        # As with _list_tokens_for_trust, all the tokens of a trust are
+        # deleted; the trustee is only needed by drivers indexed on users.
+        criteria.extend(
+            TokenModel.trust_id.in_([trust_id for _, trust_id in batch])
+            for batch in _batches(user_trust_ids))
+
+        token_ids = set()
+        session = sql.get_session()
+        with session.begin():
+            for criterion in criteria:
+                query = self._valid_tokens_query(session, TokenModel.id)
+                query = query.filter(criterion)
+                token_ids.update(token_ref[0] for token_ref in query)
+            for batch in _batches(token_ids):
+                update = session.query(TokenModel)
+                update = update.filter(TokenModel.id.in_(batch))
+                update.update({'valid': False}, synchronize_session=False)
+        return list(token_ids)
 
     def _list_tokens_for_trust(self, trust_id):
         session = sql.get_session()
-        tokens = []
-        now = timeutils.utcnow()
-        query = session.query(TokenModel)
-        query = query.filter(TokenModel.expires > now)
+        query = self._valid_tokens_query(session, TokenModel.id)
         query = query.filter(TokenModel.trust_id == trust_id)
-
-        token_references = query.filter_by(valid=True)
-        for token_ref in token_references:
-            token_ref_dict = token_ref.to_dict()
-            tokens.append(token_ref_dict['id'])
-        return tokens
+        return [token_ref[0] for token_ref in query]
 
     def _list_tokens_for_user(self, user_id, tenant_id=None):
         session = sql.get_session()
-        tokens = []
-        now = timeutils.utcnow()
-        query = session.query(TokenModel)
-        query = query.filter(TokenModel.expires > now)
+        query = self._valid_tokens_query(session, TokenModel.id)
         query = query.filter(TokenModel.user_id == user_id)
-
-        token_references = query.filter_by(valid=True)
-        for token_ref in token_references:
-            token_ref_dict = token_ref.to_dict()
-            if self._tenant_matches(tenant_id, token_ref_dict):
-                tokens.append(token_ref['id'])
-        return tokens
+        if tenant_id:
+            query = query.filter(TokenModel.project_id == tenant_id)
+        return [token_ref[0] for token_ref in query]
 
     def _list_tokens_for_consumer(self, user_id, consumer_id):
-        tokens = []
         session = sql.get_session()
-        with session.begin():
-            now = timeutils.utcnow()
-            query = session.query(TokenModel)
-            query = query.filter(TokenModel.expires > now)
-            query = query.filter(TokenModel.user_id == user_id)
-            token_references = query.filter_by(valid=True)
-
-            for token_ref in token_references:
-                token_ref_dict = token_ref.to_dict()
-                if self._consumer_matches(consumer_id, token_ref_dict):
-                    tokens.append(token_ref_dict['id'])
-        return tokens
+        query = self._valid_tokens_query(session, TokenModel.id)
+        query = query.filter(TokenModel.user_id == user_id)
+        query = query.filter(TokenModel.consumer_id == consumer_id)
+        return [token_ref[0] for token_ref in query]
 
     def _list_tokens(self, user_id, tenant_id=None, trust_id=None,
                      consumer_id=None):
@@ -16,6 +16,7 @@
 
 import abc
 import copy
+import itertools
 
 from oslo.utils import timeutils
 import six
@@ -99,6 +100,28 @@ class PersistenceManager(manager.Manager):
             self._get_token.set(ret, self, unique_id)
         return ret
 
+    def create_tokens(self, tokens):
+        """Create several tokens at once.
+
+        :param tokens: list of (token_id, data) tuples, as passed to
+                       create_token.
+        :returns: list of token_refs
+
+        """
+        tokens_copy = []
+        for token_id, data in tokens:
+            unique_id = self.token_provider_api.unique_id(token_id)
+            data_copy = copy.deepcopy(data)
+            data_copy['id'] = unique_id
+            tokens_copy.append((unique_id, data_copy))
+        refs = self.driver.create_tokens(tokens_copy)
+        for unique_id, data_copy in tokens_copy:
+            self.token_provider_api.invalid_tokens.discard(unique_id)
+        for ref in refs:
+            if SHOULD_CACHE(ref):
+                self._get_token.set(ref, self, ref['id'])
+        return refs
+
     def delete_token(self, token_id):
         if not CONF.token.revoke_by_id:
             return
@@ -119,6 +142,26 @@ class PersistenceManager(manager.Manager):
             self._invalidate_individual_token_cache(unique_id)
         self.invalidate_revocation_list()
 
+    def delete_tokens_bulk(self, user_ids, tenant_id=None, consumer_id=None):
+        """Delete the tokens of several users at once.
+
+        Unlike delete_tokens_for_users, tokens issued to the trustees of the
+        users' trusts are not deleted.
+
+        :param user_ids: list of user identifiers
+        :param tenant_id: optional project identifier
+        :param consumer_id: optional OAuth consumer identifier
+
+        """
+        if not CONF.token.revoke_by_id:
+            return
+        token_ids = self.driver.delete_tokens_bulk(
+            user_ids, tenant_id=tenant_id, consumer_id=consumer_id)
+        for token_id in token_ids:
+            unique_id = self.token_provider_api.unique_id(token_id)
+            self._invalidate_individual_token_cache(unique_id)
+        self.invalidate_revocation_list()
+
     @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
                         expiration_time=REVOCATION_CACHE_EXPIRATION_TIME)
     def list_revoked_tokens(self):
@@ -129,6 +172,7 @@ class PersistenceManager(manager.Manager):
         # invalidate() because of the way the invalidation method works on
         # determining cache-keys.
         self.list_revoked_tokens.invalidate(self)
+        self.token_provider_api.invalidate_signed_revocation_list()
 
     def delete_tokens_for_domain(self, domain_id):
         """Delete all tokens for a given domain.
@@ -195,6 +239,43 @@ class PersistenceManager(manager.Manager):
         for user_id in user_ids:
             self.delete_tokens_for_user(user_id, project_id=project_id)
 
+    def delete_tokens_for_users_and_projects(self, user_ids=None,
+                                             user_project_ids=None):
+        """Delete the tokens of several users and user-project combinations.
+
+        This has the same effect as calling delete_tokens_for_user for each
+        user, and for each (user_id, project_id) pair, but the tokens are
+        deleted by the driver in a single call.
+
+        :param user_ids: identifiers of the users whose tokens are deleted
+        :param user_project_ids: (user_id, project_id) pairs whose project
+                                 scoped tokens are deleted
+        """
+        if not CONF.token.revoke_by_id:
+            return
+        user_ids = set(user_ids or [])
+        # Deleting all the tokens of a user covers its project scoped ones.
+        user_project_ids = set(
+            (user_id, project_id)
+            for user_id, project_id in user_project_ids or []
+            if user_id not in user_ids)
+
+        # The tokens of the trusts of these users are deleted whatever the
+        # project they are scoped to, as delete_tokens_for_user does.
+        user_trust_ids = set()
+        for user_id in user_ids | set(pair[0] for pair in user_project_ids):
+            for trust in self.trust_api.list_trusts_for_trustee(user_id):
+                user_trust_ids.add((user_id, trust['id']))
+            for trust in self.trust_api.list_trusts_for_trustor(user_id):
+                user_trust_ids.add((trust['trustee_user_id'], trust['id']))
+
+        token_ids = self.driver.delete_tokens_for_users_and_projects(
+            list(user_ids), list(user_project_ids), list(user_trust_ids))
+        for token_id in token_ids:
+            unique_id = self.token_provider_api.unique_id(token_id)
+            self._invalidate_individual_token_cache(unique_id)
+        self.invalidate_revocation_list()
+
     def _invalidate_individual_token_cache(self, token_id):
         # NOTE(morganfainberg): invalidate takes the exact same arguments as
         # the normal method, this means we need to pass "self" in (which gets
@@ -276,6 +357,21 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_tokens(self, tokens):
+        """Create several tokens at once.
+
+        Drivers able to store several tokens in a single operation should
+        override this method; by default each token is created in turn.
+
+        :param tokens: list of (token_id, data) tuples, as passed to
+                       create_token.
+        :type tokens: list
+        :returns: list of token_refs.
+
+        """
+        return [self.create_token(token_id, data)
+                for token_id, data in tokens]
+
     @abc.abstractmethod
     def delete_token(self, token_id):
         """Deletes a token by id.
@@ -327,6 +423,68 @@ class Driver(object):
             except exception.NotFound:
                 pass
 
+    def delete_tokens_bulk(self, user_ids, tenant_id=None, consumer_id=None):
+        """Deletes the tokens of several users at once.
+
+        Drivers able to delete the tokens of several users in a single
+        operation should override this method; by default the tokens of
+        each user are listed and deleted in turn.
+
+        :param user_ids: identities of the users
+        :type user_ids: list
+        :param tenant_id: identity of the tenant
+        :type tenant_id: string
+        :param consumer_id: identity of the consumer
+        :type consumer_id: string
+        :returns: list of the token_id's deleted.
+
+        """
+        token_ids = []
+        for user_id in user_ids:
+            token_list = self._list_tokens(user_id,
+                                           tenant_id=tenant_id,
+                                           consumer_id=consumer_id)
+            for token in token_list:
+                try:
+                    self.delete_token(token)
+                except exception.NotFound:
+                    continue
+                token_ids.append(token)
+        return token_ids
+
+    def delete_tokens_for_users_and_projects(self, user_ids, user_project_ids,
+                                             user_trust_ids):
+        """Deletes the tokens of several users, projects and trusts at once.
+
+        Drivers able to delete these tokens in a few set-based operations
+        should override this method; by default the tokens of each user,
+        user-project combination and trust are listed and deleted in turn.
+
+        :param user_ids: identities of the users whose tokens are deleted
+        :type user_ids: list
+        :param user_project_ids: (user_id, tenant_id) pairs whose tenant
+                                 scoped tokens are deleted
+        :type user_project_ids: list
+        :param user_trust_ids: (trustee_user_id, trust_id) pairs whose
+                               trust scoped tokens are deleted
+        :type user_trust_ids: list
+        :returns: list of the token_id's deleted.
+
+        """
+        token_lists = [self._list_tokens(user_id) for user_id in user_ids]
+        token_lists.extend(self._list_tokens(user_id, tenant_id=tenant_id)
+                           for user_id, tenant_id in user_project_ids)
+        token_lists.extend(self._list_tokens(user_id, trust_id=trust_id)
+                           for user_id, trust_id in user_trust_ids)
+        token_ids = []
+        for token in set(itertools.chain.from_iterable(token_lists)):
+            try:
+                self.delete_token(token)
+            except exception.NotFound:
+                continue
+            token_ids.append(token)
+        return token_ids
+
     @abc.abstractmethod
     def _list_tokens(self, user_id, tenant_id=None, trust_id=None,
                      consumer_id=None):
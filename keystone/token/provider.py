@@ -16,8 +16,11 @@
 
 import abc
 import base64
+import collections
 import datetime
+import hashlib
 import sys
+import threading
 import uuid
 
 from keystoneclient.common import cms
@@ -27,11 +30,13 @@ import six
 from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import manager
+from keystone.common import signing
 from keystone import config
 from keystone import exception
-from keystone.i18n import _
+from keystone.i18n import _, _LI
 from keystone.models import token_model
 from keystone import notifications
+from keystone.openstack.common import jsonutils
 from keystone.openstack.common import log
 from keystone.openstack.common import versionutils
 from keystone.token import persistence
@@ -47,6 +52,7 @@ UnsupportedTokenVersionException = exception.UnsupportedTokenVersionException
 
 # NOTE(blk-u): The config options are not available at import time.
 EXPIRATION_TIME = lambda: CONF.token.cache_time
+REVOCATION_CACHE_EXPIRATION_TIME = lambda: CONF.token.revocation_cache_time
 
 # supported token versions
 V2 = token_model.V2
@@ -99,6 +105,113 @@ def audit_info(parent_audit_id):
     return [audit_id]
 
 
+class InvalidTokenCache(object):
+    """A bounded, short-lived set of the unique IDs of invalid tokens.
+
+    Only valid tokens are cached, so validating a token that does not exist,
+    is expired or is revoked reads the backend every time.  Remembering these
+    IDs for ``[token] invalid_cache_time`` seconds rejects clients retrying
+    with the same dead token without reading the backend again.
+
+    Each keystone process has its own cache, and only forgets the IDs of the
+    tokens it creates itself; the IDs of tokens created by another process
+    are forgotten when they expire from the cache.
+
+    The counters of the cache are logged every ``[token]
+    invalid_cache_stats_interval`` seconds.
+
+    """
+
+    def __init__(self):
+        # NOTE: The expiry and serial number of each ID, and the (serial,
+        # ID) pairs in the order they were added, which is also the order
+        # they expire in. A pair is stale once its ID was discarded or added
+        # again, and is skipped when it reaches the front of the queue.
+        self._tokens = {}
+        self._queue = collections.deque()
+        self._serial = 0
+        self._lock = threading.Lock()
+        self._last_report = timeutils.utcnow()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, token_id):
+        if CONF.token.invalid_cache_time <= 0:
+            return False
+        now = timeutils.utcnow()
+        with self._lock:
+            expires, serial = self._tokens.get(token_id, (None, None))
+            if expires is not None and expires > now:
+                self.hits += 1
+                found = True
+            else:
+                if expires is not None:
+                    del self._tokens[token_id]
+                self.misses += 1
+                found = False
+            self._report(now)
+        return found
+
+    def add(self, token_id):
+        if CONF.token.invalid_cache_time <= 0:
+            return
+        now = timeutils.utcnow()
+        expires = now + datetime.timedelta(
+            seconds=CONF.token.invalid_cache_time)
+        with self._lock:
+            self._serial += 1
+            self._tokens[token_id] = (expires, self._serial)
+            self._queue.append((self._serial, token_id))
+            # Drop the stale and expired pairs from the front of the queue,
+            # then evict the first IDs to expire while the cache is full.
+            while self._queue:
+                serial, first_id = self._queue[0]
+                first_expires, first_serial = self._tokens.get(
+                    first_id, (None, None))
+                if first_serial != serial:
+                    self._queue.popleft()
+                elif first_expires <= now:
+                    self._queue.popleft()
+                    del self._tokens[first_id]
+                elif len(self._tokens) > CONF.token.invalid_cache_size:
+                    self._queue.popleft()
+                    del self._tokens[first_id]
+                    self.evictions += 1
+                else:
+                    break
+            if len(self._queue) > 2 * len(self._tokens) + 1:
+                self._queue = collections.deque(
+                    (serial, token_id) for serial, token_id in self._queue
+                    if self._tokens.get(token_id, (None, None))[1] == serial)
+
+    def discard(self, token_id):
+        with self._lock:
+            self._tokens.pop(token_id, None)
+
+    def _report(self, now):
+        interval = CONF.token.invalid_cache_stats_interval
+        if interval <= 0:
+            return
+        if now - self._last_report < datetime.timedelta(seconds=interval):
+            return
+        self._last_report = now
+        LOG.info(_LI('Invalid token cache: %(size)d entries, %(hits)d hits, '
+                     '%(misses)d misses, %(evictions)d evictions.'),
+                 self._get_stats())
+
+    def _get_stats(self):
+        return {'size': len(self._tokens),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def get_stats(self):
+        """Return the size, hit, miss and eviction counts of the cache."""
+        with self._lock:
+            return self._get_stats()
+
+
 @dependency.optional('revoke_api')
 @dependency.provider('token_provider_api')
 class Manager(manager.Manager):
@@ -150,6 +263,7 @@ class Manager(manager.Manager):
 
     def __init__(self):
         super(Manager, self).__init__(self.get_token_provider())
+        self.invalid_tokens = InvalidTokenCache()
         self._register_callback_listeners()
 
     def _register_callback_listeners(self):
@@ -173,6 +287,8 @@ class Manager(manager.Manager):
                     self._delete_user_project_tokens_callback],
                 [notifications.INVALIDATE_USER_OAUTH_CONSUMER_TOKENS,
                     self._delete_user_oauth_consumer_tokens_callback],
+                [notifications.INVALIDATE_USERS_TOKEN_PERSISTENCE,
+                    self._delete_users_tokens_callback],
             ]
         }
 
@@ -204,6 +320,7 @@ class Manager(manager.Manager):
         return cms.cms_hash_token(token_id, mode=CONF.token.hash_algorithm)
 
     def _create_token(self, token_id, token_data):
+        self.invalid_tokens.discard(self.unique_id(token_id))
         try:
             if isinstance(token_data['expires'], six.string_types):
                 token_data['expires'] = timeutils.normalize_time(
@@ -222,11 +339,22 @@ class Manager(manager.Manager):
         unique_id = self.unique_id(token_id)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
-        token = self._validate_token(unique_id)
-        self._token_belongs_to(token, belongs_to)
-        self._is_valid_token(token)
+        self._assert_not_invalid(unique_id)
+        try:
+            token = self._validate_token(unique_id)
+            self._token_belongs_to(token, belongs_to)
+            self._is_valid_token(token)
+        except exception.TokenNotFound:
+            self.invalid_tokens.add(unique_id)
+            raise
         return token
 
+    def _assert_not_invalid(self, unique_id):
+        if unique_id in self.invalid_tokens:
+            LOG.debug('Token is known to be invalid: %s',
+                      self.invalid_tokens.get_stats())
+            raise exception.TokenNotFound(_('Failed to validate token'))
+
     def check_revocation_v2(self, token):
         try:
             token_data = token['access']
@@ -242,11 +370,16 @@ class Manager(manager.Manager):
         unique_id = self.unique_id(token_id)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
-        token_ref = self._persistence.get_token(unique_id)
-        token = self._validate_v2_token(token_ref)
-        self.check_revocation_v2(token)
-        self._token_belongs_to(token, belongs_to)
-        self._is_valid_token(token)
+        self._assert_not_invalid(unique_id)
+        try:
+            token_ref = self._persistence.get_token(unique_id)
+            token = self._validate_v2_token(token_ref)
+            self.check_revocation_v2(token)
+            self._token_belongs_to(token, belongs_to)
+            self._is_valid_token(token)
+        except exception.TokenNotFound:
+            self.invalid_tokens.add(unique_id)
+            raise
         return token
 
     def check_revocation_v3(self, token):
@@ -269,12 +402,17 @@ class Manager(manager.Manager):
         unique_id = self.unique_id(token_id)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
+        self._assert_not_invalid(unique_id)
         try:
-            token_ref = self._persistence.get_token(unique_id)
-        except (exception.ValidationError, exception.UserNotFound):
-            raise exception.TokenNotFound(token_id=token_id)
-        token = self._validate_v3_token(token_ref)
-        self._is_valid_token(token)
+            try:
+                token_ref = self._persistence.get_token(unique_id)
+            except (exception.ValidationError, exception.UserNotFound):
+                raise exception.TokenNotFound(token_id=token_id)
+            token = self._validate_v3_token(token_ref)
+            self._is_valid_token(token)
+        except exception.TokenNotFound:
+            self.invalid_tokens.add(unique_id)
+            raise
         return token
 
     @versionutils.deprecated(
@@ -487,6 +625,60 @@ class Manager(manager.Manager):
     def list_revoked_tokens(self):
         return self._persistence.list_revoked_tokens()
 
+    def _revocation_list_json(self):
+        tokens = []
+        for t in self.list_revoked_tokens():
+            t = dict(t)
+            expires = t['expires']
+            if expires and isinstance(expires, datetime.datetime):
+                t['expires'] = timeutils.isotime(expires)
+            tokens.append(t)
+        # The backends return the revoked tokens in no particular order, so
+        # sort them to keep the document and its entity tag stable.
+        tokens.sort(key=lambda t: t['id'])
+        return jsonutils.dumps({'revoked': tokens}, sort_keys=True)
+
+    @staticmethod
+    def _revocation_list_etag(json_data):
+        return hashlib.sha1(json_data.encode('utf-8')).hexdigest()
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=REVOCATION_CACHE_EXPIRATION_TIME)
+    def get_revocation_list_etag(self):
+        """Return the entity tag of the revocation list.
+
+        The entity tag only depends on the content of the list, so that it is
+        the same for every keystone process, and it is computed without
+        signing the list so that a conditional request can be answered with
+        ``304 Not Modified`` cheaply.
+
+        """
+        return self._revocation_list_etag(self._revocation_list_json())
+
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=REVOCATION_CACHE_EXPIRATION_TIME)
+    def get_signed_revocation_list(self):
+        """Return the signed revocation list and its entity tag.
+
+        Signing the revocation list is expensive, so the signed document is
+        cached until the revocation list is invalidated.
+
+        :returns: a tuple of the entity tag and the signed document
+
+        """
+        json_data = self._revocation_list_json()
+        signed_text = signing.cms_sign_text(json_data,
+                                            CONF.signing.certfile,
+                                            CONF.signing.keyfile)
+        return self._revocation_list_etag(json_data), signed_text
+
+    def invalidate_signed_revocation_list(self):
+        # NOTE(morganfainberg): Note that ``self`` needs to be passed to
+        # invalidate() because of the way the invalidation method works on
+        # determining cache-keys.
+        self.get_revocation_list_etag.invalidate(self)
+        self.get_signed_revocation_list.invalidate(self)
+
     def _trust_deleted_event_callback(self, service, resource_type, operation,
                                       payload):
         if CONF.token.revoke_by_id:
@@ -515,6 +707,13 @@ class Manager(manager.Manager):
             self._persistence.delete_tokens_for_user(user_id=user_id,
                                                      project_id=project_id)
 
+    def _delete_users_tokens_callback(self, service, resource_type,
+                                      operation, payload):
+        if CONF.token.revoke_by_id:
+            self._persistence.delete_tokens_for_users_and_projects(
+                user_ids=payload['resource_info']['user_ids'],
+                user_project_ids=payload['resource_info']['user_project_ids'])
+
     def _delete_project_tokens_callback(self, service, resource_type,
                                         operation, payload):
         if CONF.token.revoke_by_id:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare PKI token signing through openssl and in-process.
+
+Usage: cms_signing.py [--tokens N] [--roles N] [--certfile PATH]
+                      [--keyfile PATH]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+import uuid
+
+from keystoneclient.common import cms
+
+from keystone.common import signing
+from keystone.openstack.common import jsonutils
+
+
+def _token_data(role_count):
+    roles = [{'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+             for i in range(role_count)]
+    return jsonutils.dumps({'token': {
+        'methods': ['password'],
+        'roles': roles,
+        'expires_at': '2038-01-19T03:14:07.000000Z',
+        'issued_at': '2038-01-18T03:14:07.000000Z',
+        'user': {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex},
+        'project': {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex},
+    }})
+
+
+def _time(label, sign, texts, certfile, keyfile):
+    start = time.time()
+    tokens = [sign(text, certfile, keyfile) for text in texts]
+    elapsed = time.time() - start
+    print('%-24s %8.3fs %10.1f tokens/s' % (label, elapsed,
+                                             len(texts) / elapsed))
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tokens', type=int, default=500)
+    parser.add_argument('--roles', type=int, default=10)
+    parser.add_argument('--certfile',
+                        default='examples/pki/certs/signing_cert.pem')
+    parser.add_argument('--keyfile',
+                        default='examples/pki/private/signing_key.pem')
+    args = parser.parse_args()
+
+    if signing.get_signer(args.certfile, args.keyfile) is None:
+        raise SystemExit('In-process signing is not available')
+
+    texts = [_token_data(args.roles) for i in range(args.tokens)]
+    print('%d tokens of %d bytes' % (len(texts), len(texts[0])))
+    openssl_tokens = _time('openssl cms -sign', cms.cms_sign_token, texts,
+                           args.certfile, args.keyfile)
+    signer_tokens = _time('in-process', signing.cms_sign_token, texts,
+                          args.certfile, args.keyfile)
+    if openssl_tokens != signer_tokens:
+        raise SystemExit('openssl and in-process signing disagree')
+
+
+if __name__ == '__main__':
+    main()
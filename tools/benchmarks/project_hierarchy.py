@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare ways of reading the subtree and the parents of projects.
+
+A synthetic tree is stored in an in-memory SQLite database, and the subtree
+and the parents of sampled projects are read with:
+
+* a level-by-level walk over `parent_id`, one query per level;
+* the `project_hierarchy` closure table, one query;
+* a materialized path column, one LIKE query.
+
+Usage: project_hierarchy.py [--depth N] [--fanout N] [--lookups N] [--seed N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import random
+import time
+import uuid
+
+import sqlalchemy as sql
+
+
+def _new_id():
+    return uuid.uuid4().hex
+
+
+def _create_tables(engine):
+    meta = sql.MetaData()
+    project = sql.Table(
+        'project', meta,
+        sql.Column('id', sql.String(64), primary_key=True),
+        sql.Column('parent_id', sql.String(64), index=True),
+        sql.Column('path', sql.String(2048), index=True))
+    hierarchy = sql.Table(
+        'project_hierarchy', meta,
+        sql.Column('ancestor_id', sql.String(64), primary_key=True),
+        sql.Column('descendant_id', sql.String(64), primary_key=True,
+                   index=True),
+        sql.Column('depth', sql.Integer, nullable=False))
+    meta.create_all(engine)
+    return project, hierarchy
+
+
+def _build_tree(depth, fanout):
+    """Return (id, parent_id, path, ancestors) tuples, parents first."""
+    root_id = _new_id()
+    projects = [(root_id, None, '/%s/' % root_id, [root_id])]
+    level = [projects[0]]
+    for i in range(depth):
+        next_level = []
+        for parent_id, _, path, ancestors in level:
+            for j in range(fanout):
+                project_id = _new_id()
+                next_level.append((project_id, parent_id,
+                                   '%s%s/' % (path, project_id),
+                                   [project_id] + ancestors))
+        projects.extend(next_level)
+        level = next_level
+    return projects
+
+
+def _load(engine, project, hierarchy, projects):
+    engine.execute(project.insert(),
+                   [{'id': p[0], 'parent_id': p[1], 'path': p[2]}
+                    for p in projects])
+    engine.execute(hierarchy.insert(),
+                   [{'ancestor_id': ancestor_id, 'descendant_id': p[0],
+                     'depth': depth}
+                    for p in projects
+                    for depth, ancestor_id in enumerate(p[3])])
+
+
+def _subtree_by_level(conn, project, project_id):
+    subtree = []
+    level = [project_id]
+    while level:
+        query = sql.select([project.c.id]).where(
+            project.c.parent_id.in_(level))
+        level = [row.id for row in conn.execute(query)]
+        subtree.extend(level)
+    return sorted(subtree)
+
+
+def _subtree_by_closure(conn, hierarchy, project_id):
+    query = sql.select([hierarchy.c.descendant_id])
+    query = query.where(hierarchy.c.ancestor_id == project_id)
+    query = query.where(hierarchy.c.depth > 0)
+    return sorted(row.descendant_id for row in conn.execute(query))
+
+
+def _subtree_by_path(conn, project, project_id):
+    path = conn.execute(sql.select([project.c.path]).where(
+        project.c.id == project_id)).scalar()
+    query = sql.select([project.c.id])
+    query = query.where(project.c.path.like(path + '%'))
+    query = query.where(project.c.id != project_id)
+    return sorted(row.id for row in conn.execute(query))
+
+
+def _parents_by_level(conn, project, project_id):
+    parents = []
+    query = sql.select([project.c.parent_id])
+    parent_id = conn.execute(
+        query.where(project.c.id == project_id)).scalar()
+    while parent_id is not None:
+        parents.append(parent_id)
+        parent_id = conn.execute(
+            query.where(project.c.id == parent_id)).scalar()
+    return sorted(parents)
+
+
+def _parents_by_closure(conn, hierarchy, project_id):
+    query = sql.select([hierarchy.c.ancestor_id])
+    query = query.where(hierarchy.c.descendant_id == project_id)
+    query = query.where(hierarchy.c.depth > 0)
+    return sorted(row.ancestor_id for row in conn.execute(query))
+
+
+def _parents_by_path(conn, project, project_id):
+    path = conn.execute(sql.select([project.c.path]).where(
+        project.c.id == project_id)).scalar()
+    return sorted(path.strip('/').split('/')[:-1])
+
+
+def _time(label, fn, conn, table, project_ids):
+    start = time.time()
+    results = [fn(conn, table, project_id) for project_id in project_ids]
+    print('%-32s %8.3fs' % (label, time.time() - start))
+    return results
+
+
+def _run(conn, project, hierarchy, project_ids):
+    results = [
+        _time('subtree by level', _subtree_by_level, conn, project,
+              project_ids),
+        _time('subtree by closure table', _subtree_by_closure, conn,
+              hierarchy, project_ids),
+        _time('subtree by path', _subtree_by_path, conn, project,
+              project_ids),
+    ]
+    if results.count(results[0]) != len(results):
+        raise SystemExit('The subtrees disagree')
+
+    results = [
+        _time('parents by level', _parents_by_level, conn, project,
+              project_ids),
+        _time('parents by closure table', _parents_by_closure, conn,
+              hierarchy, project_ids),
+        _time('parents by path', _parents_by_path, conn, project,
+              project_ids),
+    ]
+    if results.count(results[0]) != len(results):
+        raise SystemExit('The parents disagree')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=None,
+                        help='run a single tree of this depth')
+    parser.add_argument('--fanout', type=int, default=None,
+                        help='run a single tree with this fanout')
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.depth is not None or args.fanout is not None:
+        shapes = [(args.depth or 5, args.fanout or 4)]
+    else:
+        # A deep and narrow tree, and a shallow and wide one.
+        shapes = [(12, 2), (3, 30)]
+
+    for depth, fanout in shapes:
+        engine = sql.create_engine('sqlite://')
+        project, hierarchy = _create_tables(engine)
+        projects = _build_tree(depth, fanout)
+        _load(engine, project, hierarchy, projects)
+        print('depth %d, fanout %d: %d projects' % (depth, fanout,
+                                                    len(projects)))
+
+        # Look up the subtrees of the upper levels, which are the expensive
+        # ones, and the parents of the leaves.
+        upper_ids = [p[0] for p in projects if len(p[3]) <= depth // 2 + 1]
+        project_ids = [random.choice(upper_ids) for i in range(args.lookups)]
+        project_ids += [random.choice(projects)[0]
+                        for i in range(args.lookups)]
+        conn = engine.connect()
+        _run(conn, project, hierarchy, project_ids)
+        conn.close()
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare ways of walking a region tree to resolve endpoint policies.
+
+A synthetic region tree is built as a number of chains of the given depth
+under a single root region, with one endpoint of each service in every
+region. For a region and service association at the root, and for every
+endpoint of one service, the tree is walked:
+
+* down, by rescanning the lists of all the regions and endpoints at every
+  region, as list_endpoints_for_policy used to do;
+* up, by looking up the parent of each region in turn, as
+  get_policy_for_endpoint used to do. The lookups are made against an
+  in-memory dict here, where get_policy_for_endpoint made a get_region call
+  to the catalog for each of them, so their number is reported as well;
+* both ways through a RegionTree.
+
+Usage: region_tree.py [--depth N] [--chains N] [--services N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from keystone.catalog import core
+
+
+def _build(depth, chains, services):
+    regions = [{'id': 'root', 'parent_region_id': None}]
+    for chain in range(chains):
+        parent_region_id = 'root'
+        for level in range(depth):
+            region_id = 'region-%d-%d' % (chain, level)
+            regions.append({'id': region_id,
+                            'parent_region_id': parent_region_id})
+            parent_region_id = region_id
+    endpoints = []
+    for region in regions:
+        for service in range(services):
+            endpoints.append({'id': '%s-%d' % (region['id'], service),
+                              'service_id': 'service-%d' % service,
+                              'region_id': region['id']})
+    return regions, endpoints
+
+
+def _legacy_endpoints_for_region(region_id, service_id, endpoints, regions):
+    endpoints_found = []
+    regions_examined = []
+
+    def _recurse(region_id):
+        if region_id in regions_examined:
+            return
+        regions_examined.append(region_id)
+        endpoints_found.extend(
+            ep for ep in endpoints if
+            ep['service_id'] == service_id and ep['region_id'] == region_id)
+        for region in regions:
+            if region['parent_region_id'] == region_id:
+                _recurse(region['id'])
+
+    _recurse(region_id)
+    return endpoints_found
+
+
+def _legacy_region_lineage(region_id, regions_by_id):
+    lineage = []
+    while region_id is not None:
+        lineage.append(region_id)
+        region_id = regions_by_id[region_id]['parent_region_id']
+    return lineage
+
+
+def _time(label, fn, *args):
+    start = time.time()
+    result = fn(*args)
+    print('%-32s %8.3fs' % (label, time.time() - start))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=200)
+    parser.add_argument('--chains', type=int, default=5)
+    parser.add_argument('--services', type=int, default=3)
+    args = parser.parse_args()
+
+    regions, endpoints = _build(args.depth, args.chains, args.services)
+    service_endpoints = [ep for ep in endpoints
+                         if ep['service_id'] == 'service-0']
+    regions_by_id = dict((region['id'], region) for region in regions)
+    print('%d regions, %d endpoints' % (len(regions), len(endpoints)))
+
+    legacy_down = _time(
+        'legacy walk down', _legacy_endpoints_for_region,
+        'root', 'service-0', endpoints, regions)
+    legacy_up = _time(
+        'legacy walk up', lambda: [
+            _legacy_region_lineage(ep['region_id'], regions_by_id)
+            for ep in service_endpoints])
+    print('%-32s %8d' % ('legacy get_region lookups',
+                         sum(len(lineage) for lineage in legacy_up)))
+
+    tree = _time('building the region tree', core.RegionTree,
+                 regions, endpoints)
+    tree_down = _time(
+        'region tree walk down', tree.list_endpoints_for_service_and_region,
+        'service-0', 'root')
+    tree_up = _time(
+        'region tree walk up', lambda: [
+            list(tree.get_region_lineage(ep['region_id']))
+            for ep in service_endpoints])
+
+    if (sorted(ep['id'] for ep in legacy_down) !=
+            sorted(ep['id'] for ep in tree_down) or legacy_up != tree_up):
+        raise SystemExit('The walks disagree')
+
+
+if __name__ == '__main__':
+    main()
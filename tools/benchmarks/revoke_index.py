@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare RevokeTree and RevokeIndex when validating synthetic tokens.
+
+Usage: revoke_index.py [--events N] [--tokens N] [--seed N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import random
+import time
+import uuid
+
+from keystone.contrib.revoke import model
+
+
+def _new_id():
+    return uuid.uuid4().hex
+
+
+def _build_events(count, user_ids, project_ids, domain_ids, role_ids, now):
+    events = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            kwargs = {'user_id': random.choice(user_ids)}
+        elif kind == 1:
+            kwargs = {'audit_id': _new_id()[:22]}
+        elif kind == 2:
+            kwargs = {'user_id': random.choice(user_ids),
+                      'project_id': random.choice(project_ids)}
+        elif kind == 3:
+            kwargs = {'project_id': random.choice(project_ids),
+                      'role_id': role_ids[0]}
+        else:
+            kwargs = {'domain_id': random.choice(domain_ids),
+                      'role_id': role_ids[0]}
+        events.append(model.RevokeEvent(revoked_at=now, **kwargs))
+    return events
+
+
+def _build_tokens(count, user_ids, project_ids, domain_ids, role_ids, now):
+    issued_at = now - datetime.timedelta(minutes=5)
+    tokens = []
+    for i in range(count):
+        token = model.blank_token_data(issued_at)
+        token['user_id'] = random.choice(user_ids)
+        token['project_id'] = random.choice(project_ids)
+        token['identity_domain_id'] = random.choice(domain_ids)
+        token['assignment_domain_id'] = random.choice(domain_ids)
+        token['audit_id'] = _new_id()[:22]
+        token['audit_chain_id'] = token['audit_id']
+        token['roles'] = random.sample(role_ids, 3)
+        tokens.append(token)
+    return tokens
+
+
+def _time(label, fn, *args):
+    start = time.time()
+    result = fn(*args)
+    print('%-32s %8.3fs' % (label, time.time() - start))
+    return result
+
+
+def _check_all(matcher, tokens):
+    return [matcher.is_revoked(token) for token in tokens]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--tokens', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    now = datetime.datetime.utcnow()
+    user_ids = [_new_id() for i in range(args.tokens)]
+    project_ids = [_new_id() for i in range(args.tokens // 10 or 1)]
+    domain_ids = [_new_id() for i in range(args.tokens // 10 or 1)]
+    role_ids = [_new_id() for i in range(20)]
+
+    events = _build_events(args.events, user_ids, project_ids, domain_ids,
+                           role_ids, now)
+    tokens = _build_tokens(args.tokens, user_ids, project_ids, domain_ids,
+                           role_ids, now)
+    print('%d events, %d tokens' % (len(events), len(tokens)))
+
+    tree = _time('build RevokeTree', model.RevokeTree, events)
+    index = _time('build RevokeIndex', model.RevokeIndex, events)
+    tree_results = _time('validate with RevokeTree', _check_all, tree,
+                         tokens)
+    index_results = _time('validate with RevokeIndex', _check_all, index,
+                          tokens)
+    if tree_results != index_results:
+        raise SystemExit('RevokeTree and RevokeIndex disagree')
+    print('%d tokens revoked' % sum(index_results))
+
+
+if __name__ == '__main__':
+    main()
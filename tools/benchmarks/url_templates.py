@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare ways of formatting the endpoint URLs of a catalog per token.
+
+The URLs of a synthetic catalog are formatted for a number of tokens with:
+
+* the string rewriting that format_url used to do on every call, against a
+  copy of the whole configuration;
+* format_url, which parses every URL again;
+* URL templates compiled once, which only substitute the per-token values.
+
+Usage: url_templates.py [--endpoints N] [--tokens N]
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+import uuid
+
+import six
+
+from keystone.catalog import core
+from keystone.common import utils
+from keystone import config
+
+
+CONF = config.CONF
+
+URLS = [
+    'http://compute-%d.example.com:$(compute_port)s/v2/$(tenant_id)s',
+    'http://$(public_bind_host)s:$(public_port)s/v2.0',
+    'http://storage-%d.example.com:8080/v1/AUTH_$(tenant_id)s',
+    'http://image-%d.example.com:9292',
+]
+
+
+def _urls(count):
+    return [URLS[i % len(URLS)].replace('%d', str(i)) for i in range(count)]
+
+
+def _legacy_format_url(url, substitutions):
+    substitutions = utils.WhiteListedItemFilter(
+        CONF.catalog.endpoint_substitution_whitelist,
+        substitutions)
+    return url.replace('$(', '%(') % substitutions
+
+
+def _render_legacy(urls, user_id, tenant_id):
+    substitutions = dict(six.iteritems(CONF))
+    substitutions.update({'tenant_id': tenant_id, 'user_id': user_id})
+    return [_legacy_format_url(url, substitutions) for url in urls]
+
+
+def _render_format_url(urls, user_id, tenant_id):
+    substitutions = dict(six.iteritems(CONF))
+    substitutions.update({'tenant_id': tenant_id, 'user_id': user_id})
+    return [core.format_url(url, substitutions) for url in urls]
+
+
+def _render_compiled(templates, user_id, tenant_id):
+    substitutions = {'tenant_id': tenant_id, 'user_id': user_id}
+    return [template.render(substitutions) for template in templates]
+
+
+def _time(label, fn, urls, tokens):
+    start = time.time()
+    results = [fn(urls, user_id, tenant_id) for user_id, tenant_id in tokens]
+    elapsed = time.time() - start
+    print('%-24s %8.3fs %10.1f catalogs/s' % (label, elapsed,
+                                               len(tokens) / elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=500)
+    parser.add_argument('--tokens', type=int, default=200)
+    args = parser.parse_args()
+    CONF(args=[], project='keystone', default_config_files=[])
+
+    urls = _urls(args.endpoints)
+    tokens = [(uuid.uuid4().hex, uuid.uuid4().hex)
+              for i in range(args.tokens)]
+    print('%d endpoints, %d tokens' % (len(urls), len(tokens)))
+
+    results = [
+        _time('legacy string rewriting', _render_legacy, urls, tokens),
+        _time('format_url', _render_format_url, urls, tokens),
+    ]
+
+    start = time.time()
+    substitutions = dict(six.iteritems(CONF))
+    templates = [core.compile_url(url, substitutions) for url in urls]
+    print('%-24s %8.3fs' % ('compiling', time.time() - start))
+    results.append(_time('compiled templates', _render_compiled, templates,
+                         tokens))
+
+    if results.count(results[0]) != len(results):
+        raise SystemExit('The catalogs disagree')
+
+
+if __name__ == '__main__':
+    main()